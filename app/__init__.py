@@ -1,10 +1,32 @@
 from hypercorn.asyncio import serve
 from hypercorn.config import Config
+from hypercorn.middleware import AsyncioWSGIMiddleware
 
+from .asgi import PathDispatcher
 from .core import flask_app
+from .core.config import Config as AppConfig
 
 
-async def run_flask():
+async def serve_asgi(app, bind: list[str], shutdown_trigger=None):
+    """
+    Запускает Hypercorn с приложением app на адресах bind (host:port или fd://<дескриптор> уже открытого сокета).
+    Когда завершается корутина shutdown_trigger(), сервер перестаёт принимать соединения
+    и ждёт текущие запросы не дольше SHUTDOWN_TIMEOUT секунд.
+    """
     config = Config()
-    config.bind = ["127.0.0.1:5000"]
-    await serve(flask_app, config)
+    config.bind = bind
+    config.graceful_timeout = AppConfig.SHUTDOWN_TIMEOUT
+    await serve(app, config, shutdown_trigger=shutdown_trigger)
+
+
+async def run_flask(routes: dict | None = None, bind: list[str] | None = None, shutdown_trigger=None):
+    """
+    Запускает Hypercorn с Flask-приложением. Страница прогноза и проверка маршрута обслуживаются
+    асинхронными обработчиками в event loop сервера, остальные пути — Flask в пуле потоков.
+    routes — дополнительные ASGI-приложения по точным путям (вебхук телеграм-бота).
+    """
+    from .routes.asgi_routes import weather_routes
+
+    app = PathDispatcher({**weather_routes(), **(routes or {})},
+                         AsyncioWSGIMiddleware(flask_app, Config().wsgi_max_body_size))
+    await serve_asgi(app, bind or [AppConfig.WEB_BIND], shutdown_trigger)
@@ -0,0 +1,155 @@
+import io
+import sys
+from urllib.parse import parse_qsl
+
+
+class PathDispatcher:
+    """
+    ASGI-приложение, которое отдаёт запросы к путям из routes своим ASGI-приложениям (например, вебхуку бота),
+    а все остальные — приложению default (Flask через AsyncioWSGIMiddleware).
+    Сообщения lifespan обрабатываются здесь же, поскольку WSGI-обёртка их не подтверждает.
+    """
+
+    def __init__(self, routes: dict, default):
+        self.routes = routes
+        self.default = default
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        app = self.routes.get(scope.get('path'), self.default)
+        await app(scope, receive, send)
+
+
+async def not_found(scope, receive, send):
+    """
+    ASGI-приложение, отвечающее 404 на любой запрос (для серверов, где обслуживаются только пути из routes).
+    """
+    if scope['type'] != 'http':
+        return
+    await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-length', b'0')]})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def read_body(receive, max_size: int) -> bytes | None:
+    """
+    Читает тело HTTP-запроса целиком. None — тело длиннее max_size байт.
+    """
+    body = bytearray()
+    while True:
+        message = await receive()
+        body.extend(message.get('body', b''))
+        if len(body) > max_size:
+            return None
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def send_response(send, status: int, body: bytes = b'', content_type: str | None = None, headers=()):
+    """
+    Отправляет HTTP-ответ одним сообщением тела.
+    """
+    response_headers = [(b'content-length', str(len(body)).encode())]
+    if content_type:
+        response_headers.append((b'content-type', content_type.encode()))
+    response_headers.extend((name.encode(), value.encode()) for name, value in headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def query_params(scope) -> dict:
+    """
+    Параметры строки запроса; у повторяющихся параметров берётся первое значение, как в request.args.get.
+    """
+    params = {}
+    # Не закодированные процентами символы приходят байтами UTF-8, как и раскодированные %XX
+    query = scope['query_string'].decode('utf-8', 'replace')
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        params.setdefault(name, value)
+    return params
+
+
+def wsgi_environ(scope, body: bytes = b'') -> dict:
+    """
+    WSGI-окружение для ASGI-запроса: с ним открывается контекст запроса Flask (шаблоны, url_for).
+    """
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f"HTTP_{key}"
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def asgi_scope(environ: dict) -> dict:
+    """
+    ASGI scope для WSGI-запроса (обратное преобразование wsgi_environ): с ним Flask-представление
+    передаёт запрос ASGI-обработчику.
+    """
+    headers = []
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            name = key[5:]
+        elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH') and value:
+            name = key
+        else:
+            continue
+        headers.append((name.lower().replace('_', '-').encode('latin-1'), value.encode('latin-1')))
+
+    return {
+        'type': 'http',
+        'http_version': environ.get('SERVER_PROTOCOL', 'HTTP/1.1').split('/')[-1],
+        'method': environ['REQUEST_METHOD'],
+        'scheme': environ.get('wsgi.url_scheme', 'http'),
+        'root_path': environ.get('SCRIPT_NAME', ''),
+        'path': environ.get('PATH_INFO', '/'),
+        'query_string': environ.get('QUERY_STRING', '').encode('latin-1'),
+        'headers': headers,
+        'server': (environ.get('SERVER_NAME', 'localhost'), int(environ.get('SERVER_PORT') or 80)),
+    }
+
+
+async def call_asgi(app, scope, body: bytes = b'') -> tuple[int, list[tuple[str, str]], bytes]:
+    """
+    Выполняет ASGI-приложение для одного HTTP-запроса с телом body и возвращает статус, заголовки и тело ответа.
+    """
+    status, headers, chunks = 500, [], []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        nonlocal status, headers
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in message['headers']]
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status, headers, b''.join(chunks)
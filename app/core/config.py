@@ -2,7 +2,7 @@ import os
 from dotenv import load_dotenv
 
 from flask import Flask
-from dash_app import create_dash_app
+from dash_app import create_dash_app, create_compare_app
 
 # Загрузка переменных окружения из файла .env
 load_dotenv()
@@ -11,16 +11,140 @@ load_dotenv()
 class Config:
     ACCUWEATHER_API_KEY = os.getenv('ACCUWEATHER_API_KEY')
     POSITIONSTACK_API_KEY = os.getenv('POSITIONSTACK_API_KEY')
+
+    # Адрес веб-сервера (в режиме webhook на него же приходят апдейты бота)
+    WEB_BIND = os.getenv("WEB_BIND", "127.0.0.1:5000")
+
+    # Супервизор (supervisor.py): число процессов веб-сервера и бота, адрес вебхука процессов бота,
+    # интервал и таймаут проверки живости процессов, время на корректную остановку (секунды)
+    WEB_PROCESSES = int(os.getenv("WEB_PROCESSES", 2))
+    BOT_PROCESSES = int(os.getenv("BOT_PROCESSES", 1))
+    BOT_BIND = os.getenv("BOT_BIND", "127.0.0.1:5001")
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 2))
+    HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT", 30))
+    SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", 10))
+
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
     REDIS_DB = int(os.getenv("REDIS_DB", 0))
-    TESTING = os.getenv("TESTING", False)
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1))
+
+    # Кэш ответов внешних API: время жизни записей (в секундах) по типам данных
+    CACHE_BYPASS = os.getenv("CACHE_BYPASS", "False").lower() in ('1', 'true', 'yes')
+    CACHE_TTL_COORDINATES = int(os.getenv("CACHE_TTL_COORDINATES", 86400))
+    CACHE_TTL_LOCATION_KEY = int(os.getenv("CACHE_TTL_LOCATION_KEY", 30 * 86400))
+    CACHE_TTL_FORECAST = int(os.getenv("CACHE_TTL_FORECAST", 3600))
+    CACHE_TTL_CURRENT_WEATHER = int(os.getenv("CACHE_TTL_CURRENT_WEATHER", 300))
+    CACHE_TTL_HOURLY_FORECAST = int(os.getenv("CACHE_TTL_HOURLY_FORECAST", 1800))
+
+    # Сколько секунд после истечения свежести запись ещё отдаётся, пока обновляется в фоне
+    CACHE_STALE_TTL_FORECAST = int(os.getenv("CACHE_STALE_TTL_FORECAST", 6 * 3600))
+    CACHE_STALE_TTL_CURRENT_WEATHER = int(os.getenv("CACHE_STALE_TTL_CURRENT_WEATHER", 1800))
+    CACHE_STALE_TTL_HOURLY_FORECAST = int(os.getenv("CACHE_STALE_TTL_HOURLY_FORECAST", 3 * 3600))
+
+    # Почасовой прогноз: сколько часов запрашивать (AccuWeather отдаёт 1, 12, 24, 72 и 120 часов,
+    # больше 12 — на платных тарифах; 0 — не запрашивать)
+    HOURLY_FORECAST_HOURS = int(os.getenv("HOURLY_FORECAST_HOURS", 12))
+
+    # Фоновый прогрев самых запрашиваемых прогнозов
+    REFRESH_TOP_N = int(os.getenv("REFRESH_TOP_N", 20))
+    REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", 60))
+
+    # Локальный уровень кэша в памяти процесса: число записей и максимальное время жизни
+    LOCAL_CACHE_SIZE = int(os.getenv("LOCAL_CACHE_SIZE", 2048))
+    LOCAL_CACHE_TTL = int(os.getenv("LOCAL_CACHE_TTL", 300))
+
+    # Кэш готовых ответов /get_weather и /check_route_weather: число ответов, время жизни
+    # и максимальный max-age в Cache-Control (секунды)
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 512))
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 300))
+    RESPONSE_MAX_AGE = int(os.getenv("RESPONSE_MAX_AGE", 60))
+
+    # Ряды прогноза для графиков Dash под страницей прогноза: число записей и время жизни (секунды)
+    SERIES_STORE_SIZE = int(os.getenv("SERIES_STORE_SIZE", 256))
+    SERIES_STORE_TTL = int(os.getenv("SERIES_STORE_TTL", 3600))
+
+    # Привязка координат к ячейкам geohash для ключей кэша: длина geohash и максимальный сдвиг точки в км
+    SPATIAL_PRECISION = int(os.getenv("SPATIAL_PRECISION", 5))
+    SPATIAL_MAX_SNAP_KM = float(os.getenv("SPATIAL_MAX_SNAP_KM", 5))
+
+    # Объединение одинаковых одновременных запросов; блокировка в Redis распространяет его на все процессы
+    SINGLEFLIGHT_REDIS_LOCK = os.getenv("SINGLEFLIGHT_REDIS_LOCK", "False").lower() in ('1', 'true', 'yes')
+    SINGLEFLIGHT_LOCK_TIMEOUT = float(os.getenv("SINGLEFLIGHT_LOCK_TIMEOUT", 15))
+
+    # Пул потоков для синхронных вызовов (Redis) из асинхронного кода: число потоков, сколько вызовов
+    # может ждать в очереди и сколько секунд корутина ждёт места, прежде чем получить отказ (0 — без ограничения)
+    BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", 16))
+    BLOCKING_QUEUE_LIMIT = int(os.getenv("BLOCKING_QUEUE_LIMIT", 64))
+    BLOCKING_QUEUE_TIMEOUT = float(os.getenv("BLOCKING_QUEUE_TIMEOUT", 5))
+
+    # Общий HTTP-клиент для внешних API
+    UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 10))
+    UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 3))
+    UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", 100))
+    UPSTREAM_PER_HOST_LIMIT = int(os.getenv("UPSTREAM_PER_HOST_LIMIT", 10))
+    UPSTREAM_KEEPALIVE_TIMEOUT = float(os.getenv("UPSTREAM_KEEPALIVE_TIMEOUT", 30))
+
+    # Повторы идемпотентных запросов и автоматический выключатель для упавших внешних API
+    UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", 2))
+    UPSTREAM_RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", 0.2))
+    UPSTREAM_RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", 2))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+    BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 30))
+
+    # Пороги неблагоприятной погоды
+    BAD_WEATHER_MIN_TEMPERATURE = float(os.getenv("BAD_WEATHER_MIN_TEMPERATURE", 0))
+    BAD_WEATHER_MAX_TEMPERATURE = float(os.getenv("BAD_WEATHER_MAX_TEMPERATURE", 35))
+    BAD_WEATHER_MAX_WIND_SPEED = float(os.getenv("BAD_WEATHER_MAX_WIND_SPEED", 50))
+    BAD_WEATHER_MAX_PRECIPITATION_PROBABILITY = float(os.getenv("BAD_WEATHER_MAX_PRECIPITATION_PROBABILITY", 70))
+
+    # Сколько точек маршрута запрашивается одновременно
+    ROUTE_CONCURRENCY = int(os.getenv("ROUTE_CONCURRENCY", 8))
+
+    # Оценка маршрута по часам: средняя скорость (км/ч) для расчёта времени прибытия в точки
+    # и сколько часов, начиная с часа прибытия, проверяется в каждой точке
+    ROUTE_AVERAGE_SPEED = float(os.getenv("ROUTE_AVERAGE_SPEED", 60))
+    ROUTE_HOUR_WINDOW = int(os.getenv("ROUTE_HOUR_WINDOW", 2))
+
+    # Пакетное геокодирование: пакетный режим Positionstack (платные тарифы) и параллельность без него
+    POSITIONSTACK_BATCH = os.getenv("POSITIONSTACK_BATCH", "False").lower() in ('1', 'true', 'yes')
+    GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", 8))
+    GEOCODE_MAX_CITIES = int(os.getenv("GEOCODE_MAX_CITIES", 100))
+
+    # Максимум городов в одном запросе рядов прогноза (POST /api/series, сравнение городов в Dash)
+    SERIES_MAX_CITIES = int(os.getenv("SERIES_MAX_CITIES", 50))
+
+    # Квоты внешних API, общие для всех процессов через Redis: дневной лимит вызовов (0 — без лимита),
+    # частота запросов в секунду (0 — без ограничения) и доля квоты, недоступная фоновым обновлениям
+    ACCUWEATHER_DAILY_LIMIT = int(os.getenv("ACCUWEATHER_DAILY_LIMIT", 50))
+    ACCUWEATHER_RATE_LIMIT = float(os.getenv("ACCUWEATHER_RATE_LIMIT", 5))
+    POSITIONSTACK_DAILY_LIMIT = int(os.getenv("POSITIONSTACK_DAILY_LIMIT", 0))
+    POSITIONSTACK_RATE_LIMIT = float(os.getenv("POSITIONSTACK_RATE_LIMIT", 10))
+    QUOTA_BURST = int(os.getenv("QUOTA_BURST", 10))
+    QUOTA_BACKGROUND_RESERVE = float(os.getenv("QUOTA_BACKGROUND_RESERVE", 0.2))
+    # Сколько секунд запрос пользователя ждёт токен при превышении частоты (фоновые обновления не ждут)
+    QUOTA_MAX_WAIT = float(os.getenv("QUOTA_MAX_WAIT", 5))
+
+    # Локальный справочник городов (по умолчанию — файл из комплекта app/data/gazetteer.tsv)
+    GAZETTEER_PATH = (os.getenv("GAZETTEER_PATH")
+                      or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.tsv'))
+    SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", 10))
+
+    # Ограничение частоты апдейтов телеграм-бота: токенов в секунду и размер корзины на пользователя
+    # и на групповой чат, сколько секунд можно отложить апдейт сверх лимита, хранить ли корзины в Redis
+    THROTTLE_USER_RATE = float(os.getenv("THROTTLE_USER_RATE", 1))
+    THROTTLE_USER_BURST = int(os.getenv("THROTTLE_USER_BURST", 5))
+    THROTTLE_CHAT_RATE = float(os.getenv("THROTTLE_CHAT_RATE", 3))
+    THROTTLE_CHAT_BURST = int(os.getenv("THROTTLE_CHAT_BURST", 20))
+    THROTTLE_MAX_DEFER = float(os.getenv("THROTTLE_MAX_DEFER", 1))
+    THROTTLE_REDIS = os.getenv("THROTTLE_REDIS", "False").lower() in ('1', 'true', 'yes')
 
 
 def create_app():
     app = Flask(__name__, template_folder='../templates', static_folder='../static')
 
     create_dash_app(app)
+    create_compare_app(app)
 
     return app
 
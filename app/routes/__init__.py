@@ -1,2 +1,11 @@
 from app.routes.routes import weather_blueprint
 from app.routes.errors import errors_blueprint
+from app.routes.metrics import metrics_blueprint
+from app.routes.api import api_blueprint
+
+
+def register_blueprints(app):
+    app.register_blueprint(weather_blueprint)
+    app.register_blueprint(errors_blueprint)
+    app.register_blueprint(metrics_blueprint)
+    app.register_blueprint(api_blueprint)
@@ -0,0 +1,99 @@
+from flask import Blueprint, request, jsonify
+
+from app.core.config import Config
+from app.services import geocode_many, forecast_route
+from app.services.gazetteer import get_gazetteer
+from app.utils import normalize_forecast
+from app.utils.forecast_series import NUMERIC_FIELDS
+
+api_blueprint = Blueprint('api', __name__, url_prefix='/api')
+
+# Ряды по умолчанию для сравнения городов: температура, осадки и ветер
+SERIES_DEFAULT_FIELDS = ['max_temps', 'min_temps', 'precip_probs', 'wind_speeds']
+
+
+def _is_city_list(cities) -> bool:
+    return isinstance(cities, list) and bool(cities) and all(isinstance(city, str) and city.strip()
+                                                             for city in cities)
+
+
+def collect_series(cities: list, days: int, fields: list) -> list:
+    """
+    Ряды прогноза сразу для нескольких городов: названия геокодируются одним пакетом, прогнозы читаются
+    из кэша одним конвейером и запрашиваются параллельно (см. forecast_route).
+    Для каждого города — даты и столбцы fields, для города без прогноза — сообщение error.
+    """
+    items = []
+    for result in forecast_route(cities, days):
+        if not result.ok:
+            items.append({"city": result.point, "error": result.error})
+            continue
+
+        series = normalize_forecast(result.forecast).head(days)
+        items.append({"city": result.point, "coordinates": result.coordinates, **series.to_dict(['dates', *fields])})
+    return items
+
+
+@api_blueprint.route('/geocode', methods=['POST'])
+def geocode():
+    """
+    Пакетное геокодирование: принимает {"cities": [...]} и возвращает координаты в том же порядке.
+    """
+    cities = (request.get_json(silent=True) or {}).get('cities')
+
+    if not _is_city_list(cities):
+        return jsonify({"error": "Нужно передать непустой список названий городов в поле cities."}), 400
+
+    if len(cities) > Config.GEOCODE_MAX_CITIES:
+        return jsonify({"error": f"За один запрос можно передать не более {Config.GEOCODE_MAX_CITIES} городов."}), 400
+
+    results = geocode_many(cities)
+
+    return jsonify({
+        "results": [{"city": city, "coordinates": coordinates} for city, coordinates in zip(cities, results)]
+    })
+
+
+@api_blueprint.route('/cities/suggest', methods=['GET'])
+def suggest_cities():
+    """
+    Подсказки городов по началу названия из локального справочника: GET /api/cities/suggest?q=мос
+    """
+    query = request.args.get('q', '').strip()
+    gazetteer = get_gazetteer()
+
+    if not query or gazetteer is None:
+        return jsonify({"suggestions": []})
+
+    return jsonify({
+        "suggestions": [
+            {"city": entry.name, "coordinates": entry.coordinates}
+            for entry in gazetteer.search_prefix(query, Config.SUGGEST_LIMIT)
+        ]
+    })
+
+
+@api_blueprint.route('/series', methods=['POST'])
+def series():
+    """
+    Ряды прогноза для нескольких городов одним ответом: {"cities": [...], "days": 5, "fields": [...]}.
+    """
+    data = request.get_json(silent=True) or {}
+    cities = data.get('cities')
+    days = data.get('days', 5)
+    fields = data.get('fields', SERIES_DEFAULT_FIELDS)
+
+    if not _is_city_list(cities):
+        return jsonify({"error": "Нужно передать непустой список названий городов в поле cities."}), 400
+
+    if len(cities) > Config.SERIES_MAX_CITIES:
+        return jsonify({"error": f"За один запрос можно передать не более {Config.SERIES_MAX_CITIES} городов."}), 400
+
+    if not isinstance(days, int) or isinstance(days, bool) or not 1 <= days <= 5:
+        return jsonify({"error": "Число дней days должно быть от 1 до 5."}), 400
+
+    if not isinstance(fields, list) or not fields or not all(isinstance(field, str) and field in NUMERIC_FIELDS
+                                                               for field in fields):
+        return jsonify({"error": f"Поле fields может содержать только: {', '.join(NUMERIC_FIELDS)}."}), 400
+
+    return jsonify({"days": days, "series": collect_series(cities, days, fields)})
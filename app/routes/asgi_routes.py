@@ -0,0 +1,157 @@
+import json
+import time
+import traceback
+
+from flask import render_template
+
+from app.asgi import read_body, send_response, query_params, wsgi_environ
+from app.core import flask_app
+from app.core.config import Config
+from app.routes.routes import weather_page_async, route_conditions_async, page_params
+from app.services.city_names import canonical_city_name, normalize_city_name
+from app.services.response_cache import CachedResponse, etag_matches, response_cache
+from app.services.series_store import series_store
+
+# Больше этого тело AJAX-запроса с двумя городами быть не может
+MAX_BODY_SIZE = 64 * 1024
+
+
+def _render(scope, template: str, **context) -> bytes:
+    # Шаблоны используют url_for, поэтому рендерятся в контексте запроса Flask
+    with flask_app.request_context(wsgi_environ(scope)):
+        return render_template(template, **context).encode()
+
+
+async def _send_html(send, status: int, html: bytes):
+    await send_response(send, status, html, 'text/html; charset=utf-8')
+
+
+async def _send_json(send, status: int, payload: dict):
+    await send_response(send, status, flask_app.json.dumps(payload).encode(), 'application/json')
+
+
+def _header(scope, name: bytes) -> str | None:
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _send_cached(scope, send, response: CachedResponse):
+    # Браузер и прокси перепроверяют ответ по ETag; если он не изменился, тело не передаётся.
+    # Для POST If-None-Match не проверяется: 304 допустим только для GET и HEAD (RFC 9110)
+    headers = [('etag', response.etag)]
+    if scope['method'] in ('GET', 'HEAD'):
+        headers.append(('cache-control', f"public, max-age={response.max_age(Config.RESPONSE_MAX_AGE)}"))
+        if etag_matches(_header(scope, b'if-none-match'), response.etag):
+            response_cache.not_modified()
+            return await send_response(send, 304, headers=headers)
+    else:
+        headers.append(('cache-control', 'no-cache'))
+
+    await send_response(send, 200, response.body, response.content_type, headers)
+
+
+def _without_body(send):
+    async def send_headers_only(message):
+        if message['type'] == 'http.response.body':
+            message = dict(message, body=b'')
+        await send(message)
+    return send_headers_only
+
+
+def asgi_view(methods: tuple):
+    """
+    Превращает корутину handler(scope, receive, send) в ASGI-приложение: запросы с другими методами
+    получают 405, необработанное исключение — страницу ошибки 500, как во Flask.
+    На HEAD отправляются только заголовки ответа (с длиной тела, как у GET).
+    """
+    def decorator(handler):
+        async def app(scope, receive, send):
+            if scope['method'] == 'HEAD':
+                send = _without_body(send)
+            if scope['method'] not in methods:
+                return await send_response(send, 405, headers=[('allow', ', '.join(methods))])
+            try:
+                await handler(scope, receive, send)
+            except Exception:
+                traceback.print_exc()
+                await _send_html(send, 500, _render(scope, 'errors/500.html'))
+        return app
+    return decorator
+
+
+@asgi_view(('GET', 'HEAD'))
+async def get_weather(scope, receive, send):
+    """
+    GET /get_weather: страница прогноза для города. Ожидание кэша и внешних API не занимает поток,
+    поэтому один процесс обслуживает много одновременных запросов.
+    """
+    params = query_params(scope)
+    try:
+        days, day_index = page_params(params.get('days', 5), params.get('day_index', 0))
+    except ValueError:
+        return await _send_json(send, 400, {"error": "Параметры days и day_index должны быть целыми числами."})
+
+    # Один и тот же город в разном написании («Moscow», «moscow ») — один ответ в кэше,
+    # поэтому страница собирается для названия, которое зависит только от ключа
+    city_name = canonical_city_name(params.get('city', 'Moscow'))
+    key = ('get_weather', normalize_city_name(city_name), days, day_index)
+    response = response_cache.get(key)
+    # Ряды для графиков Dash хранятся отдельно; если их уже вытеснили, страница собирается заново
+    if response is not None and series_store.get(series_store.make_key(city_name, days)) is not None:
+        return await _send_cached(scope, send, response)
+
+    context, error, dependencies = await weather_page_async(city_name, days, day_index)
+    if error:
+        return await _send_json(send, 500, {"error": error})
+
+    html = _render(scope, 'get_weather.html', **context)
+    await _send_cached(scope, send, response_cache.put(key, html, 'text/html; charset=utf-8', dependencies))
+
+
+@asgi_view(('POST',))
+async def check_route_weather(scope, receive, send):
+    """
+    POST /check_route_weather: погодные условия маршрута для AJAX-запросов.
+    """
+    body = await read_body(receive, MAX_BODY_SIZE)
+    if body is None:
+        return await _send_json(send, 413, {"error": "Слишком большой запрос."})
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return await _send_json(send, 400, {"error": "Тело запроса должно быть JSON-объектом."})
+
+    start_city, end_city = data.get('start_city'), data.get('end_city')
+    # Точки оцениваются по часам прибытия, поэтому ответ действителен только в пределах часа отправления
+    departure = time.time()
+    cacheable = isinstance(start_city, str) and isinstance(end_city, str)
+    if cacheable:
+        # Названия городов попадают в ответ: в кэше не должно остаться написание первого запроса
+        start_city, end_city = canonical_city_name(start_city), canonical_city_name(end_city)
+        key = ('check_route_weather', normalize_city_name(start_city), normalize_city_name(end_city),
+               int(departure // 3600))
+        response = response_cache.get(key)
+        if response is not None:
+            return await _send_cached(scope, send, response)
+
+    payload, status, dependencies = await route_conditions_async(start_city, end_city, departure)
+    if status != 200 or not cacheable:
+        return await _send_json(send, status, payload)
+
+    body = flask_app.json.dumps(payload).encode()
+    await _send_cached(scope, send, response_cache.put(key, body, 'application/json', dependencies))
+
+
+def weather_routes() -> dict:
+    """
+    Асинхронные обработчики, которые веб-сервер обслуживает в event loop вместо Flask-представлений.
+    """
+    return {
+        '/get_weather': get_weather,
+        '/check_route_weather': check_route_weather,
+    }
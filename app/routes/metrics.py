@@ -0,0 +1,52 @@
+import os
+
+import redis
+from flask import Blueprint, jsonify
+
+from app.services.blocking import blocking_bridge
+from app.services.cache import weather_cache, redis_client
+from app.services.gazetteer import get_gazetteer
+from app.services.http_client import upstream
+from app.services.quota import quota_stats
+from app.services.throttle import throttle_stats
+from app.services.refresher import refresher
+from app.services.response_cache import response_cache
+from app.services.singleflight import single_flight
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+
+@metrics_blueprint.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Внутренние счётчики сервиса в формате JSON.
+    """
+    gazetteer = get_gazetteer()
+    return jsonify({
+        "cache": weather_cache.stats(),
+        "responses": response_cache.stats(),
+        "singleflight": single_flight.stats(),
+        "refresher": refresher.stats(),
+        "gazetteer": gazetteer.stats() if gazetteer else None,
+        "quota": quota_stats(),
+        "upstream": upstream.stats(),
+        "throttle": throttle_stats(),
+        "blocking": blocking_bridge.stats()
+    })
+
+
+@metrics_blueprint.route('/healthz', methods=['GET'])
+def healthz():
+    """
+    Проверка работоспособности для балансировщика и супервизора. Без Redis сервис продолжает отвечать
+    (кэш и квоты не работают), поэтому код ответа остаётся 200, а в status пишется degraded.
+    """
+    try:
+        redis_ok = bool(redis_client.ping())
+    except redis.RedisError:
+        redis_ok = False
+    return jsonify({
+        "status": "ok" if redis_ok else "degraded",
+        "redis": redis_ok,
+        "pid": os.getpid()
+    })
@@ -1,12 +1,16 @@
-import datetime
+import asyncio
+import time
 
-from flask import Blueprint, request, jsonify, render_template, redirect, flash, current_app
-from requests import HTTPError
+from flask import Blueprint, Response, request, render_template, redirect, flash
 
+from app.asgi import asgi_scope, call_asgi
 from app.forms import CityRouteForm
-from app.services import get_coordinates_by_city
-from app.services import get_current_weather, get_location_key, get_weather_by_location
-from ..utils import check_bad_weather, translate_weather, extract_time
+from app.services.series_store import series_store
+from app.services import get_coordinates_by_city_async, forecast_route, forecast_route_async, run_sync
+from app.services import get_current_weather_async, get_location_key_async, get_weather_by_location_async
+from app.services import get_hourly_forecast_async, prefetch_weather, weather_dependencies
+from app.services.blocking import blocking_bridge
+from ..utils import translate_weather, normalize_forecast, normalize_hourly, score_route, route_arrivals
 
 weather_blueprint = Blueprint('weather', __name__)
 
@@ -24,58 +28,31 @@ def check_route_weather():
             flash("Необходимо указать начальную и конечную точки маршрута.", "error")
             return redirect('/')
 
-        # Получаем координаты начального и конечного пунктов
-        start_coordinates = get_coordinates_by_city(start_city)
-        end_coordinates = get_coordinates_by_city(end_city)
-
-        # Получаем координаты для каждой промежуточной точки
-        waypoint_forecasts = []
-        for waypoint in waypoints:
-            coordinates = get_coordinates_by_city(waypoint)
-            if not coordinates:
-                flash(f"Не удалось найти координаты для города: {waypoint}", "error")
+        # Прогнозы для всех точек маршрута запрашиваются параллельно
+        results = forecast_route([start_city, *waypoints, end_city], hourly=True)
+        for result in results:
+            if not result.ok:
+                flash(result.error, "error")
                 return redirect('/')
 
-            forecast_data = get_weather_by_location(coordinates['lat'], coordinates['lon'])
-            if not forecast_data:
-                flash(f"Не удалось получить данные о погоде для города: {waypoint}", "error")
-                return redirect('/')
-
-            # Оценка погодных условий
-            condition = check_bad_weather(
-                forecast_data['DailyForecasts'][0]['Temperature']['Maximum']['Value'],
-                forecast_data['DailyForecasts'][0]['Day'].get('Wind', {}).get('Speed', {}).get('Value', 0),
-                forecast_data['DailyForecasts'][0]['Day'].get('PrecipitationProbability', 0)
-            )
-
-            waypoint_forecasts.append({
-                'city': waypoint,
-                'coord': coordinates,
-                'forecast': forecast_data['DailyForecasts'][0],
-                'condition': "неблагоприятные" if condition == 'bad' else "благоприятные"
-            })
-
-        # Получаем прогнозы для начального и конечного пунктов
-        start_forecast = get_weather_by_location(start_coordinates['lat'], start_coordinates['lon'])
-        end_forecast = get_weather_by_location(end_coordinates['lat'], end_coordinates['lon'])
-
-        if not start_forecast or not end_forecast:
-            flash("Не удалось получить данные о погоде для начальной или конечной точки.", "error")
-            return redirect('/')
-
-        start_condition = check_bad_weather(
-            start_forecast['DailyForecasts'][0]['Temperature']['Maximum']['Value'],
-            start_forecast['DailyForecasts'][0]['Day'].get('Wind', {}).get('Speed', {}).get('Value', 0),
-            start_forecast['DailyForecasts'][0]['Day'].get('PrecipitationProbability', 0)
-        )
-        start_condition = "неблагоприятные" if start_condition == 'bad' else "благоприятные"
-
-        end_condition = check_bad_weather(
-            end_forecast['DailyForecasts'][0]['Temperature']['Maximum']['Value'],
-            end_forecast['DailyForecasts'][0]['Day'].get('Wind', {}).get('Speed', {}).get('Value', 0),
-            end_forecast['DailyForecasts'][0]['Day'].get('PrecipitationProbability', 0)
-        )
-        end_condition = "неблагоприятные" if end_condition == 'bad' else "благоприятные"
+        # Оценка погодных условий сразу для всех точек маршрута в часы прибытия в них
+        bad, _, _, _ = _score_route(results, time.time())
+        conditions = ["неблагоприятные" if is_bad else "благоприятные" for is_bad in bad]
+
+        start_result, *waypoint_results, end_result = results
+        start_condition, *waypoint_conditions, end_condition = conditions
+        start_coordinates, start_forecast = start_result.coordinates, start_result.forecast
+        end_coordinates, end_forecast = end_result.coordinates, end_result.forecast
+
+        waypoint_forecasts = [
+            {
+                'city': result.point,
+                'coord': result.coordinates,
+                'forecast': result.forecast['DailyForecasts'][0],
+                'condition': condition
+            }
+            for result, condition in zip(waypoint_results, waypoint_conditions)
+        ]
 
         # шаблон с результатами прогноза для каждого пункта маршрута
         return render_template(
@@ -94,173 +71,163 @@ def check_route_weather():
     return render_template('index.html')
 
 
-@weather_blueprint.route('/get_weather', methods=['GET'])
-def get_weather():
-    city_name = request.args.get('city', 'Moscow')
-    days = int(request.args.get('days', 5))
-    day_index = int(request.args.get('day_index', 0))
-
-    try:
-        coordinates = get_coordinates_by_city(city_name)
-        if not coordinates:
-            return jsonify({"error": "Не удалось найти координаты для указанного города."}), 500
-
-        lat, lon = coordinates['lat'], coordinates['lon']
-        location_key = get_location_key(lat, lon)
-        if not location_key:
-            return jsonify({"error": "Не удалось получить location_key для указанного города."}), 500
-
-        forecast_data = get_weather_by_location(lat, lon, days=days)
-        if not forecast_data or 'DailyForecasts' not in forecast_data:
-            return jsonify({"error": "Не удалось получить данные о прогнозе погоды."}), 500
-
-        current_weather_data = get_current_weather(location_key)
-        if not current_weather_data:
-            return jsonify({"error": "Не удалось получить текущие данные о погоде."}), 500
-
-        current_temperature = current_weather_data[0]['Temperature']['Metric']['Value'] if isinstance(
-            current_weather_data, list) else current_weather_data['Temperature']['Metric']['Value']
-
-        # Инициализируем списки для данных
-        dates, max_temps, min_temps, day_real_feels, night_real_feels = [], [], [], [], []
-        day_humidities, night_humidities, day_clouds, night_clouds = [], [], [], []
-        wind_speeds, precip_probs, precip_types = [], [], []
-        day_min_humidities, day_avg_humidities, day_max_humidities = [], [], []
-        night_min_humidities, night_avg_humidities, night_max_humidities = [], [], []
-        sunrise_times, sunset_times = [], []
-
-        for day_forecast in forecast_data['DailyForecasts'][:days]:
-            # Форматируем дату и добавляем в список один раз
-            date = day_forecast.get('Date', '')
-            formatted_date = datetime.datetime.strptime(date, '%Y-%m-%dT%H:%M:%S%z').strftime('%d.%m.%Y')
-            dates.append(formatted_date)
-
-            # Температуры
-            max_temps.append(day_forecast['Temperature']['Maximum']['Value'])
-            min_temps.append(day_forecast['Temperature']['Minimum']['Value'])
-
-            # RealFeel температуры
-            day_real_feels.append(day_forecast['RealFeelTemperature']['Maximum']['Value'])
-            night_real_feels.append(day_forecast['RealFeelTemperature']['Minimum']['Value'])
-
-            # Влажность
-            day_min_humidities.append(day_forecast['Day']['RelativeHumidity'].get('Minimum', 0))
-            day_avg_humidities.append(day_forecast['Day']['RelativeHumidity'].get('Average', 0))
-            day_max_humidities.append(day_forecast['Day']['RelativeHumidity'].get('Maximum', 0))
-            night_min_humidities.append(day_forecast['Night']['RelativeHumidity'].get('Minimum', 0))
-            night_avg_humidities.append(day_forecast['Night']['RelativeHumidity'].get('Average', 0))
-            night_max_humidities.append(day_forecast['Night']['RelativeHumidity'].get('Maximum', 0))
-
-            # Другие параметры
-            day_clouds.append(day_forecast.get('Day', {}).get('CloudCover', 0))
-            night_clouds.append(day_forecast.get('Night', {}).get('CloudCover', 0))
-            wind_speeds.append(day_forecast['Day'].get('Wind', {}).get('Speed', {}).get('Value', 0))
-            precip_probs.append(day_forecast['Day'].get('PrecipitationProbability', 0))
-            precip_types.append(day_forecast['Day'].get('PrecipitationType', 'None'))
-            sunrise_times.append(extract_time(day_forecast['Sun'].get('Rise', 'Неизвестно')))
-            sunset_times.append(extract_time(day_forecast['Sun'].get('Set', 'Неизвестно')))
-
-        # Кэшируем данные для Dash
-        current_app.config['DASH_DATA'] = {
-            "dates": dates,
-            "max_temps": max_temps,
-            "min_temps": min_temps,
-            "day_real_feels": day_real_feels,
-            "night_real_feels": night_real_feels,
-            "wind_speeds": wind_speeds,
-            "precip_probs": precip_probs,
-            "precip_types": precip_types,
-            "day_humidities": day_humidities,
-            "night_humidities": night_humidities,
-            "day_clouds": day_clouds,
-            "night_clouds": night_clouds,
-            "day_min_humidities": day_min_humidities,
-            "day_avg_humidities": day_avg_humidities,
-            "day_max_humidities": day_max_humidities,
-            "night_min_humidities": night_min_humidities,
-            "night_avg_humidities": night_avg_humidities,
-            "night_max_humidities": night_max_humidities,
-            "sunrise_times": sunrise_times,
-            "sunset_times": sunset_times,
-        }
+def _score_route(results, departure: float):
+    # Оценка точек маршрута (PointForecast) по часам прибытия: bad, risk, оценена ли точка по часам
+    # и подпись часа прибытия по местному времени точки
+    hourly = [normalize_hourly(result.hourly) for result in results]
+    arrivals = route_arrivals([result.coordinates for result in results], departure)
+    bad, risk, by_hour = score_route([normalize_forecast(result.forecast) for result in results], hourly, arrivals)
+    labels = [series.window(arrival, 1).labels[0] if scored else None
+              for series, arrival, scored in zip(hourly, arrivals, by_hour)]
+    return bad, risk, by_hour, labels
 
-        return render_template(
-            'get_weather.html',
-            city=city_name,
-            current_temperature=current_temperature,
-            temperature_max=max_temps[day_index],
-            temperature_min=min_temps[day_index],
-            real_feel=day_real_feels[day_index],
-            wind_speed=wind_speeds[day_index],
-            day_humidity={
-                'Minimum': day_min_humidities[day_index],
-                'Average': day_avg_humidities[day_index],
-                'Maximum': day_max_humidities[day_index]
-            },
-            night_humidity={
-                'Minimum': night_min_humidities[day_index],
-                'Average': night_avg_humidities[day_index],
-                'Maximum': night_max_humidities[day_index]
-            },
-            cloud_cover=day_clouds[day_index],
-            precipitation_probability=precip_probs[day_index],
-            precipitation_type=translate_weather(precip_types[day_index]),
-            icon_phrase=forecast_data['DailyForecasts'][day_index]['Day'].get('IconPhrase', 'Unknown'),
-            sunrise=sunrise_times[day_index],
-            sunset=sunset_times[day_index],
-            day_index=day_index,
-            date=dates[day_index],
-            days=days,
-        )
 
-    except HTTPError as e:
-        return render_template(f'errors/{e.response.status_code}.html'), e.response.status_code
+def page_params(days, day_index) -> tuple[int, int]:
+    """
+    Число дней (1–5) и номер дня (в пределах days) страницы прогноза из параметров запроса.
+    ValueError — параметр не целое число.
+    """
+    days = min(max(int(days), 1), 5)
+    return days, min(max(int(day_index), 0), days - 1)
 
 
-@weather_blueprint.route('/check_route_weather', methods=['POST'])
-def check_route_weather_ajax():
+async def weather_page_async(city_name: str, days: int, day_index: int) -> tuple[dict | None, str | None, list]:
     """
-    Эндпоинт для проверки погодных условий маршрута через AJAX.
-    Возвращает JSON с погодными условиями для начальной и конечной точек.
+    Данные страницы прогноза для города: контекст шаблона get_weather.html или сообщение об ошибке,
+    а также записи кэша, из которых собрана страница (для кэша ответов).
+    Используется ASGI-обработчиком /get_weather.
+    """
+    coordinates = await get_coordinates_by_city_async(city_name)
+    if not coordinates:
+        return None, "Не удалось найти координаты для указанного города.", []
+
+    lat, lon = coordinates['lat'], coordinates['lon']
+    # Все записи кэша для этой страницы читаются из Redis одним конвейером
+    await blocking_bridge.run(prefetch_weather, [(lat, lon)], days, True, True)
+
+    location_key = await get_location_key_async(lat, lon)
+    if not location_key:
+        return None, "Не удалось получить location_key для указанного города.", []
+
+    forecast_data, current_weather_data, hourly_data = await asyncio.gather(
+        get_weather_by_location_async(lat, lon, days),
+        get_current_weather_async(location_key),
+        get_hourly_forecast_async(lat, lon)
+    )
+    if not forecast_data or 'DailyForecasts' not in forecast_data:
+        return None, "Не удалось получить данные о прогнозе погоды.", []
+
+    if not current_weather_data:
+        return None, "Не удалось получить текущие данные о погоде.", []
+
+    current_temperature = current_weather_data[0]['Temperature']['Metric']['Value'] if isinstance(
+        current_weather_data, list) else current_weather_data['Temperature']['Metric']['Value']
+
+    # Ответ разбирается один раз в колоночные ряды, срез по дням не копирует данные
+    series = normalize_forecast(forecast_data).head(days)
+
+    # Сохраняем ряды для Dash под ключом этого запроса, ключ передаётся в iframe через URL
+    series_key = series_store.make_key(city_name, days)
+    # Почасовой прогноз (если доступен) показывается на отдельных графиках
+    series_store.put(series_key, series, normalize_hourly(hourly_data))
+
+    day = series.day(day_index)
+
+    return {
+        'city': city_name,
+        'current_temperature': current_temperature,
+        'temperature_max': day['max_temps'],
+        'temperature_min': day['min_temps'],
+        'real_feel': day['day_real_feels'],
+        'wind_speed': day['wind_speeds'],
+        'day_humidity': {
+            'Minimum': day['day_min_humidities'],
+            'Average': day['day_avg_humidities'],
+            'Maximum': day['day_max_humidities']
+        },
+        'night_humidity': {
+            'Minimum': day['night_min_humidities'],
+            'Average': day['night_avg_humidities'],
+            'Maximum': day['night_max_humidities']
+        },
+        'cloud_cover': day['day_clouds'],
+        'precipitation_probability': day['precip_probs'],
+        'precipitation_type': translate_weather(day['precip_types']),
+        'icon_phrase': day['icon_phrases'],
+        'sunrise': day['sunrise_times'],
+        'sunset': day['sunset_times'],
+        'day_index': day_index,
+        'date': day['dates'],
+        'days': days,
+        'series_key': series_key,
+    }, None, weather_dependencies(lat, lon, days, location_key, hourly=hourly_data is not None)
+
+
+async def route_conditions_async(start_city, end_city, departure: float | None = None) -> tuple[dict, int, list]:
+    """
+    Погодные условия начальной и конечной точек маршрута при отправлении в departure (по умолчанию сейчас):
+    JSON-ответ, HTTP-статус и записи кэша, из которых собран ответ.
+    Используется ASGI-обработчиком /check_route_weather.
     """
-    print(1)
-    start_city = request.json.get('start_city')
-    end_city = request.json.get('end_city')
-
     # Проверка наличия городов
     if not start_city or not end_city:
-        return jsonify({"error": "Оба города должны быть указаны."}), 400
-
-    # Получаем координаты
-    start_coordinates = get_coordinates_by_city(start_city)
-    end_coordinates = get_coordinates_by_city(end_city)
-
-    if not start_coordinates or not end_coordinates:
-        return jsonify({"error": "Не удалось найти координаты для указанных городов."}), 500
+        return {"error": "Оба города должны быть указаны."}, 400, []
+    departure = time.time() if departure is None else departure
 
-    # Получаем прогноз погоды
-    start_forecast_data = get_weather_by_location(start_coordinates['lat'], start_coordinates['lon'])
-    end_forecast_data = get_weather_by_location(end_coordinates['lat'], end_coordinates['lon'])
+    # Получаем координаты, дневные и почасовые прогнозы для обеих точек параллельно
+    start_result, end_result = await forecast_route_async([start_city, end_city], hourly=True)
 
-    if not start_forecast_data or not end_forecast_data:
-        return jsonify({"error": "Не удалось получить данные о погоде."}), 500
+    if not start_result.coordinates or not end_result.coordinates:
+        return {"error": "Не удалось найти координаты для указанных городов."}, 500, []
 
-    # Оцениваем погодные условия
-    start_forecast = start_forecast_data['DailyForecasts'][0]
-    start_temp = (start_forecast['Temperature']['Maximum']['Value'] - 32) * 5.0 / 9.0
-    start_wind = start_forecast['Day'].get('Wind', {}).get('Speed', {}).get('Value', 0)
-    start_precip = start_forecast['Day'].get('PrecipitationProbability', 0)
-    start_condition = check_bad_weather(start_temp, start_wind, start_precip)
+    if not start_result.forecast or not end_result.forecast:
+        return {"error": "Не удалось получить данные о погоде."}, 500, []
 
-    end_forecast = end_forecast_data['DailyForecasts'][0]
-    end_temp = (end_forecast['Temperature']['Maximum']['Value'] - 32) * 5.0 / 9.0
-    end_wind = end_forecast['Day'].get('Wind', {}).get('Speed', {}).get('Value', 0)
-    end_precip = end_forecast['Day'].get('PrecipitationProbability', 0)
-    end_condition = check_bad_weather(end_temp, end_wind, end_precip)
+    # Оцениваем погодные условия обеих точек за один проход: в час отправления и в час прибытия
+    bad, risk, _, (start_time, end_time) = _score_route([start_result, end_result], departure)
+    start_condition, end_condition = ['bad' if is_bad else 'good' for is_bad in bad]
 
-    return jsonify({
+    return {
         "start_city": start_city,
         "start_weather_condition": start_condition,
         "end_city": end_city,
-        "end_weather_condition": end_condition
-    })
+        "end_weather_condition": end_condition,
+        "start_risk_score": round(float(risk[0]), 3),
+        "end_risk_score": round(float(risk[1]), 3),
+        "start_time": start_time,
+        "end_time": end_time
+    }, 200, [dependency for result in (start_result, end_result)
+             for dependency in weather_dependencies(result.coordinates['lat'], result.coordinates['lon'],
+                                                    hourly=result.hourly is not None)]
+
+
+def _delegate(handler_name: str) -> Response:
+    # Тот же ASGI-обработчик, что и на веб-сервере: кэш ответов, ETag, HEAD и коды ошибок не расходятся.
+    # asgi_routes импортирует этот модуль, поэтому импортируется здесь
+    from app.routes import asgi_routes
+
+    scope = asgi_scope(request.environ)
+    if scope['method'] == 'HEAD':
+        # На HEAD Werkzeug сам отбрасывает тело, сохраняя его длину в заголовках
+        scope['method'] = 'GET'
+    handler = getattr(asgi_routes, handler_name)
+    status, headers, body = run_sync(call_asgi(handler, scope, request.get_data()))
+    return Response(body, status, headers)
+
+
+@weather_blueprint.route('/get_weather', methods=['GET'])
+def get_weather():
+    """
+    Страница прогноза для города. Обслуживает асинхронный обработчик asgi_routes.get_weather:
+    веб-сервер передаёт ему запрос напрямую, а представление — при запуске Flask без диспетчера путей.
+    """
+    return _delegate('get_weather')
+
+
+@weather_blueprint.route('/check_route_weather', methods=['POST'])
+def check_route_weather_ajax():
+    """
+    Погодные условия маршрута для AJAX-запросов (JSON). Обслуживает асинхронный обработчик
+    asgi_routes.check_route_weather, как и get_weather.
+    """
+    return _delegate('check_route_weather')
@@ -1,2 +1,9 @@
 from app.services.weather_service import get_weather_by_location, get_current_weather, get_location_key
-from app.services.geocoding_service import get_coordinates_by_city
+from app.services.weather_service import get_weather_by_location_async, get_current_weather_async, \
+    get_location_key_async
+from app.services.weather_service import get_hourly_forecast, get_hourly_forecast_async
+from app.services.weather_service import prefetch_weather, weather_dependencies
+from app.services.geocoding_service import get_coordinates_by_city, get_coordinates_by_city_async
+from app.services.geocoding_service import geocode_many, geocode_many_async
+from app.services.http_client import upstream, run_sync
+from app.services.route_forecast import forecast_route, forecast_route_async, PointForecast
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import Config
+
+
+class BlockingPoolOverloaded(RuntimeError):
+    """
+    Свободное место в пуле не появилось за queue_timeout секунд.
+    """
+
+
+class BlockingBridge:
+    """
+    Ограниченный пул потоков для синхронных вызовов (Redis, синхронный слой сервисов) из асинхронного кода,
+    чтобы они не останавливали event loop бота и веб-сервера.
+
+    Одновременно выполняются не больше max_workers вызовов и ещё max_queue ждут в очереди пула.
+    Остальные вызывающие корутины приостанавливаются, не занимая потоков (обратное давление),
+    а если место не освободилось за queue_timeout секунд, получают BlockingPoolOverloaded.
+    Пул общий для всех event loop процесса. stats() показывает, сколько вызовы ждали начала выполнения.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, queue_timeout: float | None = None):
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='blocking')
+        self._in_flight = 0
+        self._waiters = deque()  # (event loop, future) корутин, ждущих места в пуле
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'rejected': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Выполняет fn(*args, **kwargs) в пуле потоков и возвращает результат.
+        """
+        submitted = time.monotonic()
+        await self._acquire()
+        try:
+            context = contextvars.copy_context()
+
+            def call():
+                self._record_wait(time.monotonic() - submitted)
+                return context.run(fn, *args, **kwargs)
+
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self._release()
+
+    async def _acquire(self):
+        with self._lock:
+            if self._in_flight < self.capacity and not self._waiters:
+                self._in_flight += 1
+                return
+            item = (asyncio.get_running_loop(), asyncio.get_running_loop().create_future())
+            self._waiters.append(item)
+
+        try:
+            await asyncio.wait_for(item[1], self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Место принадлежит корутине, если _release уже убрал её из очереди, даже если future не успел завершиться
+            with self._lock:
+                owned = item not in self._waiters
+                if not owned:
+                    self._waiters.remove(item)
+                    if isinstance(e, asyncio.TimeoutError):
+                        self._stats['rejected'] += 1
+
+            if isinstance(e, asyncio.CancelledError):
+                if owned:
+                    self._release()
+                raise
+            if not owned:
+                raise BlockingPoolOverloaded(f"Пул блокирующих вызовов занят дольше {self.queue_timeout} с") from e
+
+    def _release(self):
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._in_flight -= 1
+                    return
+                # Место сразу передаётся следующему ожидающему, счётчик занятых мест не меняется
+                loop, waiter = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._wake, waiter)
+                return
+            except RuntimeError:
+                # Event loop ожидающего уже закрыт: место достаётся следующему в очереди
+                continue
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _record_wait(self, wait: float):
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['wait_total'] += wait
+            self._stats['wait_max'] = max(self._stats['wait_max'], wait)
+
+    def stats(self) -> dict:
+        """
+        Число вызовов и отказов, занятые места и ожидающие корутины, среднее и максимальное ожидание (мс).
+        """
+        with self._lock:
+            calls = self._stats['calls']
+            return {
+                'calls': calls,
+                'rejected': self._stats['rejected'],
+                'in_flight': self._in_flight,
+                'waiting': len(self._waiters),
+                'avg_wait_ms': round(self._stats['wait_total'] / calls * 1000, 3) if calls else 0.0,
+                'max_wait_ms': round(self._stats['wait_max'] * 1000, 3),
+            }
+
+
+blocking_bridge = BlockingBridge(
+    max_workers=Config.BLOCKING_POOL_SIZE,
+    max_queue=Config.BLOCKING_QUEUE_LIMIT,
+    queue_timeout=Config.BLOCKING_QUEUE_TIMEOUT or None
+)
@@ -0,0 +1,353 @@
+import threading
+import time
+from collections import defaultdict, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import redis
+
+from app.core.config import Config
+from app.services.blocking import blocking_bridge
+from app.services.codec import encode_entry, decode_entry, project, FORECAST_FIELDS, CURRENT_WEATHER_FIELDS
+
+redis_client = redis.Redis(
+    host=Config.REDIS_HOST,
+    port=Config.REDIS_PORT,
+    db=Config.REDIS_DB,
+    socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT
+)
+
+
+# Версия формата записей в Redis, входит в ключ, чтобы старые записи не читались новым кодом
+CACHE_SCHEMA_VERSION = 3
+
+# Метка «ключа нет в Redis», которую prefetch оставляет в локальном уровне для следующего чтения
+_MISSING = object()
+_MISSING_TTL = 5
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Правило кэширования для одного типа данных: префикс ключа в Redis, время жизни свежей записи
+    и окно stale_ttl, в течение которого устаревшая запись ещё отдаётся, пока она обновляется в фоне.
+    fields — какие поля ответа API сохранять (см. codec.project), None — значение целиком.
+    """
+    prefix: str
+    ttl: int
+    stale_ttl: int = 0
+    fields: dict | None = field(default=None, compare=False, hash=False)
+
+    @property
+    def storage_ttl(self) -> int:
+        return self.ttl + self.stale_ttl
+
+    def key(self, key: str) -> str:
+        return f"{self.prefix}:v{CACHE_SCHEMA_VERSION}:{key}"
+
+
+COORDINATES = CachePolicy('coordinates', Config.CACHE_TTL_COORDINATES)
+LOCATION_KEY = CachePolicy('location_key', Config.CACHE_TTL_LOCATION_KEY)
+FORECAST = CachePolicy('forecast', Config.CACHE_TTL_FORECAST, Config.CACHE_STALE_TTL_FORECAST, FORECAST_FIELDS)
+# Почасовой прогноз хранится упакованным (codec.pack_hourly), поэтому поля не отбираются
+HOURLY_FORECAST = CachePolicy('hourly_forecast', Config.CACHE_TTL_HOURLY_FORECAST,
+                              Config.CACHE_STALE_TTL_HOURLY_FORECAST)
+CURRENT_WEATHER = CachePolicy('current_weather', Config.CACHE_TTL_CURRENT_WEATHER,
+                              Config.CACHE_STALE_TTL_CURRENT_WEATHER, CURRENT_WEATHER_FIELDS)
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """
+    Запись кэша вместе со временем получения данных из внешнего API (unix time).
+    """
+    value: Any
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def is_fresh(self, policy: CachePolicy) -> bool:
+        return self.age < policy.ttl
+
+
+class LocalCache:
+    """
+    Ограниченный по размеру LRU-кэш в памяти процесса с временем жизни записей.
+    Хранит уже разобранные объекты, поэтому возвращённые значения нельзя изменять.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        if ttl <= 0 or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class WeatherCache:
+    """
+    Двухуровневый кэш ответов внешних API: LRU в памяти процесса перед Redis.
+    В Redis записи хранятся в двоичном виде (msgpack + zlib, см. codec) вместе со временем получения,
+    только с нужными приложению полями; срок хранения берётся из CachePolicy.
+    Запись в локальном уровне живёт не дольше, чем в Redis, и не дольше local_ttl,
+    поэтому результаты совпадают с Redis.
+
+    При bypass=True кэш не читается и не пишется (режим отладки), но счётчики продолжают работать.
+    Ошибки Redis не прерывают запрос: чтение считается промахом, запись пропускается.
+    """
+
+    def __init__(self, client: redis.Redis, local: LocalCache, local_ttl: int, bypass: bool = False):
+        self.client = client
+        self.local = local
+        self.local_ttl = local_ttl
+        self.bypass = bypass
+        self._stats = defaultdict(lambda: {'local_hits': 0, 'redis_hits': 0, 'stale_hits': 0, 'misses': 0,
+                                           'errors': 0, 'prefetched': 0})
+        self._lock = threading.Lock()
+
+    def _count(self, policy: CachePolicy, counter: str):
+        with self._lock:
+            self._stats[policy.prefix][counter] += 1
+
+    def lookup(self, policy: CachePolicy, key: str) -> CacheEntry | None:
+        """
+        Возвращает запись кэша, в том числе устаревшую, но ещё не удалённую из Redis.
+        """
+        if self.bypass:
+            self._count(policy, 'misses')
+            return None
+
+        full_key = policy.key(key)
+        entry = self.local.get(full_key)
+        if entry is _MISSING:
+            # prefetch только что не нашёл ключ в Redis; метка действует на одно чтение
+            self.local.delete(full_key)
+            self._count(policy, 'misses')
+            return None
+
+        if entry is not None:
+            self._count(policy, 'local_hits')
+        else:
+            try:
+                # Значение и оставшееся время жизни за один round trip
+                raw, ttl = self.client.pipeline().get(full_key).ttl(full_key).execute()
+            except redis.RedisError:
+                self._count(policy, 'errors')
+                raw = None
+
+            if raw is None:
+                self._count(policy, 'misses')
+                return None
+
+            self._count(policy, 'redis_hits')
+            fetched_at, value = decode_entry(raw)
+            entry = CacheEntry(value, fetched_at)
+            self.local.set(full_key, entry, min(ttl if ttl > 0 else policy.storage_ttl, self.local_ttl))
+
+        if not entry.is_fresh(policy):
+            self._count(policy, 'stale_hits')
+        return entry
+
+    async def lookup_async(self, policy: CachePolicy, key: str) -> CacheEntry | None:
+        """
+        lookup для асинхронного кода: локальный уровень проверяется сразу,
+        а чтение из Redis выполняется в пуле blocking_bridge, не останавливая event loop.
+        """
+        if self.bypass or self.local.get(policy.key(key)) is not None:
+            return self.lookup(policy, key)
+        return await blocking_bridge.run(self.lookup, policy, key)
+
+    def get(self, policy: CachePolicy, key: str):
+        """
+        Возвращает значение только свежей записи.
+        """
+        entry = self.lookup(policy, key)
+        if entry is None or not entry.is_fresh(policy):
+            return None
+        return entry.value
+
+    def set(self, policy: CachePolicy, key: str, value):
+        """
+        Сохраняет значение и возвращает его в том виде, в каком оно теперь лежит в кэше (только поля policy.fields).
+        """
+        value = project(value, policy.fields)
+        if self.bypass:
+            return value
+
+        full_key = policy.key(key)
+        entry = CacheEntry(value, time.time())
+        self.local.set(full_key, entry, min(policy.storage_ttl, self.local_ttl))
+        try:
+            self.client.setex(full_key, policy.storage_ttl, encode_entry(entry.fetched_at, value))
+        except redis.RedisError:
+            self._count(policy, 'errors')
+        return value
+
+    async def set_async(self, policy: CachePolicy, key: str, value):
+        """
+        set для асинхронного кода: запись в Redis выполняется в пуле blocking_bridge.
+        """
+        return await blocking_bridge.run(self.set, policy, key, value)
+
+    def get_many(self, policy: CachePolicy, keys) -> dict:
+        """
+        Свежие значения для нескольких ключей: сначала локальный уровень, остальные — одним MGET в Redis.
+        Возвращает словарь только с найденными ключами.
+        """
+        if self.bypass:
+            for _ in keys:
+                self._count(policy, 'misses')
+            return {}
+
+        found, missing = {}, []
+        for key in keys:
+            entry = self.local.get(policy.key(key))
+            if entry is not None and entry is not _MISSING and entry.is_fresh(policy):
+                self._count(policy, 'local_hits')
+                found[key] = entry.value
+            else:
+                missing.append(key)
+
+        if not missing:
+            return found
+
+        full_keys = [policy.key(key) for key in missing]
+        try:
+            # MGET и оставшиеся TTL всех ключей за один round trip
+            pipeline = self.client.pipeline()
+            pipeline.mget(full_keys)
+            for full_key in full_keys:
+                pipeline.ttl(full_key)
+            raw_values, *ttls = pipeline.execute()
+        except redis.RedisError:
+            self._count(policy, 'errors')
+            raw_values, ttls = [None] * len(missing), []
+
+        for key, full_key, raw, ttl in zip(missing, full_keys, raw_values, ttls or [0] * len(missing)):
+            if raw is None:
+                self._count(policy, 'misses')
+                continue
+
+            fetched_at, value = decode_entry(raw)
+            entry = CacheEntry(value, fetched_at)
+            if not entry.is_fresh(policy):
+                self._count(policy, 'stale_hits')
+                continue
+
+            self._count(policy, 'redis_hits')
+            self.local.set(full_key, entry, min(ttl if ttl > 0 else policy.storage_ttl, self.local_ttl))
+            found[key] = value
+
+        return found
+
+    def set_many(self, policy: CachePolicy, values: dict):
+        """
+        Записывает несколько значений одним конвейером SETEX.
+        """
+        if self.bypass or not values:
+            return
+
+        fetched_at = time.time()
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            full_key = policy.key(key)
+            value = project(value, policy.fields)
+            self.local.set(full_key, CacheEntry(value, fetched_at), min(policy.storage_ttl, self.local_ttl))
+            pipeline.setex(full_key, policy.storage_ttl, encode_entry(fetched_at, value))
+        try:
+            pipeline.execute()
+        except redis.RedisError:
+            self._count(policy, 'errors')
+
+    def peek(self, policy: CachePolicy, key: str) -> CacheEntry | None:
+        """
+        Запись из локального уровня без обращения к Redis и без учёта в счётчиках.
+        """
+        entry = self.local.get(policy.key(key))
+        return entry if isinstance(entry, CacheEntry) else None
+
+    def prefetch(self, items):
+        """
+        Загружает в локальный уровень сразу все записи, которые понадобятся запросу: items — пары (policy, key),
+        ключи разных типов читаются из Redis одним конвейером GET + TTL. Последующие lookup/get по этим ключам
+        обслуживаются из памяти (в том числе промахи: повторно в Redis за ними не ходим).
+        Попадания считаются при этих последующих чтениях, здесь — только число загруженных записей.
+        """
+        if self.bypass:
+            return
+
+        pending = [(policy, policy.key(key)) for policy, key in items if self.local.get(policy.key(key)) is None]
+        if not pending:
+            return
+
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for _, full_key in pending:
+                pipeline.get(full_key).ttl(full_key)
+            replies = pipeline.execute()
+        except redis.RedisError:
+            self._count(pending[0][0], 'errors')
+            return
+
+        for (policy, full_key), raw, ttl in zip(pending, replies[::2], replies[1::2]):
+            if raw is None:
+                self.local.set(full_key, _MISSING, _MISSING_TTL)
+                continue
+
+            fetched_at, value = decode_entry(raw)
+            self._count(policy, 'prefetched')
+            self.local.set(full_key, CacheEntry(value, fetched_at),
+                           min(ttl if ttl > 0 else policy.storage_ttl, self.local_ttl))
+
+    def stats(self) -> dict:
+        """
+        Счётчики попаданий по уровням кэша и промахов по типам данных.
+        """
+        with self._lock:
+            stats = {prefix: dict(counters) for prefix, counters in self._stats.items()}
+        stats['local_size'] = len(self.local)
+        return stats
+
+
+weather_cache = WeatherCache(
+    redis_client,
+    LocalCache(Config.LOCAL_CACHE_SIZE),
+    local_ttl=Config.LOCAL_CACHE_TTL,
+    bypass=Config.CACHE_BYPASS
+)
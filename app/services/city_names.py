@@ -0,0 +1,20 @@
+from app.services.gazetteer import get_gazetteer
+
+
+def normalize_city_name(city_name: str) -> str:
+    """
+    Ключ города для кэша: без лишних пробелов и без учёта регистра.
+    """
+    return ' '.join(city_name.split()).lower()
+
+
+def canonical_city_name(city_name: str) -> str:
+    """
+    Название города для показа: из локального справочника, а если города там нет — ключ города
+    с заглавными буквами слов. Зависит только от ключа, поэтому все написания одного города
+    («Moscow», «moscow ») дают одинаковые страницы в кэше ответов.
+    """
+    key = normalize_city_name(city_name)
+    gazetteer = get_gazetteer()
+    entry = gazetteer.lookup(key) if gazetteer is not None else None
+    return entry.name if entry is not None else key.title()
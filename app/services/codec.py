@@ -0,0 +1,140 @@
+import zlib
+
+import msgpack
+import numpy as np
+
+# Первый байт записи в Redis: способ упаковки
+_PLAIN = b'\x00'
+_ZLIB = b'\x01'
+
+# Короткие значения (координаты, ключи местоположений) не сжимаются: zlib их только увеличит
+COMPRESS_MIN_SIZE = 256
+COMPRESS_LEVEL = 6
+
+# Поля ответов AccuWeather, которые использует приложение (ForecastSeries, шаблоны, бот).
+# Всё остальное отбрасывается перед записью в кэш.
+_VALUE = {'Value': True}
+_HUMIDITY = {'Minimum': True, 'Average': True, 'Maximum': True}
+
+FORECAST_FIELDS = {
+    'DailyForecasts': {
+        'Date': True,
+        'EpochDate': True,
+        'Sun': {'Rise': True, 'Set': True},
+        'Temperature': {'Minimum': _VALUE, 'Maximum': _VALUE},
+        'RealFeelTemperature': {'Minimum': _VALUE, 'Maximum': _VALUE},
+        'Day': {
+            'IconPhrase': True,
+            'PrecipitationProbability': True,
+            'PrecipitationType': True,
+            'PrecipitationIntensity': True,
+            'CloudCover': True,
+            'Wind': {'Speed': _VALUE},
+            'RelativeHumidity': _HUMIDITY,
+        },
+        'Night': {
+            'CloudCover': True,
+            'RelativeHumidity': _HUMIDITY,
+        },
+    }
+}
+
+CURRENT_WEATHER_FIELDS = {
+    'EpochTime': True,
+    'WeatherText': True,
+    'Temperature': {'Metric': _VALUE},
+}
+
+# Числовые поля почасового прогноза: имя ряда и путь в ответе AccuWeather.
+# Порядок задаёт строки матрицы значений в упакованной записи (pack_hourly).
+HOURLY_FIELDS = {
+    'temps': ('Temperature', 'Value'),
+    'real_feels': ('RealFeelTemperature', 'Value'),
+    'wind_speeds': ('Wind', 'Speed', 'Value'),
+    'precip_probs': ('PrecipitationProbability',),
+    'humidities': ('RelativeHumidity',),
+    'clouds': ('CloudCover',),
+}
+HOUR = 3600
+
+
+def _dig(data, path: tuple):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _utc_offset_minutes(value: str) -> int:
+    # '2024-12-01T08:00:00+03:00' -> 180
+    if len(value) < 25 or value[19] not in '+-':
+        return 0
+    minutes = int(value[20:22]) * 60 + int(value[23:25])
+    return minutes if value[19] == '+' else -minutes
+
+
+def pack_hourly(hours: list) -> dict | None:
+    """
+    Почасовой прогноз AccuWeather в компактном виде для кэша: время первого часа (unix time), шаг,
+    смещение местного времени в минутах, матрица float32 (ряды HOURLY_FIELDS × часы) в байтах
+    и интенсивность осадков по часам. Пропущенные значения и часы — NaN.
+    """
+    epochs = [hour.get('EpochDateTime') for hour in hours if isinstance(hour, dict)]
+    epochs = [epoch for epoch in epochs if isinstance(epoch, int)]
+    if not epochs:
+        return None
+
+    start = min(epochs)
+    count = (max(epochs) - start) // HOUR + 1
+    values = np.full((len(HOURLY_FIELDS), count), np.nan, dtype=np.float32)
+    intensities = [''] * count
+    offset = 0
+    for hour in hours:
+        if not isinstance(hour, dict) or not isinstance(hour.get('EpochDateTime'), int):
+            continue
+        index = (hour['EpochDateTime'] - start) // HOUR
+        for row, path in enumerate(HOURLY_FIELDS.values()):
+            value = _dig(hour, path)
+            if isinstance(value, (int, float)):
+                values[row, index] = value
+        if hour.get('HasPrecipitation'):
+            intensities[index] = str(hour.get('PrecipitationIntensity') or '')
+        offset = _utc_offset_minutes(str(hour.get('DateTime', '')))
+
+    return {'start': start, 'step': HOUR, 'offset': offset, 'values': values.tobytes(), 'intensities': intensities}
+
+
+def project(value, fields):
+    """
+    Оставляет в value только поля из fields (вложенный словарь, True — взять значение целиком).
+    Списки обрабатываются поэлементно, отсутствующие поля пропускаются.
+    """
+    if fields is True or fields is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {name: project(value[name], sub_fields) for name, sub_fields in fields.items() if name in value}
+
+
+def encode_entry(fetched_at: float, value) -> bytes:
+    """
+    Запись кэша в компактном двоичном виде: msgpack, для длинных значений — со сжатием zlib.
+    """
+    packed = msgpack.packb([fetched_at, value], use_bin_type=True)
+    if len(packed) >= COMPRESS_MIN_SIZE:
+        return _ZLIB + zlib.compress(packed, COMPRESS_LEVEL)
+    return _PLAIN + packed
+
+
+def decode_entry(raw: bytes) -> tuple[float, object]:
+    """
+    Обратное преобразование encode_entry: возвращает (fetched_at, value).
+    """
+    body = raw[1:]
+    if raw[:1] == _ZLIB:
+        body = zlib.decompress(body)
+    fetched_at, value = msgpack.unpackb(body, raw=False)
+    return fetched_at, value
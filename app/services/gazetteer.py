@@ -0,0 +1,126 @@
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.config import Config
+
+
+def normalize_gazetteer_name(name: str) -> str:
+    """
+    Ключ поиска в справочнике: нижний регистр, ё -> е, дефисы как пробелы, без лишних пробелов.
+    """
+    return ' '.join(name.lower().replace('ё', 'е').replace('-', ' ').split())
+
+
+@dataclass(frozen=True)
+class GazetteerEntry:
+    name: str
+    lat: float
+    lon: float
+    location_key: str | None = None
+
+    @property
+    def coordinates(self) -> dict:
+        return {'lat': self.lat, 'lon': self.lon}
+
+
+class Gazetteer:
+    """
+    Локальный справочник городов, отображённый в память (mmap).
+
+    Файл — строки 'ключ\\tширота\\tдолгота\\tlocation_key\\tназвание', отсортированные по байтам ключа
+    в UTF-8; псевдонимы (в том числе кириллические) — отдельные строки с теми же координатами.
+    В памяти Python хранится только массив смещений начала строк, поиск точного совпадения
+    и по префиксу — двоичный, O(log n).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Концы строк — переводы строки; последняя строка может быть и без него
+        ends = np.flatnonzero(np.frombuffer(self._mm, dtype=np.uint8) == ord('\n'))
+        if self._mm[-1:] != b'\n':
+            ends = np.append(ends, len(self._mm))
+        self._starts = np.concatenate(([0], ends[:-1] + 1)).astype(np.int64)
+        self._ends = ends.astype(np.int64)
+        self._stats = {'hits': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _key(self, index: int) -> bytes:
+        start, end = int(self._starts[index]), int(self._ends[index])
+        return self._mm[start:self._mm.find(b'\t', start, end)]
+
+    def _entry(self, index: int) -> GazetteerEntry:
+        line = self._mm[int(self._starts[index]):int(self._ends[index])].decode('utf-8')
+        _, lat, lon, location_key, name = line.split('\t')
+        return GazetteerEntry(name, float(lat), float(lon), location_key or None)
+
+    def _bisect_left(self, key: bytes) -> int:
+        low, high = 0, len(self._starts)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, name: str) -> GazetteerEntry | None:
+        """
+        Точный поиск по названию или псевдониму.
+        """
+        key = normalize_gazetteer_name(name).encode('utf-8')
+        index = self._bisect_left(key)
+        found = index < len(self._starts) and self._key(index) == key
+
+        with self._stats_lock:
+            self._stats['hits' if found else 'misses'] += 1
+        return self._entry(index) if found else None
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> list[GazetteerEntry]:
+        """
+        Города, название или псевдоним которых начинается с prefix (без повторов одного города).
+        """
+        key = normalize_gazetteer_name(prefix).encode('utf-8')
+        if not key:
+            return []
+
+        results, seen = [], set()
+        index = self._bisect_left(key)
+        while index < len(self._starts) and len(results) < limit and self._key(index).startswith(key):
+            entry = self._entry(index)
+            if (entry.lat, entry.lon) not in seen:
+                seen.add((entry.lat, entry.lon))
+                results.append(entry)
+            index += 1
+        return results
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats, entries=len(self))
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer | None:
+    """
+    Справочник загружается при первом обращении; если файла нет или он пустой, поиск по справочнику отключён.
+    """
+    global _gazetteer
+    path = Config.GAZETTEER_PATH
+    # Пустой файл нельзя отобразить в память (mmap), поэтому он считается отсутствующим
+    if _gazetteer is None and path and os.path.isfile(path) and os.path.getsize(path) > 0:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer(Config.GAZETTEER_PATH)
+    return _gazetteer
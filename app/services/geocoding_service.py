@@ -1,49 +1,164 @@
-import json
-import redis
-import requests
+import asyncio
 
 from app.core.config import Config
+from app.services.blocking import blocking_bridge
+from app.services.cache import weather_cache, COORDINATES, LOCATION_KEY
+from app.services.city_names import normalize_city_name
+from app.services.gazetteer import get_gazetteer
+from app.services.http_client import upstream, run_sync
+from app.services.refresher import cached_fetch
+from app.services.singleflight import single_flight
+from app.services.spatial import spatial_index
 
-redis_client = redis.Redis(
-    host=Config.REDIS_HOST,
-    port=Config.REDIS_PORT,
-    db=Config.REDIS_DB,
-    decode_responses=True
-)
+POSITIONSTACK_URL = "http://api.positionstack.com/v1/forward"
 
 
-def get_coordinates_by_city(city_name):
+def _parse_coordinates(data):
+    # Positionstack возвращает список найденных мест, берём первое
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if not isinstance(data, dict) or data.get('latitude') is None:
+        return None
+
+    return {
+        'lat': data['latitude'],
+        'lon': data['longitude']
+    }
+
+
+async def _lookup_gazetteer(city_name):
+    """
+    Координаты из локального справочника или None, если города в нём нет.
+    Известный справочнику ключ AccuWeather сразу попадает в кэш, чтобы не запрашивать его по координатам.
+    """
+    gazetteer = get_gazetteer()
+    entry = gazetteer.lookup(city_name) if gazetteer else None
+    if entry is None:
+        return None
+
+    if entry.location_key:
+        point = spatial_index.snap(entry.lat, entry.lon)
+        if weather_cache.peek(LOCATION_KEY, point.key) is None:
+            await weather_cache.set_async(LOCATION_KEY, point.key, entry.location_key)
+    return entry.coordinates
+
+
+async def get_coordinates_by_city_async(city_name):
     """
-    Получение координат города с кэшированием.
+    Получение координат города: сначала по локальному справочнику, затем из кэша или Positionstack.
     """
-    cache_key = f"coordinates:{city_name.lower()}"
-    coordinates = redis_client.get(cache_key)
+    coordinates = await _lookup_gazetteer(city_name)
+    if coordinates:
+        return coordinates
+
+    cache_key = normalize_city_name(city_name)
+    return await cached_fetch(COORDINATES, cache_key, lambda: _fetch_coordinates(city_name, cache_key))
+
 
+async def _fetch_coordinates(city_name, cache_key):
+    coordinates = await _request_coordinates(city_name)
     if coordinates:
-        print("City coordinates retrieved from cache")
-        return json.loads(coordinates)
+        await weather_cache.set_async(COORDINATES, cache_key, coordinates)
+    return coordinates
+
 
-    api_key = Config.POSITIONSTACK_API_KEY
-    url = "http://api.positionstack.com/v1/forward"
+async def _request_coordinates(city_name):
     params = {
-        'access_key': api_key,
+        'access_key': Config.POSITIONSTACK_API_KEY,
         'query': city_name,
         'limit': 1
     }
 
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        print(f"Ошибка запроса. Статус: {response.status_code}, Текст ошибки: {response.text}")
+    response = await upstream.get_json(POSITIONSTACK_URL, params=params)
+    if not response.ok:
+        print(f"Ошибка запроса. Статус: {response.status}, Текст ошибки: {response.text}")
         return None
 
-    data = response.json().get('data')
-    if not data:
+    coordinates = _parse_coordinates(response.data.get('data'))
+    if not coordinates:
         print("Не удалось найти данные для указанного города.")
+    return coordinates
+
+
+async def _request_coordinates_batch(city_names):
+    """
+    Пакетный запрос Positionstack (доступен не на всех тарифах).
+    Возвращает список координат в порядке запроса или None, если пакетный режим недоступен.
+    """
+    response = await upstream.post_json(
+        POSITIONSTACK_URL,
+        params={'access_key': Config.POSITIONSTACK_API_KEY},
+        json={'batch': [{'query': name, 'limit': 1} for name in city_names]}
+    )
+    if not response.ok or not isinstance(response.data.get('data'), list):
+        print(f"Пакетный запрос недоступен. Статус: {response.status}, Текст ошибки: {response.text}")
         return None
 
-    coordinates = {
-        'lat': data[0]['latitude'],
-        'lon': data[0]['longitude']
-    }
-    redis_client.setex(cache_key, 86400, json.dumps(coordinates))  # Кэширование на 24 часа
-    return coordinates
+    results = response.data['data']
+    if len(results) != len(city_names):
+        return None
+    return [_parse_coordinates(item) for item in results]
+
+
+async def geocode_many_async(city_names, concurrency: int = Config.GEOCODE_CONCURRENCY):
+    """
+    Координаты для списка городов. Названия нормализуются и дедуплицируются, города из локального
+    справочника не требуют обращений к Redis, попадания в кэш читаются одним MGET, а в Positionstack
+    уходят только промахи: пакетным запросом, если он включён, иначе параллельно с ограничением concurrency.
+    Одновременные запросы тех же промахов (одинаковые маршруты, одиночное геокодирование) объединяются
+    через single-flight. Новые результаты записываются в кэш одним конвейером.
+
+    Возвращает список координат (или None для ненайденных) в порядке исходных названий.
+    """
+    keys = [normalize_city_name(name) for name in city_names]
+    # Для каждого ключа запоминаем первое написание, с ним и пойдём в API
+    queries = {}
+    for key, name in zip(keys, city_names):
+        queries.setdefault(key, name.strip())
+
+    found = {}
+    for key, name in queries.items():
+        coordinates = await _lookup_gazetteer(name)
+        if coordinates:
+            found[key] = coordinates
+
+    found.update(await blocking_bridge.run(weather_cache.get_many, COORDINATES,
+                                           [key for key in queries if key not in found]))
+    missing = [key for key in queries if key not in found]
+
+    if missing:
+        resolved = None
+        if Config.POSITIONSTACK_BATCH:
+            # Одинаковые одновременные пакеты уходят в API один раз
+            resolved = await single_flight.run(f"geocode_batch:{'|'.join(missing)}",
+                                               lambda: _request_coordinates_batch([queries[key] for key in missing]))
+
+        if resolved is None:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def bounded(key):
+                async with semaphore:
+                    # Ключ тот же, что у get_coordinates_by_city_async: промах по городу загружается один раз
+                    return await single_flight.run(COORDINATES.key(key), lambda: _request_coordinates(queries[key]))
+
+            resolved = await asyncio.gather(*(bounded(key) for key in missing))
+
+        fetched = {key: coordinates for key, coordinates in zip(missing, resolved) if coordinates}
+        await blocking_bridge.run(weather_cache.set_many, COORDINATES, fetched)
+        found.update(fetched)
+
+    return [found.get(key) for key in keys]
+
+
+def get_coordinates_by_city(city_name):
+    """
+    Синхронная обёртка над get_coordinates_by_city_async для Flask-представлений.
+    """
+    return run_sync(get_coordinates_by_city_async(city_name))
+
+
+def geocode_many(city_names):
+    """
+    Синхронная обёртка над geocode_many_async.
+    """
+    return run_sync(geocode_many_async(city_names))
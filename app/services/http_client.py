@@ -0,0 +1,210 @@
+import asyncio
+import random
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from app.core.config import Config
+from app.services.breaker import CircuitBreaker
+from app.services.quota import QuotaBudget, quota_budgets, upstream_priority
+
+
+@dataclass
+class UpstreamResponse:
+    """
+    Результат запроса к внешнему API: статус, разобранный JSON и текст ошибки.
+    status == 0 означает, что ответ не был получен (таймаут, обрыв соединения).
+    """
+    status: int
+    data: Any = None
+    text: str = ''
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+
+class UpstreamClient:
+    """
+    Общий асинхронный HTTP-клиент для AccuWeather и Positionstack.
+
+    На каждый event loop создаётся одна aiohttp-сессия с пулом keep-alive соединений,
+    число одновременных запросов к каждому хосту ограничено семафором,
+    у всех запросов есть таймауты. Если для хоста задан бюджет (budgets), каждый запрос сначала
+    списывает вызов из квоты (запросы пользователей при нехватке токенов недолго ждут их);
+    при отказе запрос не отправляется и возвращается статус 429.
+
+    Для каждого хоста работает CircuitBreaker: пока цепь разомкнута, запросы сразу возвращают статус 503,
+    а вызывающий код отдаёт данные из кэша. GET-запросы при таймаутах и ответах 5xx повторяются
+    до retries раз с экспоненциальной задержкой со случайным разбросом.
+    """
+
+    def __init__(self, pool_size: int, per_host_limit: int, timeout: float, connect_timeout: float,
+                 keepalive_timeout: float, budgets: dict[str, QuotaBudget] | None = None, retries: int = 0,
+                 retry_base_delay: float = 0.2, retry_max_delay: float = 2.0, failure_threshold: int = 5,
+                 reset_timeout: float = 30):
+        self.pool_size = pool_size
+        self.per_host_limit = per_host_limit
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.budgets = budgets or {}
+        self.retries = retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self._stats = {'retries': 0}
+        self._sessions = weakref.WeakKeyDictionary()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.per_host_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._sessions[loop] = session
+        return session
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphores[host]
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Экспоненциальная задержка с полным случайным разбросом, чтобы повторы воркеров не совпадали
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    async def get_json(self, url: str, params: dict | None = None) -> UpstreamResponse:
+        """
+        GET-запрос к внешнему API. Ошибки сети и таймауты не выбрасываются, а возвращаются со статусом 0.
+        Запрос идемпотентный, поэтому временные ошибки повторяются.
+        """
+        return await self._request('GET', url, params)
+
+    async def post_json(self, url: str, params: dict | None = None, json: Any = None) -> UpstreamResponse:
+        """
+        POST-запрос с телом JSON (пакетные запросы). Ошибки обрабатываются так же, как в get_json,
+        но без повторов.
+        """
+        return await self._request('POST', url, params, json)
+
+    async def _request(self, method: str, url: str, params: dict | None, json: Any = None) -> UpstreamResponse:
+        # Как и requests, пропускаем параметры со значением None
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        host = urlsplit(url).hostname
+
+        breaker = self._breaker(host)
+        if not breaker.allow():
+            return UpstreamResponse(503, text=f"{host} временно недоступен, запросы приостановлены")
+
+        attempts = 1 + (self.retries if method == 'GET' else 0)
+        for attempt in range(attempts):
+            if attempt:
+                with self._breakers_lock:
+                    self._stats['retries'] += 1
+                await asyncio.sleep(self._retry_delay(attempt))
+
+            budget = self.budgets.get(host)
+            if budget is not None and not await budget.acquire_async(upstream_priority.get()):
+                breaker.release()
+                return UpstreamResponse(429, text=f"Исчерпана квота запросов к {budget.name}")
+
+            response = await self._send(method, url, params, json)
+            # Таймауты, обрывы и 5xx — временные ошибки API, остальные статусы повторять бессмысленно
+            if response.status != 0 and response.status < 500:
+                breaker.record_success()
+                return response
+
+        breaker.record_failure()
+        return response
+
+    async def _send(self, method: str, url: str, params: dict, json: Any) -> UpstreamResponse:
+        async with self._host_semaphore(urlsplit(url).hostname):
+            try:
+                async with self._session().request(method, url, params=params, json=json) as response:
+                    if response.status != 200:
+                        return UpstreamResponse(response.status, text=await response.text())
+                    return UpstreamResponse(response.status, data=await response.json(content_type=None))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return UpstreamResponse(0, text=repr(e))
+
+    def stats(self) -> dict:
+        """
+        Состояние выключателей по хостам и число повторов запросов.
+        """
+        with self._breakers_lock:
+            breakers = list(self._breakers.values())
+            stats = dict(self._stats)
+        stats['breakers'] = {breaker.name: breaker.stats() for breaker in breakers}
+        return stats
+
+    async def close(self):
+        """
+        Закрывает сессию текущего event loop.
+        """
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+upstream = UpstreamClient(
+    pool_size=Config.UPSTREAM_POOL_SIZE,
+    per_host_limit=Config.UPSTREAM_PER_HOST_LIMIT,
+    timeout=Config.UPSTREAM_TIMEOUT,
+    connect_timeout=Config.UPSTREAM_CONNECT_TIMEOUT,
+    keepalive_timeout=Config.UPSTREAM_KEEPALIVE_TIMEOUT,
+    budgets=quota_budgets,
+    retries=Config.UPSTREAM_RETRIES,
+    retry_base_delay=Config.UPSTREAM_RETRY_BASE_DELAY,
+    retry_max_delay=Config.UPSTREAM_RETRY_MAX_DELAY,
+    failure_threshold=Config.BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=Config.BREAKER_RESET_TIMEOUT
+)
+
+_background_loop = None
+_background_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name='upstream-loop', daemon=True).start()
+        return _background_loop
+
+
+def run_sync(coro):
+    """
+    Выполняет корутину из синхронного кода (Flask-представления) на общем фоновом event loop,
+    чтобы пул соединений переиспользовался между запросами.
+    """
+    loop = _get_background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync нельзя вызывать из фонового event loop, используйте await")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
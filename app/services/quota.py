@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+
+import redis
+
+from app.core.config import Config
+from app.services.blocking import blocking_bridge
+from app.services.cache import redis_client
+
+# Приоритеты обращений к внешним API: запросы пользователей и фоновые обновления кэша
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+upstream_priority = contextvars.ContextVar('upstream_priority', default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def background_priority():
+    """
+    Обращения к API внутри блока считаются фоновыми и первыми упираются в квоту.
+    """
+    token = upstream_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        upstream_priority.reset(token)
+
+
+# Корзина токенов и дневной счётчик проверяются и списываются атомарно на стороне Redis.
+# KEYS: корзина (hash), дневной счётчик. ARGV: now, rate, burst, daily_limit, min_remaining, min_tokens, day_ttl.
+# Возвращает {1 — разрешено / 0 — нет, израсходовано за день, причина отказа: 1 — дневной лимит, 2 — частота,
+# через сколько секунд в корзине наберётся нужное число токенов (строкой: Lua-числа приводятся к целым)}.
+_ACQUIRE_SCRIPT = """
+local now, rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local daily_limit, min_remaining, min_tokens = tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+
+if daily_limit > 0 and daily_limit - used <= min_remaining then
+    return {0, used, 1, '0'}
+end
+
+if rate > 0 then
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[3])
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or ARGV[1])
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    if tokens < min_tokens then
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', ARGV[1])
+        return {0, used, 2, tostring((min_tokens - tokens) / rate)}
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'updated', ARGV[1])
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+end
+
+used = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[7]))
+return {1, used, 0, '0'}
+"""
+
+
+class QuotaBudget:
+    """
+    Общий для всех процессов бюджет обращений к одному внешнему API: дневной лимит вызовов
+    и корзина токенов (rate запросов в секунду, не больше burst подряд), состояние хранится в Redis.
+
+    Фоновым обновлениям оставляется запас: они получают отказ, когда до конца дневного лимита
+    остаётся меньше background_reserve его доли или в корзине меньше такой же доли токенов,
+    поэтому остаток квоты достаётся запросам пользователей, а кэш отдаёт устаревшие данные.
+    daily_limit = 0 или rate = 0 отключают соответствующее ограничение.
+    Если Redis недоступен, вызов разрешается: квота не должна останавливать сервис.
+
+    Запрос пользователя при пустой корзине ждёт токен не дольше max_wait секунд, фоновое обновление
+    получает отказ сразу.
+    """
+
+    def __init__(self, client: redis.Redis, name: str, daily_limit: int, rate: float, burst: int,
+                 background_reserve: float, max_wait: float = 0):
+        self.client = client
+        self.name = name
+        self.daily_limit = daily_limit
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait
+        self._script = client.register_script(_ACQUIRE_SCRIPT)
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'denied_daily': 0, 'denied_rate': 0, 'background_denied': 0, 'errors': 0}
+        self._used = 0
+
+    def _keys(self) -> list[str]:
+        # Дневной лимит AccuWeather сбрасывается по UTC
+        day = time.strftime('%Y%m%d', time.gmtime())
+        return [f"quota:{self.name}:bucket", f"quota:{self.name}:day:{day}"]
+
+    def _try_acquire(self, background: bool) -> tuple[bool, int, float | None]:
+        # (разрешено, причина отказа, сколько секунд ждать токен); None — ждать бессмысленно (Redis недоступен)
+        min_remaining = int(self.daily_limit * self.background_reserve) if background else 0
+        min_tokens = 1 + (self.burst * self.background_reserve if background else 0)
+
+        try:
+            allowed, used, reason, wait = self._script(
+                keys=self._keys(),
+                args=[time.time(), self.rate, self.burst, self.daily_limit, min_remaining, min_tokens, 2 * 86400]
+            )
+        except redis.RedisError:
+            with self._lock:
+                self._stats['errors'] += 1
+            return True, 0, None
+
+        with self._lock:
+            self._used = int(used)
+        return bool(allowed), int(reason), float(wait)
+
+    def _record(self, allowed: bool, reason: int, background: bool):
+        with self._lock:
+            if allowed:
+                self._stats['allowed'] += 1
+            else:
+                self._stats['denied_daily' if reason == 1 else 'denied_rate'] += 1
+                if background:
+                    self._stats['background_denied'] += 1
+
+    def acquire(self, priority: str = INTERACTIVE) -> bool:
+        """
+        Пытается списать один вызов из бюджета без ожидания, возвращает True, если запрос к API можно отправить.
+        """
+        background = priority == BACKGROUND
+        allowed, reason, _ = self._try_acquire(background)
+        self._record(allowed, reason, background)
+        return allowed
+
+    async def acquire_async(self, priority: str = INTERACTIVE) -> bool:
+        """
+        Как acquire, но запрос пользователя при пустой корзине ждёт токен (до max_wait секунд);
+        при исчерпании дневного лимита отказ приходит сразу.
+        """
+        background = priority == BACKGROUND
+        deadline = time.monotonic() + (0 if background else self.max_wait)
+        while True:
+            allowed, reason, wait = await blocking_bridge.run(self._try_acquire, background)
+            if allowed or reason != 2 or time.monotonic() + wait > deadline:
+                self._record(allowed, reason, background)
+                return allowed
+            await asyncio.sleep(wait)
+
+    def remaining(self) -> int | None:
+        """
+        Сколько вызовов осталось до дневного лимита (None — лимит не задан).
+        """
+        if not self.daily_limit:
+            return None
+        try:
+            used = int(self.client.get(self._keys()[1]) or 0)
+        except redis.RedisError:
+            with self._lock:
+                used = self._used
+        return max(self.daily_limit - used, 0)
+
+    def stats(self) -> dict:
+        remaining = self.remaining()
+        with self._lock:
+            return dict(self._stats, daily_limit=self.daily_limit, remaining=remaining)
+
+
+# Бюджеты по хостам внешних API, через них проходят все запросы UpstreamClient
+quota_budgets = {
+    'dataservice.accuweather.com': QuotaBudget(
+        redis_client, 'accuweather',
+        daily_limit=Config.ACCUWEATHER_DAILY_LIMIT,
+        rate=Config.ACCUWEATHER_RATE_LIMIT,
+        burst=Config.QUOTA_BURST,
+        background_reserve=Config.QUOTA_BACKGROUND_RESERVE,
+        max_wait=Config.QUOTA_MAX_WAIT
+    ),
+    'api.positionstack.com': QuotaBudget(
+        redis_client, 'positionstack',
+        daily_limit=Config.POSITIONSTACK_DAILY_LIMIT,
+        rate=Config.POSITIONSTACK_RATE_LIMIT,
+        burst=Config.QUOTA_BURST,
+        background_reserve=Config.QUOTA_BACKGROUND_RESERVE,
+        max_wait=Config.QUOTA_MAX_WAIT
+    ),
+}
+
+
+def quota_stats() -> dict:
+    return {budget.name: budget.stats() for budget in quota_budgets.values()}
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable
+
+from app.core.config import Config
+from app.services.cache import weather_cache, CachePolicy
+from app.services.quota import background_priority
+from app.services.singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[], Awaitable]
+
+
+class Refresher:
+    """
+    Фоновое обновление популярных записей кэша.
+
+    Считает обращения к ключам (с затуханием, чтобы учитывать недавнюю популярность)
+    и раз в interval секунд заранее обновляет top_n самых запрашиваемых записей,
+    срок свежести которых истечёт до следующего прохода.
+    Все обновления идут с фоновым приоритетом квоты: при нехватке бюджета они откладываются,
+    а пользователи получают устаревшую запись.
+    """
+
+    def __init__(self, top_n: int, interval: float, max_tracked: int = 1000, decay: float = 0.5):
+        self.top_n = top_n
+        self.interval = interval
+        self.max_tracked = max_tracked
+        self.decay = decay
+        self._tracked: dict[str, list] = {}  # полный ключ -> [счётчик, policy, key, fetch]
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._stats = {'scheduled': 0, 'refreshed': 0, 'failed': 0}
+
+    def touch(self, policy: CachePolicy, key: str, fetch: Fetch | None = None):
+        """
+        Учитывает обращение к записи кэша. Без fetch учитываются только уже отслеживаемые записи
+        (например, попадания в кэш готовых ответов, собранных из этих записей).
+        """
+        full_key = policy.key(key)
+        with self._lock:
+            item = self._tracked.get(full_key)
+            if item is None:
+                if fetch is None or len(self._tracked) >= self.max_tracked:
+                    return
+                self._tracked[full_key] = [1.0, policy, key, fetch]
+            else:
+                item[0] += 1
+                if fetch is not None:
+                    item[3] = fetch
+
+    def schedule(self, policy: CachePolicy, key: str, fetch: Fetch):
+        """
+        Запускает обновление записи в фоне на текущем event loop, не дожидаясь результата.
+        """
+        with self._lock:
+            self._stats['scheduled'] += 1
+        task = asyncio.get_running_loop().create_task(self._refresh(policy, key, fetch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, policy: CachePolicy, key: str, fetch: Fetch):
+        try:
+            with background_priority():
+                result = await single_flight.run(policy.key(key), fetch)
+        except Exception:
+            logger.exception("Не удалось обновить запись кэша %s", policy.key(key))
+            result = None
+
+        with self._lock:
+            self._stats['refreshed' if result is not None else 'failed'] += 1
+
+    def _popular(self) -> list:
+        with self._lock:
+            items = sorted(self._tracked.values(), key=lambda item: item[0], reverse=True)
+            # Затухание счётчиков и удаление записей, к которым давно не обращались
+            for full_key, item in list(self._tracked.items()):
+                item[0] *= self.decay
+                if item[0] < 0.1:
+                    del self._tracked[full_key]
+        return items[:self.top_n]
+
+    async def run(self):
+        """
+        Бесконечный цикл прогрева популярных записей, запускается вместе с приложением.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            for _, policy, key, fetch in self._popular():
+                entry = await weather_cache.lookup_async(policy, key)
+                if entry is None or entry.age > policy.ttl - self.interval:
+                    await self._refresh(policy, key, fetch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, tracked=len(self._tracked))
+
+
+refresher = Refresher(Config.REFRESH_TOP_N, Config.REFRESH_INTERVAL)
+
+
+async def cached_fetch(policy: CachePolicy, key: str, fetch: Fetch, track: bool = False):
+    """
+    Общий путь чтения кэшируемых данных: свежая запись возвращается сразу, устаревшая тоже возвращается
+    сразу, но обновляется в фоне; при промахе загрузка идёт через single-flight.
+    track=True учитывает запись для фонового прогрева популярных значений.
+    """
+    if track:
+        refresher.touch(policy, key, fetch)
+
+    entry = await weather_cache.lookup_async(policy, key)
+    if entry is not None:
+        if not entry.is_fresh(policy):
+            refresher.schedule(policy, key, fetch)
+        return entry.value
+
+    return await single_flight.run(policy.key(key), fetch, lambda: weather_cache.get(policy, key))
@@ -0,0 +1,121 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+
+from app.core.config import Config
+from app.services.cache import CachePolicy, LocalCache, WeatherCache, weather_cache
+from app.services.refresher import refresher
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """
+    Готовый ответ: тело, тип содержимого, ETag и записи кэша данных (правило, ключ, время получения),
+    из которых он собран.
+    """
+    body: bytes
+    content_type: str
+    etag: str
+    dependencies: tuple
+
+    def max_age(self, limit: int) -> int:
+        """
+        Сколько секунд ответ можно не перепроверять: пока свежи все его данные, но не больше limit.
+        """
+        now = time.time()
+        remaining = min((policy.ttl - (now - fetched_at) for policy, _, fetched_at in self.dependencies),
+                        default=0)
+        return max(0, min(int(remaining), limit))
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Совпадает ли ETag с заголовком If-None-Match (список тегов, слабые теги W/ или *).
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+class ResponseCache:
+    """
+    Кэш готовых страниц и JSON-ответов в памяти процесса по нормализованным параметрам запроса.
+
+    Ответ действителен, пока в кэше данных лежат те же записи, из которых он собран: с тем же временем
+    получения и ещё свежие. После обновления прогноза или перехода записи в устаревшие ответ собирается
+    заново обычным путём (и запускает фоновое обновление). Ответы, собранные не из кэша данных
+    (кэш отключён, запись не сохранилась), не кэшируются. Попадание учитывается как обращение к записям
+    кэша данных, чтобы популярные страницы оставались в фоновом прогреве.
+    """
+
+    def __init__(self, cache: WeatherCache, local: LocalCache, ttl: int):
+        self.cache = cache
+        self.local = local
+        self.ttl = ttl
+        self._stats = {'hits': 0, 'misses': 0, 'invalidated': 0, 'not_modified': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        response = self.local.get(key)
+        if response is None:
+            self._count('misses')
+            return None
+
+        for policy, data_key, fetched_at in response.dependencies:
+            entry = self.cache.peek(policy, data_key)
+            if entry is None or entry.fetched_at != fetched_at or not entry.is_fresh(policy):
+                self.local.delete(key)
+                self._count('invalidated')
+                return None
+
+        for policy, data_key, _ in response.dependencies:
+            refresher.touch(policy, data_key)
+        self._count('hits')
+        return response
+
+    def put(self, key: tuple, body: bytes, content_type: str,
+            dependencies: list[tuple[CachePolicy, str]]) -> CachedResponse:
+        """
+        Запоминает ответ вместе с текущим временем получения записей dependencies и возвращает его.
+        """
+        snapshot = []
+        for policy, data_key in dependencies:
+            entry = self.cache.peek(policy, data_key)
+            if entry is None:
+                snapshot = None
+                break
+            snapshot.append((policy, data_key, entry.fetched_at))
+
+        response = CachedResponse(body, content_type, make_etag(body), tuple(snapshot or ()))
+        if snapshot:
+            self.local.set(key, response, self.ttl)
+        return response
+
+    def not_modified(self):
+        self._count('not_modified')
+
+    def stats(self) -> dict:
+        """
+        Попадания, промахи, ответы, устаревшие из-за обновления данных, ответы 304 и число записей.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['size'] = len(self.local)
+        return stats
+
+
+response_cache = ResponseCache(
+    weather_cache,
+    LocalCache(Config.RESPONSE_CACHE_SIZE),
+    ttl=Config.RESPONSE_CACHE_TTL
+)
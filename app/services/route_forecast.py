@@ -0,0 +1,96 @@
+import asyncio
+from dataclasses import dataclass
+
+from app.core.config import Config
+from app.services.blocking import blocking_bridge
+from app.services.geocoding_service import geocode_many_async
+from app.services.http_client import run_sync
+from app.services.weather_service import get_weather_by_location_async, get_hourly_forecast_async, prefetch_weather
+
+
+@dataclass
+class PointForecast:
+    """
+    Результат для одной точки маршрута. Точка задаётся названием города или парой (широта, долгота).
+    Если получить прогноз не удалось, forecast пустой, а в error лежит сообщение для пользователя.
+    hourly — упакованный почасовой прогноз, если он запрашивался и доступен.
+    """
+    point: str | tuple
+    coordinates: dict | None = None
+    forecast: dict | None = None
+    error: str | None = None
+    hourly: dict | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _value_or_none(value, what: str, point):
+    # Исключение при загрузке одного ряда не должно ронять всю точку или весь маршрут
+    if isinstance(value, Exception):
+        print(f"Ошибка при получении {what} для {point}: {value!r}")
+        return None
+    return value
+
+
+async def _resolve_point(point, coordinates, days: int, hourly: bool) -> PointForecast:
+    result = PointForecast(point=point, coordinates=coordinates)
+    if not coordinates:
+        result.error = f"Не удалось найти координаты для города: {point}"
+        return result
+
+    lat, lon = coordinates['lat'], coordinates['lon']
+    loads = [get_weather_by_location_async(lat, lon, days)]
+    if hourly:
+        loads.append(get_hourly_forecast_async(lat, lon))
+    forecast, *hourly_forecast = await asyncio.gather(*loads, return_exceptions=True)
+
+    result.forecast = _value_or_none(forecast, "прогноза", point)
+    # Без почасового прогноза точка оценивается по дневному, поэтому его отсутствие — не ошибка
+    result.hourly = _value_or_none(hourly_forecast[0], "почасового прогноза", point) if hourly else None
+    if not result.forecast:
+        place = f"города: {point}" if isinstance(point, str) else f"точки: {point}"
+        result.error = f"Не удалось получить данные о погоде для {place}"
+    return result
+
+
+async def forecast_route_async(points, days: int = 1, concurrency: int = Config.ROUTE_CONCURRENCY,
+                               hourly: bool = False):
+    """
+    Получает прогнозы для всех точек маршрута параллельно, не более concurrency точек одновременно,
+    при hourly=True — вместе с почасовыми. Возвращает список PointForecast в исходном порядке точек.
+    """
+    # Названия городов геокодируются одним пакетом, точки с координатами используются как есть
+    city_names = [point for point in points if isinstance(point, str)]
+    geocoded = iter(await geocode_many_async(city_names) if city_names else [])
+    coordinates = [next(geocoded) if isinstance(point, str) else {'lat': point[0], 'lon': point[1]}
+                   for point in points]
+    # Ключи местоположений и прогнозы всех точек читаются из Redis одним конвейером;
+    # без него записи просто читаются по одной
+    try:
+        await blocking_bridge.run(prefetch_weather, [(item['lat'], item['lon']) for item in coordinates if item],
+                                  days, False, hourly)
+    except Exception as e:
+        print(f"Не удалось заранее прочитать записи маршрута: {e!r}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(point, point_coordinates):
+        async with semaphore:
+            try:
+                return await _resolve_point(point, point_coordinates, days, hourly)
+            except Exception as e:
+                print(f"Ошибка при получении прогноза для {point}: {e!r}")
+                return PointForecast(point=point, coordinates=point_coordinates,
+                                     error=f"Не удалось получить данные о погоде для {point}")
+
+    return list(await asyncio.gather(*(bounded(point, point_coordinates)
+                                       for point, point_coordinates in zip(points, coordinates))))
+
+
+def forecast_route(points, days: int = 1, concurrency: int = Config.ROUTE_CONCURRENCY, hourly: bool = False):
+    """
+    Синхронная обёртка над forecast_route_async для Flask-представлений.
+    """
+    return run_sync(forecast_route_async(points, days, concurrency, hourly))
@@ -0,0 +1,43 @@
+from app.core.config import Config
+from app.services.cache import LocalCache
+from app.services.city_names import normalize_city_name
+
+
+class ForecastSeriesStore:
+    """
+    Ограниченное хранилище рядов прогноза для графиков Dash (LRU с временем жизни, как локальный кэш).
+    Ключ строится из города и числа дней и передаётся в Dash через URL,
+    поэтому каждый пользователь видит графики своего запроса.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.ttl = ttl
+        self._local = LocalCache(max_size)
+
+    @staticmethod
+    def make_key(city: str, days: int) -> str:
+        # Та же нормализация названия, что у ключей кэша координат и готовых ответов
+        return f"{normalize_city_name(city)}:{days}"
+
+    def put(self, key: str, series, hourly=None):
+        # Запись — [ряды, JSON графиков, почасовой прогноз (HourlySeries) или None];
+        # JSON графиков строится при первом обращении (figures) и дописывается в запись
+        self._local.set(key, [series, None, hourly], self.ttl)
+
+    def get(self, key: str):
+        entry = self._local.get(key)
+        return entry[0] if entry is not None else None
+
+    def figures(self, key: str, build) -> str | None:
+        """
+        JSON графиков для рядов под ключом key: build(series, hourly) вызывается один раз на прогноз.
+        """
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[1] is None:
+            entry[1] = build(entry[0], entry[2])
+        return entry[1]
+
+
+series_store = ForecastSeriesStore(Config.SERIES_STORE_SIZE, Config.SERIES_STORE_TTL)
@@ -0,0 +1,116 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Awaitable, Callable
+
+import redis
+
+from app.core.config import Config
+from app.services.blocking import blocking_bridge
+from app.services.cache import redis_client
+from app.services.quota import BACKGROUND, upstream_priority
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые запросы к внешним API: пока для ключа выполняется загрузка,
+    остальные вызовы с тем же ключом ждут её результат, а не отправляют свой запрос.
+
+    Работает между потоками и задачами asyncio в разных event loop одного процесса.
+    Если передан клиент Redis, загрузка дополнительно защищается распределённой блокировкой,
+    и другие процессы ждут её снятия, после чего берут значение из кэша через recheck.
+    """
+
+    def __init__(self, client: redis.Redis | None = None, lock_timeout: float = 15, poll_interval: float = 0.05):
+        self.client = client
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._calls: dict[str, tuple[concurrent.futures.Future, str]] = {}  # ключ -> (результат, приоритет ведущего)
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'followers': 0, 'remote_waits': 0}
+
+    async def run(self, key: str, fn: Callable[[], Awaitable], recheck: Callable[[], object] | None = None):
+        """
+        Выполняет fn() один раз на ключ среди одновременных вызовов и возвращает его результат всем.
+        recheck() читает значение из кэша после ожидания чужой загрузки в другом процессе
+        (синхронно, в пуле blocking_bridge).
+
+        Если ведущим был фоновый вызов и он ничего не получил (например, отказ квоты, которая фоновым
+        обновлениям не ждёт), ожидавшие его запросы пользователей загружают значение заново сами.
+        """
+        priority = upstream_priority.get()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = (concurrent.futures.Future(), priority)
+            self._stats['leaders' if leader else 'followers'] += 1
+        future, leader_priority = call
+
+        if not leader:
+            result = await asyncio.wrap_future(future)
+            if result is None and leader_priority == BACKGROUND and priority != BACKGROUND:
+                return await self.run(key, fn, recheck)
+            return result
+
+        try:
+            result = await self._run_leader(key, fn, recheck)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def _run_leader(self, key: str, fn, recheck):
+        if self.client is None:
+            return await fn()
+
+        # Обращения к Redis выполняются в пуле потоков, чтобы не останавливать event loop.
+        # Захват и снятие блокировки могут попасть в разные потоки пула, поэтому токен не thread-local
+        lock = self.client.lock(f"singleflight:{key}", timeout=self.lock_timeout, thread_local=False)
+        try:
+            acquired = await blocking_bridge.run(lock.acquire, blocking=False)
+        except redis.RedisError:
+            return await fn()
+
+        if acquired:
+            try:
+                return await fn()
+            finally:
+                try:
+                    await blocking_bridge.run(lock.release)
+                except redis.RedisError:
+                    pass
+
+        # Загрузка уже идёт в другом процессе: ждём снятия блокировки и читаем результат из кэша
+        with self._lock:
+            self._stats['remote_waits'] += 1
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if not await blocking_bridge.run(lock.locked):
+                    break
+            except redis.RedisError:
+                break
+
+        if recheck is not None:
+            result = await blocking_bridge.run(recheck)
+            if result is not None:
+                return result
+        return await fn()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+
+single_flight = SingleFlight(
+    redis_client if Config.SINGLEFLIGHT_REDIS_LOCK else None,
+    lock_timeout=Config.SINGLEFLIGHT_LOCK_TIMEOUT
+)
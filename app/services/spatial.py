@@ -0,0 +1,101 @@
+import math
+from dataclasses import dataclass
+
+from app.core.config import Config
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_MAX_PRECISION = 12
+
+
+def geohash_encode(lat: float, lon: float, precision: int) -> str:
+    """
+    Кодирует координаты в geohash заданной длины.
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    result, bits, bit_count, even = [], 0, 0, True
+
+    while len(result) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return ''.join(result)
+
+
+def geohash_center(geohash: str) -> tuple[float, float]:
+    """
+    Возвращает центр ячейки geohash (широта, долгота).
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Расстояние между двумя точками на поверхности Земли в километрах.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+@dataclass(frozen=True)
+class SnappedPoint:
+    """
+    Точка, привязанная к ячейке пространственного индекса: ключ для кэша и координаты центра ячейки.
+    """
+    key: str
+    lat: float
+    lon: float
+
+
+class SpatialIndex:
+    """
+    Привязывает координаты к ячейкам geohash, чтобы близкие точки делили один ключ
+    местоположения и один прогноз в кэше.
+
+    Точка переносится в центр ячейки длины precision; если центр дальше max_snap_km,
+    используется более мелкая ячейка, пока расстояние не станет допустимым.
+    """
+
+    def __init__(self, precision: int, max_snap_km: float):
+        self.precision = max(1, min(precision, _MAX_PRECISION))
+        self.max_snap_km = max_snap_km
+
+    def snap(self, lat: float, lon: float) -> SnappedPoint:
+        lat, lon = float(lat), float(lon)
+        for precision in range(self.precision, _MAX_PRECISION + 1):
+            geohash = geohash_encode(lat, lon, precision)
+            center_lat, center_lon = geohash_center(geohash)
+            if haversine_km(lat, lon, center_lat, center_lon) <= self.max_snap_km:
+                break
+
+        return SnappedPoint(f"gh:{geohash}", round(center_lat, 4), round(center_lon, 4))
+
+
+spatial_index = SpatialIndex(Config.SPATIAL_PRECISION, Config.SPATIAL_MAX_SNAP_KM)
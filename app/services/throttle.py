@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+from app.core.config import Config
+from app.services.cache import redis_client
+
+# Корзина токенов одного ключа. KEYS: корзина (hash). ARGV: now, rate, burst, max_wait.
+# Если токена нет, но он появится не позже чем через max_wait секунд, токен берётся в долг.
+# Возвращает {1 — разрешено / 0 — нет, сколько секунд ждать (строкой, чтобы не потерять дробную часть)}.
+_BUCKET_SCRIPT = """
+local now, rate, burst, max_wait = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[3])
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or ARGV[1])
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+
+local wait = math.max(0, (1 - tokens) / rate)
+local allowed = 0
+if wait <= max_wait then
+    tokens = tokens - 1
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', ARGV[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+# Возврат токена, списанного зря. KEYS: корзина (hash). ARGV: burst.
+_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + 1)))
+end
+return 0
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Ограничение частоты по ключу (пользователь, чат): корзина на burst токенов, пополняется rate в секунду.
+
+    С клиентом Redis состояние общее для всех процессов; без него (или при ошибке Redis) корзины
+    хранятся в памяти процесса, не более max_keys последних ключей.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, client: redis.Redis | None = None,
+                 max_keys: int = 10000):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.client = client
+        self.max_keys = max_keys
+        self._script = client.register_script(_BUCKET_SCRIPT) if client is not None else None
+        self._refund_script = client.register_script(_REFUND_SCRIPT) if client is not None else None
+        self._buckets = OrderedDict()  # ключ -> (токены, время обновления)
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'deferred': 0, 'throttled': 0, 'errors': 0}
+
+    def acquire(self, key: str, max_wait: float = 0) -> tuple[bool, float]:
+        """
+        Списывает токен для ключа. Возвращает (разрешено, сколько секунд подождать перед обработкой):
+        (True, 0) — сразу, (True, wait) — токен взят в долг и обработку нужно отложить на wait,
+        (False, wait) — лимит превышен, следующий токен появится через wait секунд.
+        """
+        if self.rate <= 0:
+            return True, 0.0
+
+        allowed, wait = None, 0.0
+        if self._script is not None:
+            try:
+                allowed, wait = self._script(keys=[f"throttle:{self.name}:{key}"],
+                                             args=[time.time(), self.rate, self.burst, max_wait])
+                allowed, wait = bool(allowed), float(wait)
+            except redis.RedisError:
+                with self._lock:
+                    self._stats['errors'] += 1
+                allowed = None
+
+        with self._lock:
+            if allowed is None:
+                allowed, wait = self._acquire_local(key, max_wait)
+            self._stats['throttled' if not allowed else 'deferred' if wait > 0 else 'allowed'] += 1
+        return allowed, wait
+
+    def refund(self, key: str):
+        """
+        Возвращает токен, списанный acquire, если апдейт всё равно отброшен другим ограничением.
+        """
+        if self.rate <= 0:
+            return
+        if self._refund_script is not None:
+            try:
+                self._refund_script(keys=[f"throttle:{self.name}:{key}"], args=[self.burst])
+                return
+            except redis.RedisError:
+                with self._lock:
+                    self._stats['errors'] += 1
+
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + 1), updated)
+
+    def _acquire_local(self, key: str, max_wait: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        wait = max(0.0, (1 - tokens) / self.rate)
+        allowed = wait <= max_wait
+        if allowed:
+            tokens -= 1
+
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+_throttle_client = redis_client if Config.THROTTLE_REDIS else None
+
+# Лимиты апдейтов телеграм-бота: на пользователя и на групповой чат
+user_throttle = TokenBucketLimiter('user', Config.THROTTLE_USER_RATE, Config.THROTTLE_USER_BURST, _throttle_client)
+chat_throttle = TokenBucketLimiter('chat', Config.THROTTLE_CHAT_RATE, Config.THROTTLE_CHAT_BURST, _throttle_client)
+
+
+def throttle_stats() -> dict:
+    return {limiter.name: limiter.stats() for limiter in (user_throttle, chat_throttle)}
@@ -1,42 +1,91 @@
-import json
+from app.core.config import Config
+from app.services.cache import weather_cache, redis_client, FORECAST, CURRENT_WEATHER, LOCATION_KEY, HOURLY_FORECAST
+from app.services.codec import pack_hourly
+from app.services.http_client import upstream, run_sync
+from app.services.refresher import cached_fetch
+from app.services.spatial import spatial_index
 
-import redis
-import requests
 
-from app.core.config import Config
+def _forecast_period(days):
+    # Для любого days > 1 запрашивается 5-дневный прогноз, поэтому и запись в кэше одна
+    return 1 if days == 1 else 5
 
-redis_client = redis.Redis(
-    host=Config.REDIS_HOST,
-    port=Config.REDIS_PORT,
-    db=Config.REDIS_DB,
-    decode_responses=True
-)
 
+# Периоды почасового прогноза AccuWeather в часах
+HOURLY_PERIODS = (1, 12, 24, 72, 120)
 
-def get_weather_by_location(lat, lon, days=1):
+
+def _hourly_period(hours):
+    # Запрашивается ближайший период, покрывающий hours часов
+    return next((period for period in HOURLY_PERIODS if period >= hours), HOURLY_PERIODS[-1])
+
+
+def _forecast_key(lat, lon, period):
+    return f"{spatial_index.snap(lat, lon).key}:{period}"
+
+
+def _hourly_key(lat, lon, period):
+    return f"{spatial_index.snap(lat, lon).key}:{period}h"
+
+
+def weather_dependencies(lat, lon, days=1, location_key=None, hourly=False) -> list:
+    """
+    Записи кэша (правило, ключ), из которых собирается прогноз для точки,
+    запись текущей погоды, если передан location_key, и почасовой прогноз при hourly=True.
+    """
+    dependencies = [(FORECAST, _forecast_key(lat, lon, _forecast_period(days)))]
+    if location_key:
+        dependencies.append((CURRENT_WEATHER, location_key))
+    if hourly:
+        dependencies.append((HOURLY_FORECAST, _hourly_key(lat, lon, _hourly_period(Config.HOURLY_FORECAST_HOURS))))
+    return dependencies
+
+
+def prefetch_weather(points, days=1, current=False, hourly=False):
+    """
+    Заранее читает из Redis все записи, нужные для прогноза по точкам points (пары широта, долгота):
+    ключи местоположений, прогнозы, почасовые прогнозы (при hourly=True) и текущую погоду (при current=True)
+    — одним конвейером вместо отдельного запроса на каждый ключ. Текущая погода хранится по ключу AccuWeather,
+    поэтому для точек, чей ключ ещё не был в памяти, она дочитывается вторым конвейером.
+    """
+    period = _forecast_period(days)
+    cells = [spatial_index.snap(lat, lon).key for lat, lon in points]
+
+    def current_items():
+        entries = (weather_cache.peek(LOCATION_KEY, cell) for cell in cells)
+        return [(CURRENT_WEATHER, entry.value) for entry in entries if entry is not None and entry.value]
+
+    items = [(LOCATION_KEY, cell) for cell in cells] + [(FORECAST, f"{cell}:{period}") for cell in cells]
+    if hourly and Config.HOURLY_FORECAST_HOURS > 0:
+        hourly_period = _hourly_period(Config.HOURLY_FORECAST_HOURS)
+        items += [(HOURLY_FORECAST, f"{cell}:{hourly_period}h") for cell in cells]
+    known_current = current_items() if current else []
+    weather_cache.prefetch(items + known_current)
+
+    if current:
+        weather_cache.prefetch([item for item in current_items() if item not in known_current])
+
+
+async def get_weather_by_location_async(lat, lon, days=1):
     """
     Получение прогноза погоды по координатам с кэшированием данных.
     """
-    if Config.TESTING:
-        cache_key = f"forecast:{lat},{lon}:{days}"  # ключ для Redis
-        forecast_data = redis_client.get(cache_key)
+    period = _forecast_period(days)
+    cache_key = _forecast_key(lat, lon, period)
+
+    # Устаревший прогноз отдаётся сразу и обновляется в фоне,
+    # одновременные промахи по одной ячейке ждут один запрос к API
+    return await cached_fetch(FORECAST, cache_key, lambda: _fetch_forecast(lat, lon, period, cache_key), track=True)
 
-        if forecast_data:
-            print("Weather forecast retrieved from cache")
-            # ВРЕМЕННО
-            print("Saved forecast Data JSON Response:", json.dumps(forecast_data, indent=2, ensure_ascii=False))
-            return json.loads(forecast_data)
 
+async def _fetch_forecast(lat, lon, period, cache_key):
     # Получаем location_key для координат
-    location_key = get_location_key(lat, lon)
+    location_key = await get_location_key_async(lat, lon)
     if not location_key:
         return None
 
     # Используем соответствующий API для получения прогноза
-    if days == 1:
-        forecast_url = f"http://dataservice.accuweather.com/forecasts/v1/daily/1day/{location_key}"
-    else:
-        forecast_url = f"http://dataservice.accuweather.com/forecasts/v1/daily/5day/{location_key}"
+    forecast_url = f"http://dataservice.accuweather.com/forecasts/v1/daily/{period}day/{location_key}"
 
     params = {
         'apikey': Config.ACCUWEATHER_API_KEY,
@@ -45,32 +94,65 @@ def get_weather_by_location(lat, lon, days=1):
         'language': 'ru'
     }
 
-    response = requests.get(forecast_url, params=params)
+    response = await upstream.get_json(forecast_url, params=params)
 
-    if response.status_code != 200:
-        print(f"Ошибка при попытке получения прогноза погоды {response.status_code}: {response.text}")
+    if not response.ok:
+        print(f"Ошибка при попытке получения прогноза погоды {response.status}: {response.text}")
         return None
 
-    forecast_data = response.json()
+    # В кэш и вызывающему уходят только используемые приложением поля
+    return await weather_cache.set_async(FORECAST, cache_key, response.data)
+
+
+async def get_hourly_forecast_async(lat, lon, hours=None):
+    """
+    Почасовой прогноз по координатам в упакованном виде (codec.pack_hourly) с кэшированием данных.
+    По умолчанию запрашивается HOURLY_FORECAST_HOURS часов; если почасовой прогноз отключён
+    или недоступен, возвращается None.
+    """
+    hours = Config.HOURLY_FORECAST_HOURS if hours is None else hours
+    if hours <= 0:
+        return None
 
-    if Config.TESTING:
-        redis_client.setex(cache_key, 86400, json.dumps(forecast_data))  # кэширование сутки
+    period = _hourly_period(hours)
+    cache_key = _hourly_key(lat, lon, period)
+    return await cached_fetch(HOURLY_FORECAST, cache_key, lambda: _fetch_hourly_forecast(lat, lon, period, cache_key),
+                              track=True)
 
-    return forecast_data
 
+async def _fetch_hourly_forecast(lat, lon, period, cache_key):
+    location_key = await get_location_key_async(lat, lon)
+    if not location_key:
+        return None
 
-def get_current_weather(location_key):
+    url = f"http://dataservice.accuweather.com/forecasts/v1/hourly/{period}hour/{location_key}"
+    params = {
+        'apikey': Config.ACCUWEATHER_API_KEY,
+        'metric': 'true',
+        'details': 'true',
+        'language': 'ru'
+    }
+
+    response = await upstream.get_json(url, params=params)
+    if not response.ok or not isinstance(response.data, list):
+        print(f"Ошибка при попытке получения почасового прогноза {response.status}: {response.text}")
+        return None
+
+    # В кэше хранятся только числовые ряды в float32 и общая для них шкала времени
+    packed = pack_hourly(response.data)
+    if packed is None:
+        return None
+    return await weather_cache.set_async(HOURLY_FORECAST, cache_key, packed)
+
+
+async def get_current_weather_async(location_key):
     """
     Получение текущей погоды с использованием кэша.
     """
-    if Config.TESTING:
-        cache_key = f"current_weather:{location_key}"
-        current_weather_data = redis_client.get(cache_key)
+    return await cached_fetch(CURRENT_WEATHER, location_key, lambda: _fetch_current_weather(location_key), track=True)
 
-        if current_weather_data:
-            print("Current weather retrieved from cache")
-            return json.loads(current_weather_data)
 
+async def _fetch_current_weather(location_key):
     url = f"http://dataservice.accuweather.com/currentconditions/v1/{location_key}"
     params = {
         'apikey': Config.ACCUWEATHER_API_KEY,
@@ -79,56 +161,78 @@ def get_current_weather(location_key):
         'language': 'ru'
     }
 
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        print(f"Ошибка при попытке получения текущей погоды {response.status_code}: {response.text}")
+    response = await upstream.get_json(url, params=params)
+    if not response.ok:
+        print(f"Ошибка при попытке получения текущей погоды {response.status}: {response.text}")
         return None
 
-    current_weather_data = response.json()
-
-    if Config.TESTING:
-        redis_client.setex(cache_key, 86400, json.dumps(current_weather_data))
-
-    return current_weather_data
+    return await weather_cache.set_async(CURRENT_WEATHER, location_key, response.data)
 
 
-def get_location_key(lat, lon):
+async def get_location_key_async(lat, lon):
     """
     Получение и кэширование location_key по координатам (широта и долгота) через AccuWeather API.
     """
-    if Config.TESTING:
-        cache_key = f"location_key:{lat},{lon}"  # ключ для Redis
-        location_key = redis_client.get(cache_key)
+    # Близкие точки делят одну ячейку, а запрос к API идёт по её центру,
+    # чтобы ключ в кэше всегда соответствовал одним и тем же координатам
+    point = spatial_index.snap(lat, lon)
+    return await cached_fetch(LOCATION_KEY, point.key, lambda: _fetch_location_key(point))
 
-        if location_key:
-            print("Location key retrieved from cache")
-            return location_key
 
+async def _fetch_location_key(point):
     # Если токена нет в кэше, делаем запрос к API
     url = "http://dataservice.accuweather.com/locations/v1/cities/geoposition/search"
     params = {
         'apikey': Config.ACCUWEATHER_API_KEY,
-        'q': f'{lat},{lon}'
+        'q': f'{point.lat},{point.lon}'
     }
 
-    response = requests.get(url, params=params)
+    response = await upstream.get_json(url, params=params)
 
-    if response.status_code != 200:
-        print(f"Ошибка при попытке получения location_key {response.status_code}: {response.text}")
+    if not response.ok:
+        print(f"Ошибка при попытке получения location_key {response.status}: {response.text}")
         return None
 
-    data = response.json()
-    location_key = data.get('Key')
+    location_key = response.data.get('Key')
 
-    if Config.TESTING and location_key:
-        redis_client.setex(cache_key, 86400, location_key)
+    if location_key:
+        await weather_cache.set_async(LOCATION_KEY, point.key, location_key)
 
     return location_key
 
 
+def get_weather_by_location(lat, lon, days=1):
+    """
+    Синхронная обёртка над get_weather_by_location_async для Flask-представлений.
+    """
+    return run_sync(get_weather_by_location_async(lat, lon, days))
+
+
+def get_hourly_forecast(lat, lon, hours=None):
+    """
+    Синхронная обёртка над get_hourly_forecast_async.
+    """
+    return run_sync(get_hourly_forecast_async(lat, lon, hours))
+
+
+def get_current_weather(location_key):
+    """
+    Синхронная обёртка над get_current_weather_async.
+    """
+    return run_sync(get_current_weather_async(location_key))
+
+
+def get_location_key(lat, lon):
+    """
+    Синхронная обёртка над get_location_key_async.
+    """
+    return run_sync(get_location_key_async(lat, lon))
+
+
 def clear_all_cache():  # это для тесте
     """
-    Полная очистка базы данных Redis.
+    Полная очистка базы данных Redis и локального кэша.
     """
     redis_client.flushdb()
+    weather_cache.local.clear()
     print("all Redis data is gone")
@@ -1 +1,4 @@
 from .weather_utils import check_bad_weather, translate_weather, extract_time
+from .weather_utils import WeatherThresholds, score_weather_batch, score_forecasts, score_route, route_arrivals
+from .forecast_series import ForecastSeries, normalize_forecast
+from .hourly_series import HourlySeries, normalize_hourly
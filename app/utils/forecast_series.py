@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Числовые поля дневного прогноза: путь в ответе AccuWeather, тип столбца и значение по умолчанию
+NUMERIC_FIELDS = {
+    'max_temps': (('Temperature', 'Maximum', 'Value'), np.float64, np.nan),
+    'min_temps': (('Temperature', 'Minimum', 'Value'), np.float64, np.nan),
+    'day_real_feels': (('RealFeelTemperature', 'Maximum', 'Value'), np.float64, np.nan),
+    'night_real_feels': (('RealFeelTemperature', 'Minimum', 'Value'), np.float64, np.nan),
+    'wind_speeds': (('Day', 'Wind', 'Speed', 'Value'), np.float64, 0),
+    'precip_probs': (('Day', 'PrecipitationProbability'), np.int16, 0),
+    'day_clouds': (('Day', 'CloudCover'), np.int16, 0),
+    'night_clouds': (('Night', 'CloudCover'), np.int16, 0),
+    'day_min_humidities': (('Day', 'RelativeHumidity', 'Minimum'), np.int16, 0),
+    'day_avg_humidities': (('Day', 'RelativeHumidity', 'Average'), np.int16, 0),
+    'day_max_humidities': (('Day', 'RelativeHumidity', 'Maximum'), np.int16, 0),
+    'night_min_humidities': (('Night', 'RelativeHumidity', 'Minimum'), np.int16, 0),
+    'night_avg_humidities': (('Night', 'RelativeHumidity', 'Average'), np.int16, 0),
+    'night_max_humidities': (('Night', 'RelativeHumidity', 'Maximum'), np.int16, 0),
+}
+
+# Текстовые поля: путь в ответе и значение по умолчанию
+TEXT_FIELDS = {
+    'precip_types': (('Day', 'PrecipitationType'), 'None'),
+    'precip_intensities': (('Day', 'PrecipitationIntensity'), ''),
+    'icon_phrases': (('Day', 'IconPhrase'), 'Unknown'),
+}
+
+
+def _dig(data: dict, path: tuple, default):
+    for key in path:
+        if not isinstance(data, dict):
+            return default
+        data = data.get(key)
+    return default if data is None else data
+
+
+def _format_date(value: str) -> str:
+    # ISO-дата AccuWeather '2024-12-01T07:00:00+03:00' -> '01.12.2024' без разбора через strptime
+    return f"{value[8:10]}.{value[5:7]}.{value[0:4]}" if len(value) >= 10 else ''
+
+
+def _format_time(value: str) -> str:
+    # '2024-12-01T08:43:00+03:00' -> '08:43'
+    return value[11:16] if len(value) >= 16 else 'Неизвестно'
+
+
+class ForecastSeries:
+    """
+    Колоночное представление дневного прогноза: по одному массиву NumPy на поле,
+    плюс уже отформатированные даты и время восхода/заката.
+
+    Доступ к столбцам как к словарю (series['max_temps']), срез head(days) не копирует данные.
+    Объект неизменяемый по соглашению: его разделяют страница, графики Dash и бот.
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns['dates'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def head(self, days: int) -> 'ForecastSeries':
+        """
+        Первые days дней прогноза (срезы-представления исходных массивов).
+        """
+        return ForecastSeries({name: column[:days] for name, column in self.columns.items()})
+
+    def day(self, index: int) -> dict:
+        """
+        Значения одного дня в виде обычных объектов Python.
+        """
+        return {name: column[index].item() for name, column in self.columns.items()}
+
+    def to_dict(self, names=None) -> dict:
+        """
+        Столбцы (все или только names) в виде списков для JSON; пропуски (NaN) заменяются на None.
+        """
+        return {name: [None if value != value else value for value in self.columns[name].tolist()]
+                for name in (names or self.columns)}
+
+
+def build_forecast_series(daily_forecasts: list) -> ForecastSeries:
+    columns = {
+        name: np.fromiter((_dig(day, path, default) for day in daily_forecasts), dtype=dtype,
+                          count=len(daily_forecasts))
+        for name, (path, dtype, default) in NUMERIC_FIELDS.items()
+    }
+    for name, (path, default) in TEXT_FIELDS.items():
+        columns[name] = np.array([str(_dig(day, path, default)) for day in daily_forecasts], dtype=str)
+
+    columns['dates'] = np.array([_format_date(day.get('Date', '')) for day in daily_forecasts], dtype='<U10')
+    columns['epochs'] = np.fromiter((day.get('EpochDate', 0) for day in daily_forecasts), dtype=np.int64,
+                                    count=len(daily_forecasts))
+    columns['sunrise_times'] = np.array([_format_time(_dig(day, ('Sun', 'Rise'), '')) for day in daily_forecasts],
+                                        dtype='<U10')
+    columns['sunset_times'] = np.array([_format_time(_dig(day, ('Sun', 'Set'), '')) for day in daily_forecasts],
+                                       dtype='<U10')
+
+    for column in columns.values():
+        column.flags.writeable = False
+    return ForecastSeries(columns)
+
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_MEMO_SIZE = 256
+
+
+def normalize_forecast(forecast_data: dict) -> ForecastSeries:
+    """
+    Преобразует ответ AccuWeather с DailyForecasts в ForecastSeries.
+
+    Один и тот же объект ответа (например, из локального кэша) разбирается только один раз:
+    результат запоминается по id объекта, а сам объект удерживается, пока запись жива.
+    """
+    key = id(forecast_data)
+    with _memo_lock:
+        entry = _memo.get(key)
+        if entry is not None and entry[0] is forecast_data:
+            _memo.move_to_end(key)
+            return entry[1]
+
+    series = build_forecast_series(forecast_data.get('DailyForecasts', []))
+
+    with _memo_lock:
+        _memo[key] = (forecast_data, series)
+        while len(_memo) > _MEMO_SIZE:
+            _memo.popitem(last=False)
+    return series
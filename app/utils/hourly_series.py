@@ -0,0 +1,99 @@
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from app.services.codec import HOURLY_FIELDS
+
+_ROWS = {name: row for row, name in enumerate(HOURLY_FIELDS)}
+
+
+@lru_cache(maxsize=256)
+def _timeline(start: int, step: int, count: int) -> np.ndarray:
+    # Прогнозы, полученные в один час, начинаются с одного часа: шкала времени у них одна на все точки
+    timestamps = start + step * np.arange(count, dtype=np.int64)
+    timestamps.flags.writeable = False
+    return timestamps
+
+
+@lru_cache(maxsize=256)
+def _labels(start: int, step: int, count: int, offset: int) -> tuple:
+    # Подписи часов по местному времени точки: '18.10 14:00'
+    return tuple(time.strftime('%d.%m %H:%M', time.gmtime(start + step * index + offset * 60))
+                 for index in range(count))
+
+
+class HourlySeries:
+    """
+    Почасовой прогноз одной точки: матрица float32 (ряды × часы) и шкала времени с постоянным шагом.
+
+    Значения не копируются из кэша: матрица — представление байтов упакованной записи (codec.pack_hourly),
+    а шкала времени и подписи часов общие для всех точек с одинаковым началом и длиной прогноза.
+    Доступ к рядам как к словарю (series['temps']), срезы window и head не копируют данные.
+    """
+
+    __slots__ = ('start', 'step', 'offset', 'values', 'intensities')
+
+    def __init__(self, start: int, step: int, offset: int, values: np.ndarray, intensities: tuple):
+        self.start = start
+        self.step = step
+        self.offset = offset
+        self.values = values
+        self.intensities = intensities
+
+    def __len__(self) -> int:
+        return self.values.shape[1]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name == 'precip_intensities':
+            return np.array(self.intensities, dtype='<U16')
+        return self.values[_ROWS[name]]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return _timeline(self.start, self.step, len(self))
+
+    @property
+    def labels(self) -> tuple:
+        return _labels(self.start, self.step, len(self), self.offset)
+
+    def index(self, timestamp: float) -> int:
+        """
+        Номер часа, в который попадает момент timestamp (unix time); вне прогноза — меньше 0 или не меньше len.
+        """
+        return int((timestamp - self.start) // self.step)
+
+    def window(self, timestamp: float, hours: int) -> 'HourlySeries':
+        """
+        Часы прогноза с часа, в который попадает timestamp, не больше hours часов.
+        Прогноз начинается со следующего полного часа, поэтому текущий час представляет первый час прогноза.
+        """
+        index = self.index(timestamp)
+        begin = min(max(index, 0), len(self)) if index >= -1 else len(self)
+        end = min(begin + hours, len(self))
+        return HourlySeries(self.start + begin * self.step, self.step, self.offset, self.values[:, begin:end],
+                            self.intensities[begin:end])
+
+    def head(self, hours: int) -> 'HourlySeries':
+        return HourlySeries(self.start, self.step, self.offset, self.values[:, :hours], self.intensities[:hours])
+
+    def to_dict(self, names=None) -> dict:
+        """
+        Подписи часов и ряды (все или только names) в виде списков для JSON; пропуски (NaN) заменяются на None.
+        """
+        columns = {'hours': list(self.labels)}
+        for name in (names or HOURLY_FIELDS):
+            # float32 -> округление до десятых, чтобы в JSON не попадали хвосты вида 12.300000190734863
+            values = self[name].astype(np.float64).round(1).tolist()
+            columns[name] = [None if value != value else value for value in values]
+        return columns
+
+
+def normalize_hourly(packed: dict | None) -> HourlySeries | None:
+    """
+    Представление упакованного почасового прогноза из кэша в виде HourlySeries без копирования значений.
+    """
+    if not packed:
+        return None
+    values = np.frombuffer(packed['values'], dtype=np.float32).reshape(len(HOURLY_FIELDS), -1)
+    return HourlySeries(packed['start'], packed['step'], packed['offset'], values, tuple(packed['intensities']))
@@ -1,8 +1,14 @@
-from flask import jsonify
+from dataclasses import dataclass
 from datetime import datetime
 
+import numpy as np
+from flask import jsonify
+
+from app.core.config import Config
+
 from app.services import get_weather_by_location
 from app.services import get_coordinates_by_city
+from app.services.spatial import haversine_km
 
 
 def get_weather_data(city_name):
@@ -25,24 +31,146 @@ def get_weather_data(city_name):
     return forecast_data, None, None
 
 
-def check_bad_weather(temperature: float, wind_speed: float, precipitation_probability: float,
-                      precipitation_intensity: str = None):
+@dataclass(frozen=True)
+class WeatherThresholds:
     """
-    Оценивает погодные условия на основе температуры, скорости ветра и вероятности осадков.
+    Пороги неблагоприятной погоды. Значение ровно на пороге ещё считается благоприятным.
+    intensity_risks задаёт вклад интенсивности осадков в риск; риск больше 1 означает неблагоприятные условия.
+    """
+    min_temperature: float = 0
+    max_temperature: float = 35
+    max_wind_speed: float = 50
+    max_precipitation_probability: float = 70
+    intensity_risks: tuple = (('light', 0.3), ('moderate', 1.2), ('heavy', 1.5))
+
+    def __post_init__(self):
+        # Пороги — делители в оценке риска: пустой диапазон температур или нулевой порог дали бы inf и nan
+        if self.min_temperature >= self.max_temperature:
+            raise ValueError(f"Минимальная температура ({self.min_temperature}) должна быть меньше "
+                             f"максимальной ({self.max_temperature})")
+        if self.max_wind_speed <= 0 or self.max_precipitation_probability <= 0:
+            raise ValueError("Пороги скорости ветра и вероятности осадков должны быть больше нуля")
+
+
+DEFAULT_THRESHOLDS = WeatherThresholds(
+    min_temperature=Config.BAD_WEATHER_MIN_TEMPERATURE,
+    max_temperature=Config.BAD_WEATHER_MAX_TEMPERATURE,
+    max_wind_speed=Config.BAD_WEATHER_MAX_WIND_SPEED,
+    max_precipitation_probability=Config.BAD_WEATHER_MAX_PRECIPITATION_PROBABILITY
+)
+
+
+def score_weather_batch(temperatures, wind_speeds, precipitation_probabilities, precipitation_intensities=None,
+                        thresholds: WeatherThresholds = DEFAULT_THRESHOLDS):
+    """
+    Векторная оценка погодных условий для массивов любой совместимой формы (например, точки × дни).
+
+    Возвращает пару массивов: bad (True для неблагоприятных условий) и risk — непрерывную оценку риска,
+    где 1.0 соответствует порогу. Риск — максимум из вкладов температуры, ветра, осадков и их интенсивности.
+    Пропущенные значения (NaN) риска не добавляют.
+    """
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    wind_speeds = np.asarray(wind_speeds, dtype=np.float64)
+    precipitation_probabilities = np.asarray(precipitation_probabilities, dtype=np.float64)
+
+    # Температура: расстояние от середины допустимого диапазона в долях его половины
+    center = (thresholds.min_temperature + thresholds.max_temperature) / 2
+    half_range = (thresholds.max_temperature - thresholds.min_temperature) / 2
+    temperature_risk = np.abs(temperatures - center) / half_range
+    wind_risk = wind_speeds / thresholds.max_wind_speed
+    precipitation_risk = precipitation_probabilities / thresholds.max_precipitation_probability
+
+    bad = ((temperatures < thresholds.min_temperature) | (temperatures > thresholds.max_temperature)
+           | (wind_speeds > thresholds.max_wind_speed)
+           | (precipitation_probabilities > thresholds.max_precipitation_probability))
+    risk = np.fmax(np.fmax(temperature_risk, wind_risk), precipitation_risk)
+
+    if precipitation_intensities is not None:
+        intensities = np.char.lower(np.asarray(precipitation_intensities, dtype=str))
+        intensity_risk = np.select(
+            [intensities == name for name, _ in thresholds.intensity_risks],
+            [value for _, value in thresholds.intensity_risks],
+            default=0.0
+        )
+        bad = bad | (intensity_risk > 1)
+        risk = np.fmax(risk, intensity_risk)
+
+    return bad, np.nan_to_num(risk, nan=0.0)
+
+
+def score_forecasts(series_list, days: int = 1, thresholds: WeatherThresholds = DEFAULT_THRESHOLDS):
+    """
+    Оценивает сразу несколько прогнозов (ForecastSeries), например все точки маршрута.
+    Возвращает массивы bad и risk формы (число прогнозов × days); недостающие дни заполняются NaN.
+    """
+    def column(name):
+        matrix = np.full((len(series_list), days), np.nan)
+        for row, series in enumerate(series_list):
+            values = series[name][:days]
+            matrix[row, :len(values)] = values
+        return matrix
+
+    intensities = np.full((len(series_list), days), '', dtype='<U16')
+    for row, series in enumerate(series_list):
+        values = series['precip_intensities'][:days]
+        intensities[row, :len(values)] = values
+
+    return score_weather_batch(column('max_temps'), column('wind_speeds'), column('precip_probs'), intensities,
+                               thresholds)
+
+
+def route_arrivals(coordinates: list, departure: float, speed: float = Config.ROUTE_AVERAGE_SPEED) -> list:
     """
-    if temperature < 0 or temperature > 35:
-        return 'bad'
+    Время прибытия (unix time) в каждую точку маршрута при отправлении в departure:
+    по расстоянию между соседними точками по прямой и средней скорости speed (км/ч).
+    """
+    arrivals, elapsed = [departure], 0.0
+    for previous, current in zip(coordinates, coordinates[1:]):
+        elapsed += haversine_km(previous['lat'], previous['lon'], current['lat'], current['lon']) / speed * 3600
+        arrivals.append(departure + elapsed)
+    return arrivals
 
-    if wind_speed > 50:
-        return 'bad'
 
-    if precipitation_probability > 70:
-        return 'bad'
+def score_route(daily_list, hourly_list, arrivals, window: int = Config.ROUTE_HOUR_WINDOW,
+                thresholds: WeatherThresholds = DEFAULT_THRESHOLDS):
+    """
+    Оценка точек маршрута по погоде в часы, когда в них окажется путешественник: window часов
+    с момента прибытия arrivals по почасовому прогнозу (HourlySeries). Точки без почасового прогноза
+    или с прибытием за его пределами оцениваются по первому дню дневного прогноза (ForecastSeries).
 
-    if precipitation_intensity and precipitation_intensity.lower() in ['heavy', 'moderate']:
-        return 'bad'
+    Возвращает массивы длины числа точек: bad, risk и hourly (True, если точка оценена по часам).
+    """
+    shape = (len(daily_list), window)
+    temperatures, wind_speeds, precipitation_probabilities = (np.full(shape, np.nan) for _ in range(3))
+    intensities = np.full(shape, '', dtype='<U16')
+    hourly = np.zeros(len(daily_list), dtype=bool)
+
+    for row, (series, arrival) in enumerate(zip(hourly_list, arrivals)):
+        hours = series.window(arrival, window) if series is not None else None
+        if hours is None or not len(hours):
+            continue
+        hourly[row] = True
+        temperatures[row, :len(hours)] = hours['temps']
+        wind_speeds[row, :len(hours)] = hours['wind_speeds']
+        precipitation_probabilities[row, :len(hours)] = hours['precip_probs']
+        intensities[row, :len(hours)] = hours['precip_intensities']
+
+    hourly_bad, hourly_risk = score_weather_batch(temperatures, wind_speeds, precipitation_probabilities, intensities,
+                                                  thresholds)
+    daily_bad, daily_risk = score_forecasts(daily_list, 1, thresholds)
+    bad = np.where(hourly, hourly_bad.any(axis=1), daily_bad[:, 0])
+    risk = np.where(hourly, hourly_risk.max(axis=1), daily_risk[:, 0])
+    return bad, risk, hourly
 
-    return 'good'
+
+def check_bad_weather(temperature: float, wind_speed: float, precipitation_probability: float,
+                      precipitation_intensity: str = None):
+    """
+    Оценивает погодные условия на основе температуры, скорости ветра и вероятности осадков.
+    """
+    bad, _ = score_weather_batch(temperature, wind_speed, precipitation_probability,
+                                 precipitation_intensity if precipitation_intensity else None)
+    return 'bad' if bad else 'good'
 
 
 def translate_weather(icon_phrase):
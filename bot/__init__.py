@@ -1,18 +1,73 @@
+import asyncio
 import logging
 
 from aiogram import Dispatcher
 
-from .core import config, storage, bot
+from app.core.config import Config
+from app.services.throttle import user_throttle, chat_throttle
+from .core import config, storage, isolation, bot
 from .handlers import UserHandlers
+from .middlewares import ThrottlingMiddleware
+from .webhook import WebhookApp
 
 logging.basicConfig(level=logging.INFO)
 
-dp: Dispatcher = Dispatcher(storage=storage)
+dp: Dispatcher = Dispatcher(storage=storage, events_isolation=isolation)
+
+dp.update.outer_middleware(ThrottlingMiddleware(user_throttle, chat_throttle, Config.THROTTLE_MAX_DEFER))
 
 dp.include_router(UserHandlers.router)
 
+webhook_app = WebhookApp(dp, bot, config.webhook.secret, config.tg_bot.queue_size)
+
+
+def webhook_routes() -> dict:
+    """
+    ASGI-маршруты бота для веб-сервера: в режиме webhook — путь вебхука, иначе пусто.
+    """
+    return {config.webhook.path: webhook_app} if config.tg_bot.mode == 'webhook' else {}
+
+
+async def run_bot(shutdown_trigger=None, register_webhook: bool = True):
+    """
+    Запускает бота. Если передана корутина shutdown_trigger, бот останавливается после её завершения:
+    long polling — после текущего запроса, в режиме webhook — после обработки уже принятых апдейтов.
+    register_webhook=False — вебхук регистрирует другой процесс бота.
+    """
+    if config.tg_bot.mode != 'webhook':
+        await bot.delete_webhook(drop_pending_updates=False)
+        if shutdown_trigger is None:
+            await dp.start_polling(bot)
+            return
 
-async def run_bot():
-    await bot.delete_webhook(drop_pending_updates=False)
+        polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+        stop = asyncio.create_task(shutdown_trigger())
+        await asyncio.wait((polling, stop), return_when=asyncio.FIRST_COMPLETED)
+        if not polling.done():
+            await dp.stop_polling()
+        stop.cancel()
+        await polling
+        return
 
-    await dp.start_polling(bot)
+    # Апдейты приходят на вебхук веб-сервера, здесь только регистрируем его и разбираем очередь
+    try:
+        if register_webhook:
+            await bot.set_webhook(
+                f"{config.webhook.url}{config.webhook.path}",
+                secret_token=config.webhook.secret,
+                allowed_updates=dp.resolve_used_update_types(),
+                drop_pending_updates=False
+            )
+        await dp.emit_startup(bot=bot)
+        workers = asyncio.create_task(webhook_app.run_workers(config.tg_bot.workers))
+        try:
+            if shutdown_trigger is None:
+                await workers
+            else:
+                await shutdown_trigger()
+                await webhook_app.drain(Config.SHUTDOWN_TIMEOUT)
+        finally:
+            workers.cancel()
+            await dp.emit_shutdown(bot=bot)
+    finally:
+        await bot.session.close()
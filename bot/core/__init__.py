@@ -1 +1 @@
-from .config import storage, config, bot
+from .config import storage, isolation, config, bot
@@ -1,36 +1,109 @@
+import json
 import os
+from functools import partial
 
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from aiogram.fsm.storage.redis import RedisStorage
 from dataclasses import dataclass
 from dotenv import load_dotenv
+from redis.asyncio import Redis
 
-load_dotenv()
-
+from app.core.config import Config as AppConfig
 
-storage = MemoryStorage()
+load_dotenv()
 
 
 @dataclass
 class TgBot:
     token: str
+    mode: str  # 'polling' или 'webhook'
+    workers: int
+    queue_size: int
+
+
+@dataclass
+class Webhook:
+    url: str
+    path: str
+    secret: str | None
+
+
+@dataclass
+class Fsm:
+    storage: str  # 'memory' или 'redis'
+    ttl: int
 
 
 @dataclass
 class Config:
     tg_bot: TgBot
+    webhook: Webhook
+    fsm: Fsm
 
 
 def load_config(path: str | None) -> Config:
-    return Config(
+    config = Config(
         tg_bot=TgBot(
-            token=os.getenv('BOT_TOKEN')
+            token=os.getenv('BOT_TOKEN'),
+            mode=os.getenv('BOT_MODE', 'polling').lower(),
+            workers=int(os.getenv('BOT_WORKERS', 8)),
+            queue_size=int(os.getenv('BOT_QUEUE_SIZE', 1000))
+        ),
+        webhook=Webhook(
+            url=os.getenv('WEBHOOK_URL', '').rstrip('/'),
+            path=os.getenv('WEBHOOK_PATH', '/telegram/webhook'),
+            secret=os.getenv('WEBHOOK_SECRET') or None
+        ),
+        fsm=Fsm(
+            storage=os.getenv('BOT_FSM_STORAGE', 'memory').lower(),
+            ttl=int(os.getenv('BOT_FSM_TTL', 86400))
         )
     )
+    if config.tg_bot.mode == 'webhook':
+        # Без секрета любой, кто знает адрес вебхука, мог бы присылать поддельные апдейты
+        if not config.webhook.secret:
+            raise ValueError("В режиме BOT_MODE=webhook нужно задать WEBHOOK_SECRET")
+        # Telegram принимает только HTTPS-адрес; без проверки ошибка всплыла бы в set_webhook после запуска сервера
+        if not config.webhook.url.startswith('https://'):
+            raise ValueError("В режиме BOT_MODE=webhook нужно задать WEBHOOK_URL — публичный адрес https://")
+    return config
+
+
+def build_storage(fsm: Fsm) -> BaseStorage:
+    """
+    Хранилище состояний диалогов. В Redis (те же REDIS_* из настроек приложения) состояние переживает
+    перезапуск и доступно всем экземплярам бота; неактивные диалоги удаляются через fsm.ttl секунд.
+    """
+    if fsm.storage != 'redis':
+        return MemoryStorage()
+
+    redis = Redis(
+        host=AppConfig.REDIS_HOST,
+        port=AppConfig.REDIS_PORT,
+        db=AppConfig.REDIS_DB,
+        socket_timeout=AppConfig.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=AppConfig.REDIS_SOCKET_TIMEOUT
+    )
+    return RedisStorage(
+        redis,
+        key_builder=DefaultKeyBuilder(prefix='fsm', with_bot_id=True),
+        state_ttl=fsm.ttl,
+        data_ttl=fsm.ttl,
+        # Компактный JSON: без пробелов и \u-экранирования кириллицы
+        json_dumps=partial(json.dumps, ensure_ascii=False, separators=(',', ':'))
+    )
 
 
 config: Config = load_config('.env')
 
+storage: BaseStorage = build_storage(config.fsm)
+# Апдейты одного пользователя обрабатываются по очереди (в Redis — и между экземплярами бота),
+# чтобы параллельные воркеры вебхука не перезаписывали состояние друг друга
+isolation: BaseEventIsolation = (storage.create_isolation() if isinstance(storage, RedisStorage)
+                                 else SimpleEventIsolation())
+
 default = DefaultBotProperties(parse_mode='HTML')
 bot: Bot = Bot(token=config.tg_bot.token, default=default)
@@ -1,12 +1,12 @@
 import asyncio
-from datetime import datetime
 
 from aiogram import F, Router
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
-from app.services.weather_service import get_weather_by_location, get_location_key
+from app.services.route_forecast import forecast_route_async
+from app.utils import normalize_forecast, translate_weather
 from ..core import bot
 from ..keyboards import UserKeyboards as User_kb
 from ..lexicon import LEXICON
@@ -87,52 +87,53 @@ async def interval_selected(callback: CallbackQuery, state: FSMContext):
 
     # Функция для форматирования детализированной информации о погоде
     def format_forecast(forecast_data):
+        series = normalize_forecast(forecast_data).head(days)
         details = ""
-        for i in range(days):
-            day_forecast = forecast_data['DailyForecasts'][i]
-            date = day_forecast.get('Date', '')
-            formatted_date = datetime.strptime(date, '%Y-%m-%dT%H:%M:%S%z').strftime('%d.%m.%Y')
-
-            details += f"<b>Дата:</b> {formatted_date}\n"
-            details += f"<b>Макс. температура:</b> {day_forecast['Temperature']['Maximum']['Value']}°C\n"
-            details += f"<b>Мин. температура:</b> {day_forecast['Temperature']['Minimum']['Value']}°C\n"
-            details += f"<b>Днём ощущается как:</b> {day_forecast['RealFeelTemperature']['Maximum']['Value']}°C\n"
-            details += f"<b>Ночью ощущается как:</b> {day_forecast['RealFeelTemperature']['Minimum']['Value']}°C\n"
-            details += f"<b>Влажность днём:</b> {day_forecast['Day']['RelativeHumidity']}%\n"
-            details += f"<b>Влажность ночью:</b> {day_forecast['Night']['RelativeHumidity']}%\n"
-            details += f"<b>Облачность днём:</b> {day_forecast['Day']['CloudCover']}%\n"
-            details += f"<b>Облачность ночью:</b> {day_forecast['Night']['CloudCover']}%\n"
-            details += f"<b>Скорость ветра:</b> {day_forecast['Day']['Wind']['Speed']['Value']} км/ч\n"
-            details += f"<b>Вероятность осадков:</b> {day_forecast['Day']['PrecipitationProbability']}%\n"
-            details += f"<b>Тип осадков:</b> {day_forecast['Day'].get('PrecipitationType', 'Нет данных')}\n"
+        for i in range(len(series)):
+            day = series.day(i)
+
+            details += f"<b>Дата:</b> {day['dates']}\n"
+            details += f"<b>Макс. температура:</b> {day['max_temps']}°C\n"
+            details += f"<b>Мин. температура:</b> {day['min_temps']}°C\n"
+            details += f"<b>Днём ощущается как:</b> {day['day_real_feels']}°C\n"
+            details += f"<b>Ночью ощущается как:</b> {day['night_real_feels']}°C\n"
+            details += f"<b>Влажность днём:</b> {day['day_avg_humidities']}%\n"
+            details += f"<b>Влажность ночью:</b> {day['night_avg_humidities']}%\n"
+            details += f"<b>Облачность днём:</b> {day['day_clouds']}%\n"
+            details += f"<b>Облачность ночью:</b> {day['night_clouds']}%\n"
+            details += f"<b>Скорость ветра:</b> {day['wind_speeds']} км/ч\n"
+            details += f"<b>Вероятность осадков:</b> {day['precip_probs']}%\n"
+            details += f"<b>Тип осадков:</b> {translate_weather(day['precip_types'])}\n"
         return details
 
     # Получаем прогнозы для всех точек маршрута
     forecast_message = f"<b>Прогноз погоды на {days} дней:</b>\n\n"
 
+    # Прогнозы для всех точек маршрута запрашиваются параллельно
+    start_result, end_result, *intermediate_results = await forecast_route_async(
+        [start_point, end_point, *intermediate_points], days
+    )
+
     # Прогноз для начальной точки
-    start_forecast = get_weather_by_location(start_point[0], start_point[1], days)
-    if start_forecast:
-        forecast_message += f"<b>Начальная точка:</b> {start_point}\n{format_forecast(start_forecast)}"
+    if start_result.ok:
+        forecast_message += f"<b>Начальная точка:</b> {start_point}\n{format_forecast(start_result.forecast)}"
     else:
         await callback.message.answer("Не удалось получить прогноз для начальной точки.")
         return
 
     # Прогноз для конечной точки
-    end_forecast = get_weather_by_location(end_point[0], end_point[1], days)
-    if end_forecast:
-        forecast_message += f"<b>Конечная точка:</b> {end_point}\n{format_forecast(end_forecast)}"
+    if end_result.ok:
+        forecast_message += f"<b>Конечная точка:</b> {end_point}\n{format_forecast(end_result.forecast)}"
     else:
         await callback.message.answer("Не удалось получить прогноз для конечной точки.")
         return
 
     # Прогнозы для промежуточных точек
-    if intermediate_points:
+    if intermediate_results:
         forecast_message += "\n<b>Промежуточные точки:</b>\n"
-        for idx, point in enumerate(intermediate_points, start=1):
-            forecast = get_weather_by_location(point[0], point[1], days)
-            if forecast:
-                forecast_message += f"<b>Точка {idx}:</b> {point}\n{format_forecast(forecast)}"
+        for idx, result in enumerate(intermediate_results, start=1):
+            if result.ok:
+                forecast_message += f"<b>Точка {idx}:</b> {result.point}\n{format_forecast(result.forecast)}"
             else:
                 await callback.message.answer(f"Не удалось получить прогноз для промежуточной точки {idx}.")
                 return
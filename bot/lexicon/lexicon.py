@@ -16,7 +16,8 @@ LEXICON: dict[str, str] = {
     'additional_info': "\n\n<i>Для более подробной информации можете посетить "
                        "<a href='http://127.0.0.1:5000'>наш сайт</a></i>",
     'forecast_data': 'Прогноз: {icon_phrase}\n'
-                     '{}'
+                     '{}',
+    'throttled_message': "Слишком много запросов, подождите немного ⏳"
 }
 
 buttons: dict[str, str] = {
@@ -1 +1 @@
-from .middlewares import RateLimitMiddleware, BanMiddleware, TechnicalWork, WelcomeStub
+from .middlewares import ThrottlingMiddleware
@@ -1,13 +1,30 @@
 import asyncio
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram.enums import ChatType
+from aiogram.types import TelegramObject, Update
 from typing import Callable, Dict, Any, Awaitable
 
+from app.services.blocking import blocking_bridge
+from app.services.throttle import TokenBucketLimiter
+from ..lexicon import LEXICON
 
-class RateLimitMiddleware(BaseMiddleware):
-    def __init__(self, delay: float = 0.3):
-        self.delay = delay
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничение частоты апдейтов: корзина токенов на пользователя и отдельная на групповой чат.
+
+    Обычный трафик проходит без задержек. Апдейт сверх лимита откладывается, если токен появится
+    не позже чем через max_defer секунд, иначе отбрасывается: на нажатие кнопки бот отвечает
+    всплывающим предупреждением, на сообщение — одним предупреждением на серию отброшенных.
+    Регистрируется как outer-middleware апдейтов, поэтому отброшенные апдейты не доходят до хендлеров и FSM.
+    """
+
+    def __init__(self, user_limiter: TokenBucketLimiter, chat_limiter: TokenBucketLimiter, max_defer: float = 0):
+        self.user_limiter = user_limiter
+        self.chat_limiter = chat_limiter
+        self.max_defer = max_defer
+        self._warned = set()
         super().__init__()
 
     async def __call__(
@@ -16,5 +33,51 @@ class RateLimitMiddleware(BaseMiddleware):
             event: TelegramObject,
             data: Dict[str, Any]
     ) -> Any:
-        await asyncio.sleep(self.delay)
+        user = data.get('event_from_user')
+        chat = data.get('event_chat')
+
+        allowed, wait = True, 0.0
+        if user is not None:
+            allowed, wait = await self._acquire(self.user_limiter, str(user.id))
+        # В личном чате лимит чата совпадал бы с лимитом пользователя
+        if allowed and chat is not None and chat.type != ChatType.PRIVATE:
+            allowed, chat_wait = await self._acquire(self.chat_limiter, str(chat.id))
+            wait = max(wait, chat_wait)
+            # Апдейт отброшен из-за лимита чата: токен пользователя возвращается,
+            # иначе занятая группа расходовала бы его лимит и в личном чате
+            if not allowed and user is not None:
+                await self._refund(self.user_limiter, str(user.id))
+
+        if not allowed:
+            await self._warn(event, user.id if user is not None else None)
+            return None
+
+        if user is not None:
+            self._warned.discard(user.id)
+        if wait > 0:
+            await asyncio.sleep(wait)
         return await handler(event, data)
+
+    async def _acquire(self, limiter: TokenBucketLimiter, key: str) -> tuple[bool, float]:
+        # Корзины в памяти проверяются сразу, обращение к Redis — в пуле потоков
+        if limiter.client is None:
+            return limiter.acquire(key, self.max_defer)
+        return await blocking_bridge.run(limiter.acquire, key, self.max_defer)
+
+    async def _refund(self, limiter: TokenBucketLimiter, key: str):
+        if limiter.client is None:
+            limiter.refund(key)
+        else:
+            await blocking_bridge.run(limiter.refund, key)
+
+    async def _warn(self, event: TelegramObject, user_id: int | None):
+        if not isinstance(event, Update):
+            return
+
+        if event.callback_query is not None:
+            await event.callback_query.answer(LEXICON['throttled_message'])
+        elif event.message is not None and user_id not in self._warned:
+            if len(self._warned) >= 10000:
+                self._warned.clear()
+            self._warned.add(user_id)
+            await event.message.answer(LEXICON['throttled_message'])
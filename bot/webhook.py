@@ -0,0 +1,98 @@
+import asyncio
+import hmac
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookApp:
+    """
+    ASGI-приложение для вебхука Telegram.
+
+    Запрос проверяется по секретному токену (без него вебхук отклоняет все запросы), апдейт разбирается
+    и кладётся в ограниченную очередь, а Telegram сразу получает ответ 200. Очередь разбирают workers задач
+    asyncio (run_workers), поэтому медленный хендлер не задерживает ни ответ Telegram, ни остальные апдейты.
+    Задачи выполняются в одном процессе и одном event loop: они дают конкурентность при ожидании сети,
+    но не используют несколько ядер — для этого запускается несколько процессов бота.
+    Если очередь переполнена, возвращается 503, и Telegram повторит доставку позже.
+
+    Цена быстрого ответа: подтверждённые, но ещё не обработанные апдейты живут только в памяти процесса.
+    При обычной остановке они дорабатываются (drain), а при падении или принудительном завершении теряются —
+    Telegram их повторно не пришлёт.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, secret: str | None, queue_size: int):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.secret = secret
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.queue_size)
+        return self._queue
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST':
+            return await self._respond(send, 405)
+
+        headers = dict(scope['headers'])
+        token = headers.get(b'x-telegram-bot-api-secret-token', b'').decode()
+        if not self.secret or not hmac.compare_digest(token, self.secret):
+            return await self._respond(send, 403)
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        try:
+            update = Update.model_validate_json(bytes(body), context={'bot': self.bot})
+        except ValidationError:
+            return await self._respond(send, 400)
+
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Очередь апдейтов переполнена, апдейт %s отклонён", update.update_id)
+            return await self._respond(send, 503)
+
+        await self._respond(send, 200)
+
+    @staticmethod
+    async def _respond(send, status: int):
+        await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-length', b'0')]})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception:
+                logger.exception("Ошибка обработки апдейта %s", update.update_id)
+            finally:
+                self.queue.task_done()
+
+    async def run_workers(self, workers: int):
+        """
+        Обрабатывает апдейты из очереди в workers конкурентных задачах, пока не будет отменён.
+        """
+        await asyncio.gather(*(self._worker() for _ in range(workers)))
+
+    async def drain(self, timeout: float):
+        """
+        Ждёт, пока воркеры обработают уже принятые апдейты (Telegram не пришлёт их повторно), не дольше timeout секунд.
+        """
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Не обработано апдейтов при остановке: %s", self.queue.qsize())
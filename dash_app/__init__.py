@@ -1,6 +1,7 @@
 from dash import Dash, dcc, html
-from .callbacks import register_callbacks
+from .callbacks import register_callbacks, register_compare_callbacks
 from .callbacks.callbacks import layout
+from .callbacks.compare import compare_layout
 
 
 def create_dash_app(flask_app):
@@ -14,3 +15,19 @@ def create_dash_app(flask_app):
     register_callbacks(dash_app)
     
     return dash_app
+
+
+def create_compare_app(flask_app):
+    """
+    Сравнение прогнозов нескольких городов на одном графике: /dash/compare/.
+    """
+    dash_app = Dash(
+        __name__,
+        server=flask_app,
+        url_base_pathname='/dash/compare/'
+    )
+
+    dash_app.layout = compare_layout()
+    register_compare_callbacks(dash_app)
+
+    return dash_app
@@ -1 +1,2 @@
 from .callbacks import register_callbacks
+from .compare import register_compare_callbacks
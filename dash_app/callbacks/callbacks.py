@@ -1,9 +1,17 @@
-from dash import dcc, html, Input, Output
-import plotly.graph_objs as go
+from urllib.parse import parse_qs
+
+from dash import dcc, html, Input, Output, State
+
+from ..figures import SLICE_FIGURE_JS, build_figures_json, dark_template
 
 
 def layout():
     return html.Div([
+        # Ключ рядов прогноза приходит в параметре series адреса iframe
+        dcc.Location(id='url', refresh=False),
+        # Готовые графики прогноза (JSON) и тема оформления: переключение графиков и дней идёт в браузере
+        dcc.Store(id='forecast-figures'),
+        dcc.Store(id='figure-template', data=dark_template()),
         html.Div([
             dcc.Dropdown(
                 id='interval-selector',
@@ -24,7 +32,10 @@ def layout():
                     {'label': 'Влажность', 'value': 'humidity'},
                     {'label': 'Облачность', 'value': 'cloud_cover'},
                     {'label': 'Скорость ветра', 'value': 'wind'},
-                    {'label': 'Вероятность осадков', 'value': 'precipitation'}
+                    {'label': 'Вероятность осадков', 'value': 'precipitation'},
+                    {'label': 'Температура по часам', 'value': 'hourly_temperature'},
+                    {'label': 'Осадки по часам', 'value': 'hourly_precipitation'},
+                    {'label': 'Ветер по часам', 'value': 'hourly_wind'}
                 ],
                 value='temperature',
                 clearable=False,
@@ -41,74 +52,44 @@ def layout():
 
 def register_callbacks(dash_app):
     @dash_app.callback(
-        Output('weather-forecast-graph', 'figure'),
-        Input('interval-selector', 'value'),
-        Input('graph-type', 'value')
+        Output('forecast-figures', 'data'),
+        Input('url', 'search')
     )
-    def update_graph(days, graph_type):
-        dash_data = dash_app.server.config.get('DASH_DATA')
-        if not dash_data:
-            return go.Figure().update_layout(title="Нет данных для отображения")
-
-        days = days or 5
-        dates = dash_data['dates'][:days]  # Обрезаем данные по числу дней
-
-        if graph_type == 'temperature':
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['max_temps'][:days], mode='lines+markers',
-                                     name='Макс. температура', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['min_temps'][:days], mode='lines+markers',
-                                     name='Мин. температура', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['day_real_feels'][:days], mode='lines+markers',
-                                     name='Днём ощущается как', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['night_real_feels'][:days], mode='lines+markers',
-                                     name='Ночью ощущается как', line={'shape': 'linear'}))
-
-            fig.update_layout(title="Температура", yaxis_title="°C")
-
-        elif graph_type == 'real_feel':
-            fig = go.Figure(go.Scatter(x=dates, y=dash_data['day_real_feels'][:days], mode='lines+markers',
-                                       name='Днём ощущается как', line={'shape': 'linear'}))
-            fig.update_layout(title="Ощущается как", yaxis_title="°C")
+    def load_figures(search):
+        from app.services.series_store import series_store
 
-        elif graph_type == 'precipitation':
-            fig = go.Figure(go.Bar(x=dates, y=dash_data['precip_probs'][:days], name='Вероятность осадков'))
+        series_key = parse_qs((search or '').lstrip('?')).get('series', [None])[0]
+        if not series_key:
+            return None
 
-            fig.update_layout(title="Вероятность осадков", yaxis_title="%")
+        if series_store.get(series_key) is None:
+            _restore_series(series_key)
+        return series_store.figures(series_key, build_figures_json)
 
-        elif graph_type == 'wind':
-            fig = go.Figure(go.Scatter(x=dates, y=dash_data['wind_speeds'][:days], mode='lines+markers',
-                                       name='Скорость ветра', line={'shape': 'linear'}))
-
-            fig.update_layout(title="Скорость ветра", yaxis_title="км/ч")
-
-        elif graph_type == 'humidity':
-            fig = go.Figure()
-
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['day_min_humidities'][:days], mode='lines+markers',
-                                     name='Минимальная влажность днём', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['day_avg_humidities'][:days], mode='lines+markers',
-                                     name='Средняя влажность днём', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['day_max_humidities'][:days], mode='lines+markers',
-                                     name='Максимальная влажность днём', line={'shape': 'linear'}))
-
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['night_min_humidities'][:days], mode='lines+markers',
-                                     name='Минимальная влажность ночью', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['night_avg_humidities'][:days], mode='lines+markers',
-                                     name='Средняя влажность ночью', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['night_max_humidities'][:days], mode='lines+markers',
-                                     name='Максимальная влажность ночью', line={'shape': 'linear'}))
+    dash_app.clientside_callback(
+        SLICE_FIGURE_JS,
+        Output('weather-forecast-graph', 'figure'),
+        Input('interval-selector', 'value'),
+        Input('graph-type', 'value'),
+        Input('forecast-figures', 'data'),
+        State('figure-template', 'data')
+    )
 
-            fig.update_layout(title="Влажность", yaxis_title="%")
 
-        elif graph_type == 'cloud_cover':
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['day_clouds'][:days], mode='lines+markers',
-                                     name='Облачность днём', line={'shape': 'linear'}))
-            fig.add_trace(go.Scatter(x=dates, y=dash_data['night_clouds'][:days], mode='lines+markers',
-                                     name='Облачность ночью', line={'shape': 'linear'}))
+def _restore_series(series_key: str):
+    # Страницу мог отдать другой процесс веб-сервера: ряды собираются заново из общего кэша прогнозов
+    from app.services import get_coordinates_by_city, get_weather_by_location, get_hourly_forecast
+    from app.services.series_store import series_store
+    from app.utils import normalize_forecast, normalize_hourly
 
-            fig.update_layout(title="Облачность", yaxis_title="%")
+    city_name, _, days = series_key.rpartition(':')
+    if not city_name or not days.isdigit():
+        return
 
-        fig.update_layout(xaxis_title="Дата", template="plotly_dark")
-        return fig
+    coordinates = get_coordinates_by_city(city_name)
+    if not coordinates:
+        return
+    forecast_data = get_weather_by_location(coordinates['lat'], coordinates['lon'], days=int(days))
+    if forecast_data and 'DailyForecasts' in forecast_data:
+        hourly = normalize_hourly(get_hourly_forecast(coordinates['lat'], coordinates['lon']))
+        series_store.put(series_key, normalize_forecast(forecast_data).head(int(days)), hourly)
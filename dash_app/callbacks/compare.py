@@ -0,0 +1,84 @@
+import json
+import re
+
+from dash import dcc, html, Input, Output, State
+
+from ..figures import COMPARE_FIGURE_JS, COMPARE_METRICS, dark_template
+
+
+def compare_layout():
+    return html.Div([
+        html.Div([
+            dcc.Input(
+                id='compare-cities',
+                type='text',
+                placeholder='Города через запятую: Москва, Казань, Тверь',
+                debounce=True,
+                style={'width': '60%', 'margin-right': '20px'}
+            ),
+            html.Button('Сравнить', id='compare-button', n_clicks=0),
+        ], style={'display': 'flex', 'justify-content': 'center', 'margin-bottom': '20px'}),
+        html.Div([
+            dcc.Dropdown(
+                id='compare-metric',
+                options=[{'label': title, 'value': metric} for metric, (title, _, _) in COMPARE_METRICS.items()],
+                value='max_temps',
+                clearable=False,
+                style={'width': '80%', 'margin-bottom': '20px', 'margin-right': '40px'}
+            ),
+            dcc.Dropdown(
+                id='compare-days',
+                options=[
+                    {'label': '1 день', 'value': 1},
+                    {'label': '3 дня', 'value': 3},
+                    {'label': '5 дней', 'value': 5},
+                ],
+                value=5,
+                clearable=False,
+                style={'width': '80%', 'margin-bottom': '20px'}
+            ),
+        ], style={'display': 'flex', 'justify-content': 'center'}),
+        html.Div(id='compare-errors', style={'text-align': 'center', 'color': '#e74c3c'}),
+
+        # Ряды всех городов (JSON) и тема оформления: смена показателя и дней не обращается к серверу
+        dcc.Store(id='compare-series'),
+        dcc.Store(id='compare-template', data=dark_template()),
+
+        html.Div(
+            dcc.Graph(id='compare-graph'),
+            style={'display': 'flex', 'justify-content': 'center'}
+        )
+    ])
+
+
+def register_compare_callbacks(dash_app):
+    @dash_app.callback(
+        Output('compare-series', 'data'),
+        Output('compare-errors', 'children'),
+        Input('compare-button', 'n_clicks'),
+        Input('compare-cities', 'value'),
+        prevent_initial_call=True
+    )
+    def load_series(_, value):
+        # Ряды берутся тем же пакетным путём, что и POST /api/series
+        from app.core.config import Config
+        from app.routes.api import collect_series, SERIES_DEFAULT_FIELDS
+
+        cities = list(dict.fromkeys(city.strip() for city in re.split(r'[,;\n]', value or '') if city.strip()))
+        if not cities:
+            return None, "Введите хотя бы один город."
+        if len(cities) > Config.SERIES_MAX_CITIES:
+            return None, f"Можно сравнить не более {Config.SERIES_MAX_CITIES} городов."
+
+        items = collect_series(cities, 5, SERIES_DEFAULT_FIELDS)
+        errors = "; ".join(item['error'] for item in items if 'error' in item)
+        return json.dumps(items, ensure_ascii=False, separators=(',', ':')), errors
+
+    dash_app.clientside_callback(
+        COMPARE_FIGURE_JS,
+        Output('compare-graph', 'figure'),
+        Input('compare-metric', 'value'),
+        Input('compare-days', 'value'),
+        Input('compare-series', 'data'),
+        State('compare-template', 'data')
+    )
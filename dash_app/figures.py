@@ -0,0 +1,150 @@
+import json
+import math
+
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+
+# Графики по типам: заголовок, подпись оси Y и линии (столбец рядов прогноза, подпись, вид графика)
+GRAPHS = {
+    'temperature': ("Температура", "°C", [
+        ('max_temps', 'Макс. температура', 'scatter'),
+        ('min_temps', 'Мин. температура', 'scatter'),
+        ('day_real_feels', 'Днём ощущается как', 'scatter'),
+        ('night_real_feels', 'Ночью ощущается как', 'scatter'),
+    ]),
+    'real_feel': ("Ощущается как", "°C", [
+        ('day_real_feels', 'Днём ощущается как', 'scatter'),
+    ]),
+    'humidity': ("Влажность", "%", [
+        ('day_min_humidities', 'Минимальная влажность днём', 'scatter'),
+        ('day_avg_humidities', 'Средняя влажность днём', 'scatter'),
+        ('day_max_humidities', 'Максимальная влажность днём', 'scatter'),
+        ('night_min_humidities', 'Минимальная влажность ночью', 'scatter'),
+        ('night_avg_humidities', 'Средняя влажность ночью', 'scatter'),
+        ('night_max_humidities', 'Максимальная влажность ночью', 'scatter'),
+    ]),
+    'cloud_cover': ("Облачность", "%", [
+        ('day_clouds', 'Облачность днём', 'scatter'),
+        ('night_clouds', 'Облачность ночью', 'scatter'),
+    ]),
+    'wind': ("Скорость ветра", "км/ч", [
+        ('wind_speeds', 'Скорость ветра', 'scatter'),
+    ]),
+    'precipitation': ("Вероятность осадков", "%", [
+        ('precip_probs', 'Вероятность осадков', 'bar'),
+    ]),
+}
+
+# Почасовые графики: те же поля, что у дневных, но по рядам HourlySeries
+HOURLY_GRAPHS = {
+    'hourly_temperature': ("Температура по часам", "°C", [
+        ('temps', 'Температура', 'scatter'),
+        ('real_feels', 'Ощущается как', 'scatter'),
+    ]),
+    'hourly_precipitation': ("Вероятность осадков по часам", "%", [
+        ('precip_probs', 'Вероятность осадков', 'bar'),
+    ]),
+    'hourly_wind': ("Скорость ветра по часам", "км/ч", [
+        ('wind_speeds', 'Скорость ветра', 'scatter'),
+    ]),
+}
+
+# Срез по выбранному числу дней и тема оформления применяются в браузере, без запроса к серверу;
+# у почасовых графиков на день приходится per_day точек
+SLICE_FIGURE_JS = """
+function(days, graphType, figures, template) {
+    const figure = figures ? JSON.parse(figures)[graphType] : null;
+    if (!figure) {
+        const text = figures ? 'Почасовой прогноз недоступен' : 'Нет данных для отображения';
+        return {data: [], layout: {title: {text: text}, template: template}};
+    }
+    const limit = (days || 5) * (figure.per_day || 1);
+    const data = figure.data.map(trace => Object.assign({}, trace, {
+        x: trace.x.slice(0, limit),
+        y: trace.y.slice(0, limit)
+    }));
+    return {data: data, layout: Object.assign({}, figure.layout, {template: template})};
+}
+"""
+
+
+# Показатели для сравнения городов: столбец рядов, заголовок, подпись оси Y и вид графика
+COMPARE_METRICS = {
+    'max_temps': ("Максимальная температура", "°C", 'scatter'),
+    'min_temps': ("Минимальная температура", "°C", 'scatter'),
+    'precip_probs': ("Вероятность осадков", "%", 'bar'),
+    'wind_speeds': ("Скорость ветра", "км/ч", 'scatter'),
+}
+
+# Наложение рядов всех городов по выбранному показателю и срез по дням — в браузере
+COMPARE_FIGURE_JS = """
+function(metric, days, series, template) {
+    const metrics = %s;
+    const [title, unit, kind] = metrics[metric];
+    const layout = {
+        template: template,
+        title: {text: series ? title : 'Введите города для сравнения'},
+        xaxis: {title: {text: 'Дата'}},
+        yaxis: {title: {text: unit}},
+        barmode: 'group'
+    };
+    if (!series) {
+        return {data: [], layout: layout};
+    }
+    const data = JSON.parse(series).filter(item => !item.error).map(item => {
+        const trace = {type: kind, name: item.city, x: item.dates.slice(0, days), y: item[metric].slice(0, days)};
+        return kind === 'bar' ? trace : Object.assign(trace, {mode: 'lines+markers', line: {shape: 'linear'}});
+    });
+    return {data: data, layout: layout};
+}
+""" % json.dumps({metric: list(spec) for metric, spec in COMPARE_METRICS.items()}, ensure_ascii=False)
+
+
+def _values(column) -> list:
+    # NaN не входит в JSON, Plotly показывает null как пропуск
+    return [None if isinstance(value, float) and math.isnan(value) else value for value in column.tolist()]
+
+
+def _trace(kind: str, name: str, x: list, y: list) -> dict:
+    if kind == 'bar':
+        return {'type': 'bar', 'x': x, 'y': y, 'name': name}
+    return {'type': 'scatter', 'x': x, 'y': y, 'mode': 'lines+markers', 'name': name, 'line': {'shape': 'linear'}}
+
+
+def _figures(graphs: dict, x: list, column, xaxis_title: str) -> dict:
+    # column(поле) возвращает массив значений ряда для линии графика
+    return {
+        graph_type: {
+            'data': [_trace(kind, name, x, _values(column(field))) for field, name, kind in traces],
+            'layout': {
+                'title': {'text': title},
+                'xaxis': {'title': {'text': xaxis_title}},
+                'yaxis': {'title': {'text': yaxis_title}},
+            },
+        }
+        for graph_type, (title, yaxis_title, traces) in graphs.items()
+    }
+
+
+def build_figures_json(series, hourly=None) -> str:
+    """
+    Все графики для рядов прогноза в виде JSON одной строкой: {тип графика: {data, layout}}.
+    Почасовые графики добавляются, если передан почасовой прогноз (HourlySeries).
+    Фигуры собираются из обычных словарей, без объектов plotly и их проверки.
+    """
+    figures = _figures(GRAPHS, series['dates'].tolist(), lambda name: series[name], "Дата")
+    if hourly is not None and len(hourly):
+        # float32 округляется до десятых, чтобы в JSON не попадали хвосты вида 12.300000190734863
+        hourly_figures = _figures(HOURLY_GRAPHS, list(hourly.labels),
+                                  lambda name: hourly[name].astype(float).round(1), "Время")
+        for figure in hourly_figures.values():
+            figure['per_day'] = 24
+        figures.update(hourly_figures)
+    return json.dumps(figures, ensure_ascii=False, separators=(',', ':'))
+
+
+def dark_template() -> dict:
+    """
+    Тема plotly_dark в виде JSON-совместимого словаря; передаётся в браузер один раз вместе с разметкой.
+    """
+    return json.loads(to_json_plotly(pio.templates['plotly_dark'].to_plotly_json()))
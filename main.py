@@ -3,19 +3,23 @@ import asyncio
 import locale
 
 from app import flask_app, run_flask
-from app.routes import weather_blueprint, errors_blueprint
-from bot import run_bot
+from app.routes import register_blueprints
+from app.services import upstream
+from app.services.refresher import refresher
+from bot import run_bot, webhook_routes
 
 locale.setlocale(locale.LC_ALL, 'ru_RU.UTF-8')
 sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
 sys.stderr = open(sys.stderr.fileno(), mode='w', encoding='utf-8', buffering=1)
 
-flask_app.register_blueprint(weather_blueprint)
-flask_app.register_blueprint(errors_blueprint)
+register_blueprints(flask_app)
 
 
 async def main():
-    await asyncio.gather(run_flask(), run_bot())
+    try:
+        await asyncio.gather(run_flask(webhook_routes()), run_bot(), refresher.run())
+    finally:
+        await upstream.close()
 
 
 if __name__ == '__main__':
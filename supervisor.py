@@ -0,0 +1,234 @@
+import sys
+import os
+import time
+import signal
+import asyncio
+import locale
+import multiprocessing
+
+from hypercorn.config import Config as ServerConfig
+
+from app.core.config import Config
+
+locale.setlocale(locale.LC_ALL, 'ru_RU.UTF-8')
+sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
+sys.stderr = open(sys.stderr.fileno(), mode='w', encoding='utf-8', buffering=1)
+
+# Процессы запускаются заново (spawn), а не копией супервизора: так им не достаются его потоки и соединения
+context = multiprocessing.get_context('spawn')
+
+
+async def _wait_stop(stop_flag, parent_pid: int):
+    # Процесс останавливается и тогда, когда супервизор завершился аварийно
+    while not stop_flag.value and os.getppid() == parent_pid:
+        await asyncio.sleep(0.2)
+
+
+async def _heartbeat(heartbeat):
+    # Отметка обновляется из event loop процесса: если loop завис, супервизор увидит устаревшее время
+    while True:
+        heartbeat.value = time.time()
+        await asyncio.sleep(Config.HEALTH_CHECK_INTERVAL)
+
+
+async def _serve_web(bind: list[str], stop):
+    from app import flask_app, run_flask
+    from app.routes import register_blueprints
+    from app.services import upstream
+    from app.services.refresher import refresher
+
+    register_blueprints(flask_app)
+    refresh = asyncio.create_task(refresher.run())
+    try:
+        await run_flask(bind=bind, shutdown_trigger=stop)
+    finally:
+        refresh.cancel()
+        await upstream.close()
+
+
+async def _serve_bot(index: int, bind: list[str], stop):
+    from app import serve_asgi
+    from app.asgi import PathDispatcher, not_found
+    from app.services import upstream
+    from bot import run_bot, webhook_routes
+
+    try:
+        if not bind:
+            await run_bot(stop)
+            return
+        # Вебхук регистрирует один процесс, апдейты принимают все через общий сокет
+        await asyncio.gather(
+            serve_asgi(PathDispatcher(webhook_routes(), not_found), bind, stop),
+            run_bot(stop, register_webhook=index == 0)
+        )
+    finally:
+        await upstream.close()
+
+
+def _worker_main(role: str, index: int, sockets: list, stop_flag, heartbeat, parent_pid: int):
+    # Ctrl+C получает вся группа процессов, а останавливать процессы по порядку должен супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def main():
+        stop = lambda: _wait_stop(stop_flag, parent_pid)  # noqa: E731
+        bind = [f"fd://{sock.fileno()}" for sock in sockets]
+        beat = asyncio.create_task(_heartbeat(heartbeat))
+        try:
+            if role == 'web':
+                await _serve_web(bind, stop)
+            else:
+                await _serve_bot(index, bind, stop)
+        finally:
+            beat.cancel()
+
+    asyncio.run(main())
+
+
+class Worker:
+    """
+    Дочерний процесс супервизора: роль (web или bot), номер, общие слушающие сокеты и отметка живости.
+    """
+
+    def __init__(self, role: str, index: int, sockets: list, stop_flag):
+        self.role = role
+        self.index = index
+        self.sockets = sockets
+        self.stop_flag = stop_flag
+        self.heartbeat = context.RawValue('d', 0.0)
+        self.process = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.role}-{self.index}"
+
+    def start(self):
+        self.started_at = self.heartbeat.value = time.time()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(self.role, self.index, self.sockets, self.stop_flag, self.heartbeat, os.getpid()),
+            name=self.name,
+            daemon=True
+        )
+        self.process.start()
+        print(f"Процесс {self.name} запущен, pid {self.process.pid}")
+
+    def stale(self, timeout: float) -> bool:
+        return time.time() - self.heartbeat.value > timeout
+
+
+class Supervisor:
+    """
+    Запускает web_processes процессов веб-сервера и bot_processes процессов бота, следит за ними и перезапускает
+    завершившиеся и зависшие (отметка живости не обновлялась HEALTH_TIMEOUT секунд) с нарастающей паузой.
+
+    Слушающие сокеты открываются здесь один раз и передаются процессам, поэтому соединения
+    распределяет ядро, а перезапуск процесса не закрывает порт. По SIGTERM или SIGINT процессы получают
+    сигнал остановки, дорабатывают текущие запросы и апдейты; не успевшие за SHUTDOWN_TIMEOUT секунд
+    завершаются принудительно.
+    """
+
+    def __init__(self, web_processes: int, bot_processes: int, bot_mode: str, fsm_storage: str = 'memory'):
+        if bot_mode != 'webhook' and bot_processes > 1:
+            # Telegram отдаёт апдейты long polling'ом только одному получателю
+            print(f"BOT_PROCESSES={bot_processes} в режиме {bot_mode}: запускается один процесс бота")
+            bot_processes = 1
+        elif fsm_storage != 'redis' and bot_processes > 1:
+            # Апдейты вебхука достаются любому процессу: состояния диалогов и лимиты частоты
+            # в памяти процесса разошлись бы между ними
+            print(f"BOT_PROCESSES={bot_processes} с BOT_FSM_STORAGE={fsm_storage}: запускается один процесс бота, "
+                  f"для нескольких процессов нужно BOT_FSM_STORAGE=redis")
+            bot_processes = 1
+        elif bot_processes > 1 and not Config.THROTTLE_REDIS:
+            print(f"THROTTLE_REDIS=False: лимиты частоты апдейтов действуют в каждом из {bot_processes} процессов бота "
+                  f"отдельно")
+        self.web_processes = web_processes
+        self.bot_processes = bot_processes
+        self.bot_mode = bot_mode
+        # Флаг без блокировки: процесс, убитый во время проверки, не оставит её занятой для остальных
+        self.stop_flag = context.RawValue('b', 0)
+        self.workers: list[Worker] = []
+        self._stopping = False
+
+    @staticmethod
+    def _listen(bind: str) -> list:
+        config = ServerConfig()
+        config.bind = [bind]
+        return config.create_sockets().insecure_sockets
+
+    def _stop(self, signum, frame):
+        print(f"Получен сигнал {signal.Signals(signum).name}, остановка")
+        self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        if self.web_processes:
+            web_sockets = self._listen(Config.WEB_BIND)
+            self.workers += [Worker('web', i, web_sockets, self.stop_flag) for i in range(self.web_processes)]
+        if self.bot_processes:
+            bot_sockets = self._listen(Config.BOT_BIND) if self.bot_mode == 'webhook' else []
+            self.workers += [Worker('bot', i, bot_sockets, self.stop_flag) for i in range(self.bot_processes)]
+
+        for worker in self.workers:
+            worker.start()
+        while not self._stopping:
+            for worker in self.workers:
+                self._check(worker)
+            time.sleep(Config.HEALTH_CHECK_INTERVAL)
+        self._shutdown()
+
+    def _check(self, worker: Worker):
+        now = time.time()
+        if worker.process is None:
+            if now >= worker.restart_at:
+                worker.start()
+            return
+
+        if worker.process.is_alive():
+            if not worker.stale(Config.HEALTH_TIMEOUT):
+                return
+            print(f"Процесс {worker.name} не отвечает {Config.HEALTH_TIMEOUT} с, перезапуск")
+            worker.process.kill()
+        else:
+            print(f"Процесс {worker.name} завершился с кодом {worker.process.exitcode}, перезапуск")
+        worker.process.join()
+        worker.process = None
+
+        # Процесс, падающий сразу после запуска, перезапускается всё реже (до 30 с)
+        worker.failures = worker.failures + 1 if now - worker.started_at < 30 else 1
+        worker.restart_at = now + min(2 ** (worker.failures - 1), 30)
+
+    def _shutdown(self):
+        self.stop_flag.value = 1
+        deadline = time.time() + Config.SHUTDOWN_TIMEOUT + Config.HEALTH_CHECK_INTERVAL
+        running = [worker.process for worker in self.workers if worker.process is not None]
+        for process in running:
+            process.join(max(deadline - time.time(), 0))
+        for process in running:
+            if process.is_alive():
+                print(f"Процесс {process.name} не остановился за {Config.SHUTDOWN_TIMEOUT} с, завершение")
+                process.terminate()
+                process.join(5)
+                if process.is_alive():
+                    process.kill()
+        print("Все процессы остановлены")
+
+
+if __name__ == '__main__':
+    bot_mode, fsm_storage = 'polling', 'memory'
+    # Настройки бота загружаются, только если он запускается: для них нужен BOT_TOKEN
+    if Config.BOT_PROCESSES > 0:
+        from bot.core.config import config as bot_config
+        bot_mode, fsm_storage = bot_config.tg_bot.mode, bot_config.fsm.storage
+
+    supervisor = Supervisor(
+        web_processes=Config.WEB_PROCESSES,
+        bot_processes=Config.BOT_PROCESSES,
+        bot_mode=bot_mode,
+        fsm_storage=fsm_storage
+    )
+    supervisor.run()
@@ -0,0 +1,154 @@
+import os
+import time
+
+import fakeredis
+import pytest
+
+# Пакет bot создаёт объект Bot при импорте: для тестов middleware хватает токена правильного формата
+os.environ.setdefault('BOT_TOKEN', '123456:test')
+os.environ.setdefault('BOT_MODE', 'polling')
+
+
+class FakeClock:
+    """
+    Подменяет модуль time в проверяемом модуле: time() и monotonic() стоят на месте, пока не вызван advance.
+    gmtime() без аргумента тоже возвращает подменённое время; остальное берётся из настоящего модуля time.
+    """
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def gmtime(self, seconds: float | None = None):
+        return time.gmtime(self.now if seconds is None else seconds)
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@pytest.fixture
+def redis_client():
+    # Отдельный сервер на тест; Lua-скрипты выполняются через lupa
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _daily(index: int) -> dict:
+    date = f'2024-12-{index + 1:02d}'
+    return {
+        'Date': f'{date}T07:00:00+03:00',
+        'EpochDate': 1733025600 + index * 86400,
+        'Sun': {'Rise': f'{date}T08:43:00+03:00', 'Set': f'{date}T16:02:00+03:00'},
+        'Temperature': {'Minimum': {'Value': -3.0 + index}, 'Maximum': {'Value': 2.0 + index}},
+        'RealFeelTemperature': {'Minimum': {'Value': -7.0}, 'Maximum': {'Value': 0.0}},
+        'Day': {'IconPhrase': 'Cloudy', 'PrecipitationProbability': 10 * index, 'CloudCover': 80,
+                'Wind': {'Speed': {'Value': 12.0}}, 'RelativeHumidity': {'Minimum': 60, 'Average': 70, 'Maximum': 80}},
+        'Night': {'CloudCover': 40, 'RelativeHumidity': {'Minimum': 70, 'Average': 80, 'Maximum': 90}},
+    }
+
+
+def _hourly(start: int) -> list:
+    return [{
+        'DateTime': time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(start + index * 3600)),
+        'EpochDateTime': start + index * 3600,
+        'Temperature': {'Value': 1.0},
+        'RealFeelTemperature': {'Value': -1.0},
+        'Wind': {'Speed': {'Value': 10.0}},
+        'PrecipitationProbability': 20,
+        'RelativeHumidity': 75,
+        'CloudCover': 90,
+        'HasPrecipitation': False,
+    } for index in range(12)]
+
+
+class FakeWeatherApi:
+    """
+    Ответы AccuWeather и Positionstack для сервисов прогноза; calls считает запросы по видам.
+    """
+
+    def __init__(self):
+        self.calls = {'geocode': 0, 'location_key': 0, 'daily': 0, 'hourly': 0, 'current': 0}
+        self.coordinates = {}  # название города -> (широта, долгота) для Positionstack
+
+    async def get_json(self, url: str, params: dict | None = None):
+        from app.services.http_client import UpstreamResponse
+
+        if 'positionstack' in url:
+            self.calls['geocode'] += 1
+            return UpstreamResponse(200, {'data': self._place(params['query'])})
+        if 'geoposition' in url:
+            self.calls['location_key'] += 1
+            return UpstreamResponse(200, {'Key': f"key-{params['q']}"})
+        if 'currentconditions' in url:
+            self.calls['current'] += 1
+            return UpstreamResponse(200, [{'EpochTime': int(time.time()), 'WeatherText': 'Cloudy',
+                                           'Temperature': {'Metric': {'Value': 1.5}}}])
+        if 'hourly' in url:
+            self.calls['hourly'] += 1
+            return UpstreamResponse(200, _hourly(int(time.time() // 3600 + 1) * 3600))
+        self.calls['daily'] += 1
+        return UpstreamResponse(200, {'Headline': {'Text': '...'}, 'DailyForecasts': [_daily(i) for i in range(5)]})
+
+    async def post_json(self, url: str, params: dict | None = None, json: dict | None = None):
+        from app.services.http_client import UpstreamResponse
+
+        self.calls['geocode'] += 1
+        return UpstreamResponse(200, {'data': [self._place(query['query']) for query in json['batch']]})
+
+    def _place(self, query: str) -> list:
+        if query not in self.coordinates:
+            return []
+        lat, lon = self.coordinates[query]
+        return [{'latitude': lat, 'longitude': lon}]
+
+
+@pytest.fixture
+def weather_api(redis_client, monkeypatch):
+    """
+    Сервисы прогноза на fakeredis с подменённым внешним API; кэши процесса очищаются до и после теста.
+    """
+    from app.services import cache, quota
+    from app.services.http_client import upstream
+    from app.services.response_cache import response_cache
+    from app.services.series_store import series_store
+    from app.services.singleflight import single_flight
+
+    api = FakeWeatherApi()
+    monkeypatch.setattr(upstream, 'get_json', api.get_json)
+    monkeypatch.setattr(upstream, 'post_json', api.post_json)
+    monkeypatch.setattr(cache.weather_cache, 'client', redis_client)
+    monkeypatch.setattr(single_flight, 'client', redis_client)
+    for budget in quota.quota_budgets.values():
+        monkeypatch.setattr(budget, 'client', redis_client)
+        monkeypatch.setattr(budget, '_script', redis_client.register_script(quota._ACQUIRE_SCRIPT))
+
+    monkeypatch.setattr(response_cache, '_stats', dict.fromkeys(response_cache._stats, 0))
+
+    local_caches = (cache.weather_cache.local, response_cache.local, series_store._local)
+    for local in local_caches:
+        local.clear()
+    yield api
+    for local in local_caches:
+        local.clear()
+
+
+@pytest.fixture
+def flask_client():
+    from app.core import flask_app
+    from app.routes import register_blueprints
+
+    if 'weather' not in flask_app.blueprints:
+        register_blueprints(flask_app)
+    return flask_app.test_client()
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.blocking import BlockingBridge, BlockingPoolOverloaded
+
+
+def test_calls_beyond_capacity_wait_for_a_slot():
+    bridge = BlockingBridge(max_workers=2, max_queue=0)
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def work(value):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return value
+
+    async def main():
+        return await asyncio.gather(*(bridge.run(work, value) for value in range(6)))
+
+    assert asyncio.run(main()) == list(range(6))
+    assert peak == 2
+    stats = bridge.stats()
+    assert (stats['calls'], stats['in_flight'], stats['waiting']) == (6, 0, 0)
+
+
+def test_waiter_times_out_when_pool_is_busy():
+    bridge = BlockingBridge(max_workers=1, max_queue=0, queue_timeout=0.05)
+
+    async def main():
+        slow = asyncio.ensure_future(bridge.run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(BlockingPoolOverloaded):
+            await bridge.run(lambda: None)
+        await slow
+
+    asyncio.run(main())
+    assert bridge.stats()['rejected'] == 1
+    assert bridge.stats()['in_flight'] == 0
+
+
+def test_slot_is_not_lost_when_waiting_loop_is_closed():
+    bridge = BlockingBridge(max_workers=1, max_queue=0)
+    asyncio.run(bridge._acquire())  # единственное место занято
+
+    # Корутина ждёт места в event loop, который закрывают, не дожидаясь её
+    abandoned = asyncio.new_event_loop()
+    abandoned.create_task(bridge._acquire())
+    abandoned.run_until_complete(asyncio.sleep(0))
+    assert bridge.stats()['waiting'] == 1
+    abandoned.close()
+
+    bridge._release()
+
+    assert (bridge.stats()['in_flight'], bridge.stats()['waiting']) == (0, 0)
+    assert asyncio.run(bridge.run(lambda: 'ok')) == 'ok'
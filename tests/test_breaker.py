@@ -0,0 +1,64 @@
+import pytest
+
+from app.services import breaker
+from app.services.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def circuit(clock, monkeypatch):
+    monkeypatch.setattr(breaker, 'time', clock)
+    return CircuitBreaker('test', failure_threshold=3, reset_timeout=30)
+
+
+def test_opens_after_consecutive_failures(circuit):
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()  # успех обнуляет счётчик неудач подряд
+    circuit.record_failure()
+    circuit.record_failure()
+    assert circuit.state == CLOSED
+
+    circuit.record_failure()
+    assert circuit.state == OPEN
+    assert not circuit.allow()
+    assert circuit.stats()['rejected'] == 1
+
+
+def test_half_open_probe_closes_circuit(circuit, clock):
+    for _ in range(3):
+        circuit.record_failure()
+    clock.advance(30)
+
+    assert circuit.state == HALF_OPEN
+    assert circuit.allow()
+    assert not circuit.allow()  # только один пробный запрос
+    circuit.record_success()
+
+    assert circuit.state == CLOSED
+    assert circuit.allow()
+
+
+def test_failed_probe_reopens_circuit(circuit, clock):
+    for _ in range(3):
+        circuit.record_failure()
+    clock.advance(30)
+
+    assert circuit.allow()
+    circuit.record_failure()
+    assert circuit.state == OPEN
+    assert circuit.stats()['opened'] == 2
+
+    clock.advance(29)
+    assert not circuit.allow()
+    clock.advance(1)
+    assert circuit.allow()
+
+
+def test_released_probe_can_be_taken_again(circuit, clock):
+    for _ in range(3):
+        circuit.record_failure()
+    clock.advance(30)
+
+    assert circuit.allow()
+    circuit.release()
+    assert circuit.allow()
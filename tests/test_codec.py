@@ -0,0 +1,40 @@
+from app.services.codec import (COMPRESS_MIN_SIZE, FORECAST_FIELDS, decode_entry, encode_entry, project)
+
+
+def test_round_trip_short_value_is_not_compressed():
+    raw = encode_entry(1700000000.5, {'lat': 55.75, 'lon': 37.61})
+
+    assert raw[:1] == b'\x00'
+    assert decode_entry(raw) == (1700000000.5, {'lat': 55.75, 'lon': 37.61})
+
+
+def test_round_trip_long_value_is_compressed():
+    value = {'DailyForecasts': [{'Date': '2024-12-01T07:00:00+03:00', 'Day': {'IconPhrase': 'Cloudy'}}] * 20}
+    raw = encode_entry(1.0, value)
+
+    assert raw[:1] == b'\x01'
+    assert len(raw) < COMPRESS_MIN_SIZE * 2
+    assert decode_entry(raw) == (1.0, value)
+
+
+def test_project_keeps_only_listed_fields():
+    day = {
+        'Date': '2024-12-01T07:00:00+03:00',
+        'Temperature': {'Minimum': {'Value': -3.0, 'Unit': 'C'}, 'Maximum': {'Value': 1.5, 'Unit': 'C'}},
+        'Day': {'IconPhrase': 'Snow', 'HasPrecipitation': True, 'Wind': {'Speed': {'Value': 12.0, 'Unit': 'km/h'},
+                                                                           'Direction': {'Degrees': 180}}},
+        'Link': 'http://www.accuweather.com/',
+    }
+    projected = project({'Headline': {'Text': '...'}, 'DailyForecasts': [day, day]}, FORECAST_FIELDS)
+
+    assert projected == {'DailyForecasts': [{
+        'Date': '2024-12-01T07:00:00+03:00',
+        'Temperature': {'Minimum': {'Value': -3.0}, 'Maximum': {'Value': 1.5}},
+        'Day': {'IconPhrase': 'Snow', 'Wind': {'Speed': {'Value': 12.0}}},
+    }] * 2}
+
+
+def test_project_passes_through_whole_values_and_non_dicts():
+    assert project({'a': {'b': 1}, 'c': 2}, {'a': True}) == {'a': {'b': 1}}
+    assert project([1, 'x'], {'a': True}) == [1, 'x']
+    assert project({'a': 1}, None) == {'a': 1}
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from app.services import gazetteer as gazetteer_module
+from app.services.gazetteer import Gazetteer, get_gazetteer, normalize_gazetteer_name
+
+_ROWS = [
+    ('moscow', 55.7558, 37.6173, '294021', 'Москва'),
+    ('moskva', 55.7558, 37.6173, '294021', 'Москва'),
+    ('mozhaisk', 55.5069, 36.0170, '', 'Можайск'),
+    ('murmansk', 68.9585, 33.0827, '', 'Мурманск'),
+    ('nizhny novgorod', 56.2965, 43.9361, '', 'Нижний Новгород'),
+    ('москва', 55.7558, 37.6173, '294021', 'Москва'),
+    ('нижний новгород', 56.2965, 43.9361, '', 'Нижний Новгород'),
+]
+
+
+def _write(path, rows, trailing_newline: bool = True) -> str:
+    rows = sorted(rows, key=lambda row: row[0].encode('utf-8'))
+    text = '\n'.join('\t'.join(map(str, row)) for row in rows)
+    path.write_text(text + ('\n' if trailing_newline else ''), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    return Gazetteer(_write(tmp_path / 'gazetteer.tsv', _ROWS))
+
+
+def test_normalize_name():
+    assert normalize_gazetteer_name('  Нижний-Новгород ') == 'нижний новгород'
+    assert normalize_gazetteer_name('Орёл') == 'орел'
+
+
+def test_exact_lookup(gazetteer):
+    entry = gazetteer.lookup('МОСКВА')
+
+    assert entry.name == 'Москва'
+    assert entry.coordinates == {'lat': 55.7558, 'lon': 37.6173}
+    assert entry.location_key == '294021'
+    assert gazetteer.lookup('Нижний-Новгород').location_key is None
+    # Первая строка файла, ключи до первой и после последней строки и неполное название
+    assert gazetteer.lookup('moscow').name == 'Москва'
+    assert gazetteer.lookup('aaa') is None
+    assert gazetteer.lookup('яя') is None
+    assert gazetteer.lookup('mos') is None
+    assert gazetteer.stats() == {'hits': 3, 'misses': 3, 'entries': len(_ROWS)}
+
+
+def test_prefix_search_skips_aliases_of_same_city(gazetteer):
+    assert [entry.name for entry in gazetteer.search_prefix('Mo')] == ['Москва', 'Можайск']
+    assert [entry.name for entry in gazetteer.search_prefix('m', limit=2)] == ['Москва', 'Можайск']
+    assert [entry.name for entry in gazetteer.search_prefix('нижн')] == ['Нижний Новгород']
+    assert gazetteer.search_prefix('x') == []
+    assert gazetteer.search_prefix('   ') == []
+
+
+def test_bundled_gazetteer_is_sorted():
+    gazetteer = Gazetteer(os.path.join(os.path.dirname(__file__), '..', 'app', 'data', 'gazetteer.tsv'))
+    keys = [gazetteer._key(index) for index in range(len(gazetteer))]
+
+    assert keys == sorted(keys)
+    assert gazetteer.lookup('Москва') == gazetteer.lookup('Moscow')
+
+
+def test_last_line_without_newline(tmp_path):
+    gazetteer = Gazetteer(_write(tmp_path / 'gazetteer.tsv', _ROWS, trailing_newline=False))
+
+    assert len(gazetteer) == len(_ROWS)
+    assert gazetteer.lookup('нижний новгород').name == 'Нижний Новгород'
+    assert [entry.name for entry in gazetteer.search_prefix('нижн')] == ['Нижний Новгород']
+
+
+@pytest.mark.parametrize('content', [None, ''])
+def test_missing_or_empty_file_disables_gazetteer(tmp_path, monkeypatch, content):
+    path = tmp_path / 'gazetteer.tsv'
+    if content is not None:
+        path.write_text(content)
+    monkeypatch.setattr(gazetteer_module.Config, 'GAZETTEER_PATH', str(path))
+    monkeypatch.setattr(gazetteer_module, '_gazetteer', None)
+
+    assert get_gazetteer() is None
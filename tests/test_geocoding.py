@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.core.config import Config
+from app.services import cache
+from app.services.geocoding_service import geocode_many_async
+from app.services.http_client import UpstreamResponse, upstream
+
+
+@pytest.fixture
+def places(weather_api):
+    weather_api.coordinates.update({'Springfield': (39.8, -89.6), 'Shelbyville': (39.4, -88.8)})
+    return weather_api
+
+
+def test_results_follow_input_order_and_spellings_share_lookup(places):
+    results = asyncio.run(geocode_many_async(['Springfield', 'Москва', ' springfield ', 'Atlantis', 'Shelbyville']))
+
+    assert results == [{'lat': 39.8, 'lon': -89.6}, {'lat': 55.7558, 'lon': 37.6173}, {'lat': 39.8, 'lon': -89.6},
+                       None, {'lat': 39.4, 'lon': -88.8}]
+    # Москва — из справочника, повторное написание Springfield в API не уходит
+    assert places.calls['geocode'] == 3
+
+
+def test_found_coordinates_are_cached_in_redis(places):
+    asyncio.run(geocode_many_async(['Springfield', 'Shelbyville']))
+    cache.weather_cache.local.clear()
+
+    assert asyncio.run(geocode_many_async(['SHELBYVILLE', 'Springfield'])) == [{'lat': 39.4, 'lon': -88.8},
+                                                                              {'lat': 39.8, 'lon': -89.6}]
+    assert places.calls['geocode'] == 2
+
+
+def test_batch_request_for_misses(places, monkeypatch):
+    monkeypatch.setattr(Config, 'POSITIONSTACK_BATCH', True)
+
+    results = asyncio.run(geocode_many_async(['Springfield', 'Tver', 'Shelbyville', 'Atlantis']))
+
+    assert results[0] == {'lat': 39.8, 'lon': -89.6} and results[2] == {'lat': 39.4, 'lon': -88.8}
+    assert results[3] is None
+    assert places.calls['geocode'] == 1
+
+
+def test_unavailable_batch_falls_back_to_single_requests(places, monkeypatch):
+    async def forbidden(url, params=None, json=None):
+        return UpstreamResponse(403, None, 'batch is not available on this plan')
+
+    monkeypatch.setattr(Config, 'POSITIONSTACK_BATCH', True)
+    monkeypatch.setattr(upstream, 'post_json', forbidden)
+
+    assert asyncio.run(geocode_many_async(['Springfield', 'Shelbyville'])) == [{'lat': 39.8, 'lon': -89.6},
+                                                                              {'lat': 39.4, 'lon': -88.8}]
+    assert places.calls['geocode'] == 2
+
+
+def test_concurrent_identical_batches_call_api_once(places):
+    async def main():
+        return await asyncio.gather(*(geocode_many_async(['Springfield', 'Shelbyville']) for _ in range(5)))
+
+    assert len({str(result) for result in asyncio.run(main())}) == 1
+    assert places.calls['geocode'] == 2
+
+
+def test_geocode_endpoint(places, flask_client):
+    response = flask_client.post('/api/geocode', json={'cities': ['Shelbyville', 'Atlantis']})
+
+    assert response.status_code == 200
+    assert response.json == {'results': [{'city': 'Shelbyville', 'coordinates': {'lat': 39.4, 'lon': -88.8}},
+                                         {'city': 'Atlantis', 'coordinates': None}]}
+    assert flask_client.post('/api/geocode', json={'cities': []}).status_code == 400
+    assert flask_client.post('/api/geocode', json={'cities': ['Tver', ' ']}).status_code == 400
+    too_many = {'cities': ['Tver'] * (Config.GEOCODE_MAX_CITIES + 1)}
+    assert flask_client.post('/api/geocode', json=too_many).status_code == 400
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from app.services.codec import HOUR, pack_hourly
+from app.utils.forecast_series import build_forecast_series
+from app.utils.hourly_series import normalize_hourly
+from app.utils.weather_utils import WeatherThresholds, score_route
+
+START = 1733032800  # 2024-12-01 06:00 UTC
+THRESHOLDS = WeatherThresholds(min_temperature=0, max_temperature=35, max_wind_speed=50,
+                               max_precipitation_probability=70)
+
+
+def _hour(index: int, temperature: float = 17.5, wind: float = 10, probability: int = 10, intensity: str = None):
+    hour = {
+        'DateTime': f'2024-12-01T{9 + index:02d}:00:00+03:00',
+        'EpochDateTime': START + index * HOUR,
+        'Temperature': {'Value': temperature},
+        'RealFeelTemperature': {'Value': temperature - 2},
+        'Wind': {'Speed': {'Value': wind}},
+        'PrecipitationProbability': probability,
+        'RelativeHumidity': 80,
+        'CloudCover': 50,
+        'HasPrecipitation': intensity is not None,
+    }
+    if intensity is not None:
+        hour['PrecipitationIntensity'] = intensity
+    return hour
+
+
+def _day(max_temperature: float = 17.5, wind: float = 10, probability: int = 10):
+    return {
+        'Date': '2024-12-01T07:00:00+03:00',
+        'EpochDate': START,
+        'Temperature': {'Minimum': {'Value': max_temperature - 5}, 'Maximum': {'Value': max_temperature}},
+        'Day': {'Wind': {'Speed': {'Value': wind}}, 'PrecipitationProbability': probability},
+    }
+
+
+def test_pack_hourly_fills_gaps_with_nan():
+    packed = pack_hourly([_hour(2, temperature=7, intensity='Light'), _hour(0, temperature=5), {'bad': 'hour'}, None])
+
+    assert packed['start'] == START
+    assert packed['step'] == HOUR
+    assert packed['offset'] == 180
+    assert packed['intensities'] == ['', '', 'Light']
+    values = np.frombuffer(packed['values'], dtype=np.float32).reshape(-1, 3)
+    assert values[0].tolist()[0::2] == [5, 7]
+    assert np.isnan(values[:, 1]).all()
+    assert pack_hourly([]) is None
+
+
+def test_normalize_hourly_views_packed_bytes():
+    packed = pack_hourly([_hour(index, temperature=index) for index in range(6)])
+    series = normalize_hourly(packed)
+
+    assert len(series) == 6
+    assert series['temps'].tolist() == [0, 1, 2, 3, 4, 5]
+    assert series['real_feels'].tolist() == [-2, -1, 0, 1, 2, 3]
+    assert np.shares_memory(series.values, np.frombuffer(packed['values'], dtype=np.float32))
+    assert series.labels[0] == '01.12 09:00'
+    assert series.timestamps[-1] == START + 5 * HOUR
+    assert normalize_hourly(None) is None
+
+
+def test_window_starts_at_arrival_hour():
+    series = normalize_hourly(pack_hourly([_hour(index, temperature=index) for index in range(6)]))
+
+    assert series.window(START + 2 * HOUR + 1800, 3)['temps'].tolist() == [2, 3, 4]
+    assert series.window(START + 5 * HOUR, 3)['temps'].tolist() == [5]
+    # Текущий час, предшествующий прогнозу, оценивается по первому часу прогноза
+    assert series.window(START - 1800, 2)['temps'].tolist() == [0, 1]
+    assert len(series.window(START + 6 * HOUR, 3)) == 0
+    assert len(series.window(START - 2 * HOUR, 3)) == 0
+
+
+def test_score_route_uses_hours_at_arrival():
+    stormy_later = normalize_hourly(pack_hourly([_hour(0), _hour(1), _hour(2, wind=80), _hour(3)]))
+    calm_days = [build_forecast_series([_day()]) for _ in range(3)]
+    rainy_day = build_forecast_series([_day(probability=90)])
+
+    bad, risk, hourly = score_route(
+        [calm_days[0], calm_days[1], rainy_day],
+        [stormy_later, stormy_later, None],
+        [START, START + 2 * HOUR, START],
+        window=2, thresholds=THRESHOLDS
+    )
+
+    # Первая точка проезжается до шторма, вторая — во время; третья без почасового прогноза — по дню
+    assert bad.tolist() == [False, True, True]
+    assert hourly.tolist() == [True, True, False]
+    # Температура в середине диапазона риска не добавляет, риск задаёт ветер
+    assert risk[0] == pytest.approx(0.2)
+    assert risk[1] == pytest.approx(1.6)
+    assert risk[2] > 1
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import quota
+from app.services.quota import BACKGROUND, INTERACTIVE, QuotaBudget
+
+
+@pytest.fixture
+def budget(redis_client, clock, monkeypatch):
+    monkeypatch.setattr(quota, 'time', clock)
+    return QuotaBudget(redis_client, 'test', daily_limit=100, rate=1, burst=2, background_reserve=0.2)
+
+
+def test_bucket_denies_when_empty_and_refills(budget, clock):
+    assert budget.acquire()
+    assert budget.acquire()
+    assert not budget.acquire()
+
+    clock.advance(1)
+    assert budget.acquire()
+    assert not budget.acquire()
+
+    stats = budget.stats()
+    assert stats['allowed'] == 3
+    assert stats['denied_rate'] == 2
+    assert stats['remaining'] == 97
+
+
+def test_background_keeps_reserve_for_users(budget, clock):
+    # Фоновому вызову нужно 1 + 20% корзины токенов: после одного вызова пользователя их уже не хватает
+    assert budget.acquire(INTERACTIVE)
+    assert not budget.acquire(BACKGROUND)
+    assert budget.acquire(INTERACTIVE)
+
+    clock.advance(10)
+    assert budget.acquire(BACKGROUND)
+    assert budget.stats()['background_denied'] == 1
+
+
+def test_daily_limit_denies_until_next_day(redis_client, clock, monkeypatch):
+    monkeypatch.setattr(quota, 'time', clock)
+    budget = QuotaBudget(redis_client, 'daily', daily_limit=4, rate=0, burst=1, background_reserve=0.5)
+
+    # Последняя половина дневного лимита остаётся запросам пользователей
+    assert [budget.acquire(BACKGROUND) for _ in range(3)] == [True, True, False]
+    assert [budget.acquire(INTERACTIVE) for _ in range(3)] == [True, True, False]
+    assert budget.remaining() == 0
+    assert budget.stats()['denied_daily'] == 2
+    assert budget.stats()['background_denied'] == 1
+
+    clock.advance(86400)
+    assert budget.acquire()
+
+
+def test_interactive_waits_for_token_and_background_fails_fast(redis_client):
+    budget = QuotaBudget(redis_client, 'wait', daily_limit=0, rate=20, burst=1, background_reserve=0, max_wait=1)
+
+    async def main():
+        assert await budget.acquire_async(INTERACTIVE)
+        assert not await budget.acquire_async(BACKGROUND)
+        started = time.monotonic()
+        assert await budget.acquire_async(INTERACTIVE)
+        return time.monotonic() - started
+
+    waited = asyncio.run(main())
+    assert 0.02 < waited < 0.5
+
+
+def test_interactive_does_not_wait_past_deadline(redis_client):
+    budget = QuotaBudget(redis_client, 'slow', daily_limit=0, rate=0.1, burst=1, background_reserve=0, max_wait=0.5)
+
+    async def main():
+        assert await budget.acquire_async()
+        started = time.monotonic()
+        assert not await budget.acquire_async()
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.2
@@ -0,0 +1,110 @@
+import pytest
+
+from app.services import cache as cache_module
+from app.services import response_cache as response_cache_module
+from app.services.cache import FORECAST, LocalCache, WeatherCache
+from app.services.refresher import Refresher
+from app.services.response_cache import ResponseCache, etag_matches
+
+KEY = ('get_weather', 'москва', 5, 0)
+
+
+@pytest.fixture
+def responses(redis_client, clock, monkeypatch):
+    monkeypatch.setattr(cache_module, 'time', clock)
+    monkeypatch.setattr(response_cache_module, 'refresher', Refresher(top_n=10, interval=60))
+    data = WeatherCache(redis_client, LocalCache(100), local_ttl=60)
+    # Ответы живут дольше данных: устаревают только вместе с ними
+    return ResponseCache(data, LocalCache(10), ttl=10 * FORECAST.storage_ttl)
+
+
+def test_response_lives_while_its_data_is_unchanged(responses):
+    responses.cache.set(FORECAST, 'gh:ucfv0:5', {'DailyForecasts': []})
+    stored = responses.put(KEY, b'<html>', 'text/html', [(FORECAST, 'gh:ucfv0:5')])
+
+    assert responses.get(KEY) is stored
+    assert stored.etag == responses.put(('other',), b'<html>', 'text/html', []).etag
+    assert responses.stats()['hits'] == 1
+
+
+def test_refetched_or_stale_data_invalidates_response(responses, clock):
+    responses.cache.set(FORECAST, 'gh:ucfv0:5', {'DailyForecasts': []})
+    responses.put(KEY, b'<html>', 'text/html', [(FORECAST, 'gh:ucfv0:5')])
+    clock.advance(1)
+    responses.cache.set(FORECAST, 'gh:ucfv0:5', {'DailyForecasts': []})
+    assert responses.get(KEY) is None
+
+    responses.put(KEY, b'<html>', 'text/html', [(FORECAST, 'gh:ucfv0:5')])
+    clock.advance(FORECAST.ttl)
+    assert responses.get(KEY) is None
+    assert responses.stats()['invalidated'] == 2
+
+
+def test_response_built_without_cached_data_is_not_stored(responses):
+    response = responses.put(KEY, b'<html>', 'text/html', [(FORECAST, 'gh:missing:5')])
+
+    assert response.etag.startswith('"')
+    assert responses.get(KEY) is None
+    assert responses.stats()['size'] == 0
+
+
+def test_hit_counts_as_access_to_tracked_data(responses):
+    async def fetch():
+        return None
+
+    refresher = response_cache_module.refresher
+    refresher.touch(FORECAST, 'gh:ucfv0:5', fetch)
+    responses.cache.set(FORECAST, 'gh:ucfv0:5', {'DailyForecasts': []})
+    responses.put(KEY, b'<html>', 'text/html', [(FORECAST, 'gh:ucfv0:5')])
+
+    responses.get(KEY)
+    responses.get(KEY)
+    assert refresher._tracked[FORECAST.key('gh:ucfv0:5')][0] == 3
+
+
+@pytest.mark.parametrize('header, matches', [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ('*', True),
+    ('"abcd"', False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+
+
+def test_city_spellings_share_one_page_with_canonical_name(weather_api, flask_client):
+    weather_api.coordinates['Springfield'] = (39.8, -89.6)
+    first = flask_client.get('/get_weather?city=springfield%20')
+    second = flask_client.get('/get_weather?city=SPRINGFIELD')
+    russian = flask_client.get('/get_weather?city=москва')
+    english = flask_client.get('/get_weather?city=%20Moscow')
+
+    assert first.data == second.data
+    assert 'Springfield'.encode() in first.data and b'springfield ' not in first.data
+    assert russian.data == english.data
+    assert 'Москва'.encode() in english.data and b'Moscow' not in english.data
+    assert weather_api.calls['daily'] == 2
+
+
+def test_page_params_are_validated_and_clamped(weather_api, flask_client):
+    assert flask_client.get('/get_weather?city=Moscow&days=abc').status_code == 400
+    assert flask_client.get('/get_weather?city=Moscow&day_index=1.5').status_code == 400
+
+    clamped = flask_client.get('/get_weather?city=Moscow&days=9&day_index=-3')
+    default = flask_client.get('/get_weather?city=Moscow&days=5&day_index=0')
+    assert clamped.status_code == 200
+    assert clamped.headers['etag'] == default.headers['etag']
+    assert response_cache_module.response_cache.stats()['hits'] == 1
+
+
+def test_route_json_uses_canonical_names_and_never_answers_post_with_304(weather_api, flask_client):
+    first = flask_client.post('/check_route_weather', json={'start_city': 'moscow ', 'end_city': 'TVER'})
+    second = flask_client.post('/check_route_weather', json={'start_city': 'Москва', 'end_city': 'тверь'},
+                               headers={'If-None-Match': first.headers['etag']})
+
+    assert (first.json['start_city'], first.json['end_city']) == ('Москва', 'Тверь')
+    assert second.status_code == 200
+    assert second.data == first.data
+    assert second.headers['cache-control'] == 'no-cache'
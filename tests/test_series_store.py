@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.series_store import ForecastSeriesStore, series_store
+from app.utils.forecast_series import build_forecast_series
+from dash_app.callbacks.callbacks import register_callbacks
+
+
+class _DashRecorder:
+    """
+    Вместо приложения Dash: запоминает серверные колбэки по имени функции.
+    """
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def callback(self, *args, **kwargs):
+        def decorator(fn):
+            self.callbacks[fn.__name__] = fn
+            return fn
+        return decorator
+
+    def clientside_callback(self, *args, **kwargs):
+        pass
+
+
+def _series(max_temperature: float):
+    return build_forecast_series([{'Date': '2024-12-01T07:00:00+03:00',
+                                   'Temperature': {'Maximum': {'Value': max_temperature}}}])
+
+
+@pytest.fixture
+def store(clock, monkeypatch):
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return ForecastSeriesStore(max_size=2, ttl=60)
+
+
+def test_each_request_keeps_its_own_series(store):
+    moscow, kazan = _series(1), _series(5)
+    store.put(store.make_key('Moscow', 5), moscow)
+    store.put(store.make_key('Kazan', 5), kazan)
+
+    assert store.make_key(' MOSCOW ', 5) == 'moscow:5'
+    assert store.get('moscow:5') is moscow
+    assert store.get('kazan:5') is kazan
+    assert store.get('moscow:3') is None
+
+
+def test_store_is_bounded_by_size_and_ttl(store, clock):
+    store.put('a:5', _series(1))
+    store.put('b:5', _series(2))
+    store.get('a:5')
+    store.put('c:5', _series(3))
+
+    assert store.get('b:5') is None  # вытеснен давно не читавшийся
+    assert store.get('a:5') is not None
+
+    clock.advance(60)
+    assert store.get('a:5') is None and store.get('c:5') is None
+
+
+def test_figures_are_built_once_per_forecast(store):
+    builds = []
+
+    def build(series, hourly):
+        builds.append(series)
+        return json.dumps({'max': series['max_temps'].tolist()})
+
+    store.put('a:5', _series(7))
+
+    assert store.figures('a:5', build) == store.figures('a:5', build) == '{"max": [7.0]}'
+    assert len(builds) == 1
+    assert store.figures('missing:5', build) is None
+
+
+def test_dash_callback_serves_figures_by_series_key(weather_api):
+    dash = _DashRecorder()
+    register_callbacks(dash)
+    load_figures = dash.callbacks['load_figures']
+    series_store.put('moscow:1', _series(1))
+    series_store.put('kazan:1', _series(9))
+
+    moscow, kazan = json.loads(load_figures('?series=moscow:1')), json.loads(load_figures('?series=kazan:1'))
+
+    assert moscow['temperature']['data'][0]['y'] == [1.0]
+    assert kazan['temperature']['data'][0]['y'] == [9.0]
+    assert load_figures('') is None
+    assert weather_api.calls['daily'] == 0
+
+
+def test_dash_callback_restores_series_served_by_another_process(weather_api):
+    dash = _DashRecorder()
+    register_callbacks(dash)
+
+    figures = json.loads(dash.callbacks['load_figures']('?series=москва:3'))
+
+    assert len(figures['temperature']['data'][0]['y']) == 3
+    assert 'hourly_temperature' in figures
+    assert series_store.get('москва:3') is not None
+    assert weather_api.calls['daily'] == 1
+    assert dash.callbacks['load_figures']('?series=broken') is None
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import singleflight
+from app.services.singleflight import SingleFlight
+
+
+class _ThreadPerCallBridge:
+    """
+    Каждый вызов — в новом потоке: захват и снятие блокировки гарантированно попадают в разные потоки,
+    как в загруженном пуле blocking_bridge.
+    """
+
+    async def run(self, fn, *args, **kwargs):
+        with ThreadPoolExecutor(1) as executor:
+            return await asyncio.get_running_loop().run_in_executor(executor, lambda: fn(*args, **kwargs))
+
+
+@pytest.fixture(autouse=True)
+def thread_per_call(monkeypatch):
+    monkeypatch.setattr(singleflight, 'blocking_bridge', _ThreadPerCallBridge())
+
+
+def test_concurrent_misses_make_one_upstream_call(redis_client):
+    single_flight = SingleFlight(redis_client)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'value': 42}
+
+    async def main():
+        return await asyncio.gather(*(single_flight.run('forecast:1', fetch) for _ in range(20)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert results == [{'value': 42}] * 20
+    assert single_flight.stats() == {'leaders': 1, 'followers': 19, 'remote_waits': 0, 'in_flight': 0}
+    # Блокировка снята, хотя захват и снятие выполнялись в разных потоках
+    assert redis_client.keys('singleflight:*') == []
+
+
+def test_leader_error_reaches_followers_and_releases_lock(redis_client):
+    single_flight = SingleFlight(redis_client)
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        raise ConnectionError('upstream down')
+
+    async def main():
+        return await asyncio.gather(*(single_flight.run('forecast:1', fetch) for _ in range(5)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert redis_client.keys('singleflight:*') == []
+    assert single_flight.stats()['in_flight'] == 0
+
+
+def test_waits_for_other_process_and_reads_cache(redis_client):
+    # Загрузку ведёт другой процесс: он держит блокировку и кладёт значение в кэш
+    other = redis_client.lock('singleflight:forecast:1', timeout=5, thread_local=False)
+    assert other.acquire(blocking=False)
+    cache = {}
+
+    def finish_other():
+        cache['forecast:1'] = 'from cache'
+        other.release()
+
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return 'from upstream'
+
+    single_flight = SingleFlight(redis_client, lock_timeout=5, poll_interval=0.01)
+    timer = threading.Timer(0.1, finish_other)
+    timer.start()
+    result = asyncio.run(single_flight.run('forecast:1', fetch, lambda: cache.get('forecast:1')))
+    timer.join()
+
+    assert result == 'from cache'
+    assert calls == []
+    assert single_flight.stats()['remote_waits'] == 1
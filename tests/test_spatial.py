@@ -0,0 +1,37 @@
+import pytest
+
+from app.services.spatial import SpatialIndex, geohash_center, geohash_encode, haversine_km
+
+
+def test_geohash_encode_known_value():
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash_encode(57.64911, 10.40744, 5) == 'u4pru'
+
+
+def test_geohash_center_lies_in_its_cell():
+    lat, lon = geohash_center('u4pru')
+
+    assert geohash_encode(lat, lon, 5) == 'u4pru'
+    assert haversine_km(lat, lon, 57.64911, 10.40744) < 5
+
+
+def test_haversine():
+    assert haversine_km(55.7558, 37.6173, 55.7558, 37.6173) == 0
+    assert haversine_km(55.7558, 37.6173, 59.9343, 30.3351) == pytest.approx(634, abs=2)
+
+
+def test_nearby_points_share_a_cell():
+    index = SpatialIndex(precision=5, max_snap_km=5)
+    first, second = index.snap(55.7558, 37.6173), index.snap(55.7560, 37.6180)
+
+    assert first == second
+    assert first.key.startswith('gh:') and len(first.key) == 3 + 5
+    assert haversine_km(55.7558, 37.6173, first.lat, first.lon) <= 5
+    assert index.snap(59.9343, 30.3351) != first
+
+
+def test_cell_is_refined_until_center_is_close_enough():
+    point = SpatialIndex(precision=5, max_snap_km=0.5).snap(55.7558, 37.6173)
+
+    assert len(point.key) > 3 + 5
+    assert haversine_km(55.7558, 37.6173, point.lat, point.lon) <= 0.5
@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.enums import ChatType
+
+from app.services import throttle
+from app.services.throttle import TokenBucketLimiter
+from bot.middlewares.middlewares import ThrottlingMiddleware
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def make_limiter(request, redis_client, clock, monkeypatch):
+    monkeypatch.setattr(throttle, 'time', clock)
+    client = redis_client if request.param == 'redis' else None
+    return lambda name, rate, burst: TokenBucketLimiter(name, rate, burst, client)
+
+
+def test_per_user_buckets_are_independent(make_limiter, clock):
+    limiter = make_limiter('user', 1, 2)
+
+    assert [limiter.acquire('1')[0] for _ in range(3)] == [True, True, False]
+    assert limiter.acquire('2') == (True, 0.0)
+
+    clock.advance(1)
+    assert limiter.acquire('1') == (True, 0.0)
+    assert limiter.stats() == {'allowed': 4, 'deferred': 0, 'throttled': 1, 'errors': 0}
+
+
+def test_short_wait_is_deferred(make_limiter):
+    limiter = make_limiter('user', 2, 1)
+
+    assert limiter.acquire('1', max_wait=1) == (True, 0.0)
+    allowed, wait = limiter.acquire('1', max_wait=1)
+    assert allowed and wait == pytest.approx(0.5)
+    allowed, wait = limiter.acquire('1', max_wait=0.5)
+    assert not allowed and wait == pytest.approx(1.0)
+
+
+def test_refund_is_capped_at_burst(make_limiter):
+    limiter = make_limiter('user', 1, 1)
+
+    limiter.refund('1')  # неизвестный ключ: корзина и так полна
+    assert limiter.acquire('1')[0]
+    limiter.refund('1')
+    limiter.refund('1')
+    assert limiter.acquire('1')[0]
+    assert not limiter.acquire('1')[0]
+
+
+def _update_data(chat_id: int, chat_type: str) -> dict:
+    return {'event_from_user': SimpleNamespace(id=1), 'event_chat': SimpleNamespace(id=chat_id, type=chat_type)}
+
+
+def test_group_limit_does_not_spend_user_tokens(make_limiter):
+    middleware = ThrottlingMiddleware(make_limiter('user', 0.001, 2), make_limiter('chat', 0.001, 1))
+    handled = []
+
+    async def handler(event, data):
+        handled.append(data['event_chat'].id)
+
+    async def main():
+        for _ in range(3):
+            await middleware(handler, object(), _update_data(-100, ChatType.GROUP))
+        for _ in range(2):
+            await middleware(handler, object(), _update_data(1, ChatType.PRIVATE))
+
+    asyncio.run(main())
+    # Лимит группы исчерпан первым апдейтом; отброшенные апдейты группы вернули токены пользователя
+    assert handled == [-100, 1]
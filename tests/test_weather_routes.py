@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from app.asgi import call_asgi
+from app.routes import asgi_routes
+from app.services.response_cache import response_cache
+
+
+def _scope(method: str, path: str, query: str = '', headers=()) -> dict:
+    return {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'root_path': '',
+            'path': path, 'query_string': query.encode(), 'server': ('localhost', 80),
+            'headers': [(name.encode(), value.encode()) for name, value in headers]}
+
+
+def _asgi(handler, method: str, path: str, query: str = '', body: bytes = b'', headers=()):
+    status, response_headers, response_body = asyncio.run(
+        call_asgi(handler, _scope(method, path, query, headers), body))
+    return status, dict(response_headers), response_body
+
+
+def test_flask_view_and_asgi_handler_share_one_response(weather_api, flask_client):
+    status, headers, body = _asgi(asgi_routes.get_weather, 'GET', '/get_weather', 'city=Moscow&days=3')
+    response = flask_client.get('/get_weather?city=Moscow&days=3')
+
+    assert status == response.status_code == 200
+    assert response.data == body
+    assert response.headers['etag'] == headers['etag']
+    assert response_cache.stats()['hits'] == 1
+    assert weather_api.calls['daily'] == 1
+
+
+def test_flask_view_revalidates_and_answers_head(weather_api, flask_client):
+    page = flask_client.get('/get_weather?city=Moscow')
+    not_modified = flask_client.get('/get_weather?city=Moscow', headers={'If-None-Match': page.headers['etag']})
+    head = flask_client.head('/get_weather?city=Moscow')
+
+    assert not_modified.status_code == 304 and not_modified.data == b''
+    assert head.status_code == 200 and head.data == b''
+    assert head.headers['content-length'] == str(len(page.data))
+
+
+def test_route_ajax_view_uses_asgi_handler(weather_api, flask_client):
+    cities = {'start_city': 'Moscow', 'end_city': 'Тверь'}
+    response = flask_client.post('/check_route_weather', json=cities)
+    status, headers, body = _asgi(asgi_routes.check_route_weather, 'POST', '/check_route_weather',
+                                  body=json.dumps(cities).encode())
+
+    assert response.status_code == status == 200
+    assert response.json['start_weather_condition'] in ('good', 'bad')
+    assert response.headers['etag'] == headers['etag']
+    assert flask_client.post('/check_route_weather', data='[]', content_type='application/json').status_code == 400
+
+
+def test_query_string_without_percent_encoding(weather_api):
+    status, _, body = _asgi(asgi_routes.get_weather, 'GET', '/get_weather', 'city=Тверь&days=1')
+
+    assert status == 200
+    assert 'Тверь'.encode() in body
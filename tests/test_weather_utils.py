@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.utils.forecast_series import build_forecast_series
+from app.utils.weather_utils import WeatherThresholds, check_bad_weather, score_forecasts, score_weather_batch
+
+THRESHOLDS = WeatherThresholds(min_temperature=0, max_temperature=30, max_wind_speed=50,
+                               max_precipitation_probability=70)
+
+
+def test_batch_scores_each_cell():
+    bad, risk = score_weather_batch(
+        [[15, -5], [35, 15]],
+        [[10, 10], [10, 60]],
+        [[0, 0], [0, 0]],
+        thresholds=THRESHOLDS
+    )
+
+    assert bad.tolist() == [[False, True], [True, True]]
+    np.testing.assert_allclose(risk, [[0.2, 4 / 3], [4 / 3, 1.2]])
+
+
+def test_threshold_value_is_still_good():
+    bad, risk = score_weather_batch(30, 50, 70, thresholds=THRESHOLDS)
+
+    assert not bad
+    assert risk == pytest.approx(1.0)
+
+
+def test_precipitation_intensity_and_missing_values():
+    bad, risk = score_weather_batch([15, 15, np.nan], [0, 0, np.nan], [0, 0, np.nan],
+                                    ['Light', 'HEAVY', ''], THRESHOLDS)
+
+    assert bad.tolist() == [False, True, False]
+    assert risk.tolist() == pytest.approx([0.3, 1.5, 0.0])
+
+
+def test_score_forecasts_pads_missing_days():
+    day = {'Temperature': {'Maximum': {'Value': 40}}, 'Day': {'Wind': {'Speed': {'Value': 5}}}}
+    short = build_forecast_series([day])
+    long = build_forecast_series([dict(day, Temperature={'Maximum': {'Value': 15}})] * 2)
+
+    bad, risk = score_forecasts([short, long], days=2, thresholds=THRESHOLDS)
+
+    assert bad.tolist() == [[True, False], [False, False]]
+    assert risk[0, 1] == 0.0
+
+
+def test_check_bad_weather():
+    assert check_bad_weather(20, 10, 10) == 'good'
+    assert check_bad_weather(20, 10, 10, 'Heavy') == 'bad'
+
+
+@pytest.mark.parametrize('overrides', [
+    {'min_temperature': 10, 'max_temperature': 10},
+    {'max_wind_speed': 0},
+    {'max_precipitation_probability': -1},
+])
+def test_invalid_thresholds_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        WeatherThresholds(**overrides)
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+from bot.core.config import load_config
+from bot.webhook import WebhookApp
+
+SECRET = 'test-secret'
+UPDATE = {'update_id': 1, 'message': {'message_id': 1, 'date': 0, 'chat': {'id': 1, 'type': 'private'},
+                                      'text': 'Москва'}}
+
+
+class _Dispatcher:
+    def __init__(self):
+        self.updates = []
+
+    async def feed_update(self, bot, update):
+        self.updates.append(update.update_id)
+
+
+async def _post(app: WebhookApp, body: bytes, secret: str | None = SECRET, method: str = 'POST') -> int:
+    headers = [(b'x-telegram-bot-api-secret-token', secret.encode())] if secret is not None else []
+    scope = {'type': 'http', 'method': method, 'headers': headers}
+    messages = [{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                {'type': 'http.request', 'body': body[10:]}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]['status']
+
+
+def test_rejects_requests_without_valid_secret():
+    body = json.dumps(UPDATE).encode()
+
+    async def main():
+        app = WebhookApp(_Dispatcher(), None, SECRET, queue_size=10)
+        no_secret = WebhookApp(_Dispatcher(), None, None, queue_size=10)
+        return [await _post(app, body, secret=None), await _post(app, body, secret='wrong'),
+                await _post(app, body, method='GET'), await _post(no_secret, body, secret=''),
+                app.queue.qsize()]
+
+    assert asyncio.run(main()) == [403, 403, 405, 403, 0]
+
+
+def test_accepts_update_and_workers_feed_dispatcher():
+    dispatcher = _Dispatcher()
+    app = WebhookApp(dispatcher, None, SECRET, queue_size=1)
+    body = json.dumps(UPDATE).encode()
+
+    async def main():
+        statuses = [await _post(app, b'{"not": "an update"}'), await _post(app, body), await _post(app, body)]
+        workers = asyncio.ensure_future(app.run_workers(2))
+        await app.drain(1)
+        workers.cancel()
+        return statuses
+
+    # Второй апдейт не помещается в очередь: Telegram повторит доставку
+    assert asyncio.run(main()) == [400, 200, 503]
+    assert dispatcher.updates == [1]
+
+
+@pytest.mark.parametrize('env, error', [
+    ({'WEBHOOK_URL': 'https://example.com'}, 'WEBHOOK_SECRET'),
+    ({'WEBHOOK_SECRET': SECRET}, 'WEBHOOK_URL'),
+    ({'WEBHOOK_SECRET': SECRET, 'WEBHOOK_URL': 'http://example.com'}, 'WEBHOOK_URL'),
+])
+def test_webhook_mode_requires_secret_and_https_url(monkeypatch, env, error):
+    monkeypatch.setenv('BOT_MODE', 'webhook')
+    monkeypatch.delenv('WEBHOOK_URL', raising=False)
+    monkeypatch.delenv('WEBHOOK_SECRET', raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    with pytest.raises(ValueError, match=error):
+        load_config(None)
+
+
+def test_webhook_config(monkeypatch):
+    monkeypatch.setenv('BOT_MODE', 'Webhook')
+    monkeypatch.setenv('WEBHOOK_URL', 'https://example.com/')
+    monkeypatch.setenv('WEBHOOK_SECRET', SECRET)
+
+    config = load_config(None)
+
+    assert config.tg_bot.mode == 'webhook'
+    assert config.webhook.url + config.webhook.path == 'https://example.com/telegram/webhook'